@@ -2,3 +2,4 @@ from .common import *
 from .api_converter import *
 from .schema_converter import *
 from .action_converter import *
+from .azathoth_converter import *
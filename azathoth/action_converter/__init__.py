@@ -1,3 +1,5 @@
 from .schema import *
+from .server_action_generator import *
 from .file_action_converter import *
 from .project_action_converter import *
+from .estimator import *
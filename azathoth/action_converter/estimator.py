@@ -0,0 +1,46 @@
+from azathoth.common import LLMRequestEstimate, estimate_tokens, get_llm_result_cache, get_run_journal, read_source_file
+from .schema import AutomProjectActionConvertParams
+from .file_action_converter import FileActionConverter, file_action_converter_model, action_run_journal_name
+from .server_action_generator import parse_api_function_signature
+from .project_action_converter import plan_project_action_convert, make_file_action_convert_params
+
+
+def estimate_action_convert_requests(req_body: AutomProjectActionConvertParams) -> list[LLMRequestEstimate]:
+    """The LLM requests AutomProjectActionConverter would send for the api files the action generator can not render.
+
+    Only the planner runs, over the api files on disk: before the api stage has run they may be missing or stale. The completion is assumed as long as the api source.
+    """
+    project_action_convert_plan = plan_project_action_convert(req_body)
+    journal = get_run_journal(project_action_convert_plan.autom_frontend_root_path, action_run_journal_name)
+    llm_cache = get_llm_result_cache() if project_action_convert_plan.use_llm_cache else None
+
+    request_estimates: list[LLMRequestEstimate] = []
+    seen_keys: set[str] = set()
+    for src_file_fullpath, dst_file_fullpath in project_action_convert_plan.src_dst_filepaths_pair:
+        file_params = make_file_action_convert_params(project_action_convert_plan, src_file_fullpath, dst_file_fullpath)
+        api_source = read_source_file(src_file_fullpath).text
+        if file_params.use_action_generator and parse_api_function_signature(api_source) is not None:
+            continue
+
+        request_key = FileActionConverter.get_request_key(api_source)
+        predicted_hit = None
+        if file_params.resume and journal.get(FileActionConverter.get_journal_key(file_params, api_source)) is not None:
+            predicted_hit = 'journal'
+        elif request_key in seen_keys:
+            predicted_hit = 'duplicate'
+        elif llm_cache is not None and llm_cache.contains(request_key):
+            predicted_hit = 'llm_cache'
+        seen_keys.add(request_key)
+
+        request_estimates.append(LLMRequestEstimate.from_messages(
+            'action', src_file_fullpath.relative_to(file_params.autom_frontend_root_path).as_posix(), file_action_converter_model,
+            FileActionConverter.get_messages(api_source),
+            estimate_tokens(api_source),
+            predicted_hit,
+        ))
+    return request_estimates
+
+
+__all__ = [
+    'estimate_action_convert_requests',
+]
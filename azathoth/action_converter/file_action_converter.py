@@ -1,13 +1,30 @@
+import threading
+from pathlib import Path
+
+from pydantic import BaseModel
+from autom.logger import autom_logger
 from autom.utils import SingleLLMUsage
-from autom.official import BaseOpenAIWorker
-from autom.engine import AgentWorker, AutomSchema, Request, Response
+from autom.official import BaseOpenAIWorker, HolderAgentWorker, IdentityBridgeWorker
+from autom.engine import AgentWorker, GraphAgentWorker, AutomGraph, AutomSchema, Node, Link, Request, Response
 
-from azathoth.common import FileContent
+from azathoth.common import (
+    FileContent, FileContentStreamer, make_llm_cache_key, get_llm_result_cache, get_llm_call_executor, get_openai_client, parse_chat_completion, read_source_file,
+    get_run_journal, make_journal_key, sha256_text, ConvertFailure, LLMUsageLabel, LLMBudgetExceeded,
+)
 from .schema import FileActionConvertParams
 from .prompt import api_convert_system_prompt, api_convert_user_input_prompt
+from .server_action_generator import parse_api_function_signature, render_server_action
+
+
+file_action_converter_model = "gpt-4o-mini"
+action_run_journal_name = 'action'
 
 
 class FileActionConverter(BaseOpenAIWorker, AgentWorker):
+    """Convert a backend api file to its server action file.
+
+    Generated api files are rendered from their signature, only the hand-written ones go to the LLM.
+    """
     @classmethod
     def define_input_schema(cls) -> AutomSchema | None:
         return FileActionConvertParams
@@ -17,37 +34,160 @@ class FileActionConverter(BaseOpenAIWorker, AgentWorker):
         return FileContent
 
     def invoke(self, req: Request) -> Response:
-        from pydantic import BaseModel
-        class Output(BaseModel):
-            server_action_code: str
-
         req_body: FileActionConvertParams = req.body
-        with open(req_body.api_src_fullpath, 'r') as f:
-            api_source = f.read()
+        api_source = read_source_file(req_body.api_src_fullpath).text
 
         resp = Response[FileContent].from_worker(self)
-        chat_completion = self.openai_client.beta.chat.completions.parse(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": api_convert_system_prompt},
-                    {"role": "user", "content": api_convert_user_input_prompt.format(
-                        api_source=api_source
-                    )},
-                ],
-                response_format=Output,
-            )
-        resp.add_llm_usage(SingleLLMUsage.from_openai_chat_completion(chat_completion))
-        parsed = chat_completion.choices[0].message.parsed
-        if parsed is None:
-            raise RuntimeError(f"Failed to parse the response from OpenAI: {chat_completion.choices[0].message}. Request: {req}")
+        if req_body.use_action_generator and (signature := parse_api_function_signature(api_source)) is not None:
+            autom_logger.info(f"[FileActionConverter] Rendered the server action of {req_body.api_src_fullpath.name} from its signature.")
+            server_action_code = render_server_action(signature, api_module=req_body.api_module)
+        else:
+            journal = get_run_journal(req_body.autom_frontend_root_path, action_run_journal_name)
+            journal_key = self.get_journal_key(req_body, api_source)
+            server_action_code = journal.get(journal_key) if req_body.resume else None
+            if server_action_code is None:
+                try:
+                    server_action_code, llm_usage = get_llm_call_executor().result(
+                        self.get_request_key(api_source),
+                        lambda: self.convert_by_llm(api_source, req_body.use_llm_cache, self.get_usage_label(req_body)),
+                    )
+                except LLMBudgetExceeded:
+                    raise
+                except Exception as e:
+                    autom_logger.error(f"[FileActionConverter] Failed to convert {req_body.api_src_fullpath.name}: {e}")
+                    resp.body = FileContent(
+                        filepath=req_body.action_dst_fullpath,
+                        content='',
+                        failure=ConvertFailure.from_exception(f'api file {req_body.api_src_fullpath.name}', e, req_body.action_dst_fullpath),
+                    )
+                    return resp.success()
+                if llm_usage is not None:
+                    resp.add_llm_usage(llm_usage)
+                journal.record(journal_key, server_action_code)
 
         resp.body = FileContent(
             filepath=req_body.action_dst_fullpath,
-            content=parsed.server_action_code,
+            content=server_action_code,
         )
         return resp.success()
 
+    def prefetch(self, req_body: FileActionConvertParams, api_source: str | None = None):
+        """Start converting the api file by the LLM in the background if the generator can not render it, a later `invoke` collects the result.
+
+        `api_source` is the content of an api file not dumped yet, it is read from disk if None.
+        """
+        if api_source is None:
+            api_source = read_source_file(req_body.api_src_fullpath).text
+        if req_body.use_action_generator and parse_api_function_signature(api_source) is not None:
+            return
+        if req_body.resume and get_run_journal(req_body.autom_frontend_root_path, action_run_journal_name).get(self.get_journal_key(req_body, api_source)) is not None:
+            return
+        get_llm_call_executor().submit(self.get_request_key(api_source), lambda: self.convert_by_llm(api_source, req_body.use_llm_cache, self.get_usage_label(req_body)))
+
+    @classmethod
+    def get_request_key(cls, api_source: str) -> str:
+        return make_llm_cache_key(
+            file_action_converter_model,
+            api_convert_system_prompt,
+            api_convert_user_input_prompt,
+            api_source,
+        )
+
+    @classmethod
+    def get_journal_key(cls, req_body: FileActionConvertParams, api_source: str) -> str:
+        return make_journal_key(
+            'file',
+            req_body.api_src_fullpath.relative_to(req_body.autom_frontend_root_path).as_posix(),
+            sha256_text(api_source),
+        )
+
+    @classmethod
+    def get_usage_label(cls, req_body: FileActionConvertParams) -> LLMUsageLabel:
+        return LLMUsageLabel(stage='action', filepath=req_body.api_src_fullpath.relative_to(req_body.autom_frontend_root_path).as_posix())
+
+    @classmethod
+    def get_messages(cls, api_source: str) -> list[dict]:
+        return [
+            {"role": "system", "content": api_convert_system_prompt},
+            {"role": "user", "content": api_convert_user_input_prompt.format(
+                api_source=api_source
+            )},
+        ]
+
+    def convert_by_llm(self, api_source: str, use_llm_cache: bool = True, usage_label: LLMUsageLabel | None = None) -> tuple[str, SingleLLMUsage | None]:
+        """Convert the api source to the server action code by the LLM, through the LLM result cache if enabled. The usage is None on a cache hit."""
+        class Output(BaseModel):
+            server_action_code: str
+
+        llm_cache = get_llm_result_cache() if use_llm_cache else None
+        cache_key = self.get_request_key(api_source)
+        cached = llm_cache.get(cache_key) if llm_cache is not None else None
+        if cached is not None:
+            return Output.model_validate(cached).server_action_code, None
+
+        chat_completion = parse_chat_completion(
+            get_openai_client(self),
+            model=file_action_converter_model,
+            messages=self.get_messages(api_source),
+            response_format=Output,
+            usage_label=usage_label,
+        )
+        llm_usage = SingleLLMUsage.from_openai_chat_completion(chat_completion)
+        parsed = chat_completion.choices[0].message.parsed
+        if parsed is None:
+            raise RuntimeError(f"Failed to parse the response from OpenAI: {chat_completion.choices[0].message}.")
+
+        if llm_cache is not None:
+            llm_cache.set(cache_key, parsed.model_dump())
+        return parsed.server_action_code, llm_usage
+
+
+class StreamingFileActionConverter(GraphAgentWorker):
+    """FileActionConverter followed by the FileContentStreamer, so the server action file is dumped as soon as it is converted in streaming mode."""
+    @classmethod
+    def define_graph(cls) -> AutomGraph:
+        graph = AutomGraph()
+
+        entry_node = Node.from_worker(HolderAgentWorker().with_schema(FileActionConvertParams))
+        entry_file_action_converter_bridge = Link.from_worker(IdentityBridgeWorker())
+        file_action_converter = Node.from_worker(FileActionConverter())
+        file_action_converter_streamer_bridge = Link.from_worker(IdentityBridgeWorker())
+        streamer = Node.from_worker(FileContentStreamer())
+
+        graph.add_node(entry_node)
+        graph.add_node(file_action_converter)
+        graph.add_node(streamer)
+
+        graph.bridge(entry_node, file_action_converter, entry_file_action_converter_bridge)
+        graph.bridge(file_action_converter, streamer, file_action_converter_streamer_bridge)
+
+        graph.set_entry_node(entry_node)
+        graph.set_exit_node(streamer)
+
+        return graph
+
+
+_prefetch_worker: FileActionConverter | None = None
+_prefetch_worker_lock = threading.Lock()
+
+
+def prefetch_action_conversions(params_list: list[FileActionConvertParams], api_source_dict: dict[Path, str] | None = None):
+    """Submit the LLM conversion of every api file the generator can not render to the shared LLMCallExecutor.
+
+    `api_source_dict` holds the content of the api files not dumped yet, by `api_src_fullpath`.
+    """
+    global _prefetch_worker
+    with _prefetch_worker_lock:
+        if _prefetch_worker is None:
+            _prefetch_worker = FileActionConverter()
+    for params in params_list:
+        _prefetch_worker.prefetch(params, (api_source_dict or {}).get(params.api_src_fullpath))
+
 
 __all__ = [
+    'file_action_converter_model',
+    'action_run_journal_name',
     'FileActionConverter',
+    'StreamingFileActionConverter',
+    'prefetch_action_conversions',
 ]
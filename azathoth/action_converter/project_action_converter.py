@@ -8,9 +8,10 @@ from autom.official import HolderAgentWorker, IdentityBridgeWorker, NullPlugger
 
 from azathoth.common import (
     TSExportHelperInputAggregator, FilesDumper,
-    FilesContentAggregator, FileContentFilesContentCollectPlugger, TSExportHerlper, FilesContentFilesContentPlugger
+    FilesContentAggregator, FileContentFilesContentCollectPlugger, TSExportHerlper, TSExportSignaturesSaver, FilesContentFilesContentPlugger,
+    get_llm_call_executor, get_files_stream_writer, open_run_journal,
 )
-from .file_action_converter import FileActionConverter
+from .file_action_converter import StreamingFileActionConverter, prefetch_action_conversions, action_run_journal_name
 from .schema import AutomProjectActionConvertParams, ProjectActionConvertPlannerInput, ProjectActionConvertPlan, FileActionConvertParams
 
 
@@ -23,7 +24,7 @@ class InnerActionConverter(GraphAgentWorker):
         entry_planner_bridge = Link.from_worker(IdentityBridgeWorker())
         project_action_convert_planner = Node.from_worker(ProjectActionConvertPlanner())
         planner_file_action_converter_dispatch_bridge = Link.from_worker(PlannerFileActionConverterDispatchBridge())
-        file_action_converter = Node.from_worker(FileActionConverter())
+        file_action_converter = Node.from_worker(StreamingFileActionConverter())
         file_action_converter_exit_collect_plugger = Link.from_worker(FileContentFilesContentCollectPlugger())
         exit_aggregator = Node.from_worker(FilesContentAggregator())
 
@@ -62,7 +63,9 @@ class AutomProjectActionConverter(GraphAgentWorker):
         ts_export_helper = Node.from_worker(TSExportHerlper())
         ts_export_helper_index_files_dumper_bridge = Link.from_worker(IdentityBridgeWorker())
         index_files_dumper = Node.from_worker(FilesDumper())
-        index_files_dumper_exit_plugger = Link.from_worker(FilesContentFilesContentPlugger())
+        index_files_dumper_signatures_saver_bridge = Link.from_worker(IdentityBridgeWorker())
+        signatures_saver = Node.from_worker(TSExportSignaturesSaver())
+        signatures_saver_exit_plugger = Link.from_worker(FilesContentFilesContentPlugger())
         exit_aggregator = Node.from_worker(FilesContentAggregator())
 
         graph.add_node(entry_node)
@@ -71,6 +74,7 @@ class AutomProjectActionConverter(GraphAgentWorker):
         graph.add_node(ts_export_aggregator)
         graph.add_node(ts_export_helper)
         graph.add_node(index_files_dumper)
+        graph.add_node(signatures_saver)
         graph.add_node(exit_aggregator)
         
         graph.bridge(entry_node, inner_action_converter, entry_inner_action_converter_bridge)
@@ -80,7 +84,8 @@ class AutomProjectActionConverter(GraphAgentWorker):
         graph.plug(entry_node, ts_export_aggregator, entry_ts_export_aggregator_plugger)
         graph.bridge(ts_export_aggregator, ts_export_helper, ts_export_aggregator_ts_export_helper_bridge)
         graph.bridge(ts_export_helper, index_files_dumper, ts_export_helper_index_files_dumper_bridge)
-        graph.plug(index_files_dumper, exit_aggregator, index_files_dumper_exit_plugger)
+        graph.bridge(index_files_dumper, signatures_saver, index_files_dumper_signatures_saver_bridge)
+        graph.plug(signatures_saver, exit_aggregator, signatures_saver_exit_plugger)
         
         graph.set_entry_node(entry_node)
         graph.set_exit_node(exit_aggregator)
@@ -125,29 +130,9 @@ class ProjectActionConvertPlanner(AgentWorker):
     
     def invoke(self, req: Request) -> Response:
         req_body: ProjectActionConvertPlannerInput = req.body
-        autom_frontend_root_path = req_body.autom_frontend_root_path
-
-        src_api_dir = autom_frontend_root_path / 'lib/backend-api/'
-        dst_action_dir = autom_frontend_root_path / 'actions/backend-api/'
-        excluded_path = src_api_dir / 'config.ts'
-        excluded_files = ['index.ts']
-
-        # iterate over all files in the backend api directory except for the excluded files using rglob
-        src_file_fullpaths = list(src_api_dir.rglob('*.ts'))
-        src_file_fullpaths = [f for f in src_file_fullpaths if f != excluded_path and f.name not in excluded_files]
-
-        src_dst_filepaths_pair: list[tuple[Path, Path]] = []
-        for src_file_fullpath in src_file_fullpaths:
-            relpath = src_file_fullpath.relative_to(src_api_dir)
-            dst_file_fullpath = dst_action_dir / relpath
-            src_dst_filepaths_pair.append((src_file_fullpath, dst_file_fullpath))
-
-        return Response[ProjectActionConvertPlan].from_worker(self).success(
-            body=ProjectActionConvertPlan(
-                autom_frontend_root_path=autom_frontend_root_path,
-                src_dst_filepaths_pair=src_dst_filepaths_pair,
-            )
-        )
+        get_files_stream_writer().configure(req_body.stream_dump, req_body.autom_frontend_root_path / 'actions/backend-api')
+        open_run_journal(req_body.autom_frontend_root_path, action_run_journal_name, req_body.resume)
+        return Response[ProjectActionConvertPlan].from_worker(self).success(body=plan_project_action_convert(req_body))
 
 
 class PlannerFileActionConverterDispatchBridge(DispatchBridgeWorker):
@@ -165,11 +150,62 @@ class PlannerFileActionConverterDispatchBridge(DispatchBridgeWorker):
         
         for i, (src_file_fullpath, dst_file_fullpath) in enumerate(req_body.src_dst_filepaths_pair):
             batch_responses[i] = Response[FileActionConvertParams].from_worker(self).success(
-                body=FileActionConvertParams(
-                    autom_frontend_root_path=req_body.autom_frontend_root_path,
-                    api_src_fullpath=src_file_fullpath,
-                    action_dst_fullpath=dst_file_fullpath,
-                )
+                body=make_file_action_convert_params(req_body, src_file_fullpath, dst_file_fullpath)
             )
 
+        if req_body.max_llm_concurrency > 1:
+            get_llm_call_executor().configure(req_body.max_llm_concurrency)
+            prefetch_action_conversions([response.body for response in batch_responses.values()])
+
         return batch_responses
+
+
+def plan_project_action_convert(req_body: ProjectActionConvertPlannerInput) -> ProjectActionConvertPlan:
+    """Plan the api files to convert, what ProjectActionConvertPlanner outputs without opening the run journal."""
+    return ProjectActionConvertPlan(
+        autom_frontend_root_path=req_body.autom_frontend_root_path,
+        api_module='@/' + req_body.api_src_relpath.strip('/'),
+        use_action_generator=req_body.use_action_generator,
+        use_llm_cache=req_body.use_llm_cache,
+        max_llm_concurrency=req_body.max_llm_concurrency,
+        resume=req_body.resume,
+        src_dst_filepaths_pair=list_action_src_dst_filepath_pairs(req_body.autom_frontend_root_path, req_body.api_src_relpath),
+    )
+
+
+def make_file_action_convert_params(project_action_convert_plan: ProjectActionConvertPlan, src_file_fullpath: Path, dst_file_fullpath: Path) -> FileActionConvertParams:
+    return FileActionConvertParams(
+        autom_frontend_root_path=project_action_convert_plan.autom_frontend_root_path,
+        api_src_fullpath=src_file_fullpath,
+        action_dst_fullpath=dst_file_fullpath,
+        api_module=project_action_convert_plan.api_module,
+        use_action_generator=project_action_convert_plan.use_action_generator,
+        use_llm_cache=project_action_convert_plan.use_llm_cache,
+        resume=project_action_convert_plan.resume,
+    )
+
+
+def list_action_src_dst_filepath_pairs(autom_frontend_root_path: Path, api_src_relpath: str = 'lib/backend-api') -> list[tuple[Path, Path]]:
+    """List all (src_filepath, dst_filepath) pairs to convert, frontend api directory --> frontend /actions/backend-api directory."""
+    src_api_dir = autom_frontend_root_path / api_src_relpath
+
+    # iterate over all files in the backend api directory except for the excluded files using rglob
+    src_dst_filepaths_pair: list[tuple[Path, Path]] = []
+    for src_file_fullpath in sorted(src_api_dir.rglob('*.ts')):
+        dst_file_fullpath = get_action_dst_filepath(autom_frontend_root_path, api_src_relpath, src_file_fullpath)
+        if dst_file_fullpath is not None:
+            src_dst_filepaths_pair.append((src_file_fullpath, dst_file_fullpath))
+
+    return src_dst_filepaths_pair
+
+
+def get_action_dst_filepath(autom_frontend_root_path: Path, api_src_relpath: str, src_file_fullpath: Path) -> Path | None:
+    """The server action file of an api file, None if `src_file_fullpath` is not an api file to convert."""
+    src_api_dir = autom_frontend_root_path / api_src_relpath
+    excluded_path = src_api_dir / 'config.ts'
+    excluded_files = ['index.ts']
+    if src_file_fullpath.suffix != '.ts' or not src_file_fullpath.is_relative_to(src_api_dir):
+        return None
+    if src_file_fullpath == excluded_path or src_file_fullpath.name in excluded_files:
+        return None
+    return autom_frontend_root_path / 'actions/backend-api' / src_file_fullpath.relative_to(src_api_dir)
@@ -1,20 +1,28 @@
 from pathlib import Path
 
+from pydantic import PositiveInt
 from autom import AutomSchema, AutomField, autom_registry
 
+from azathoth.common import LLMCacheParams, ResumeParams, StreamDumpParams
 
-class FileActionConvertParams(AutomSchema):
+
+class FileActionConvertParams(LLMCacheParams, ResumeParams):
     autom_frontend_root_path: Path
     api_src_fullpath: Path
     action_dst_fullpath: Path
+    api_module: str = AutomField('@/lib/backend-api', description="The module the server actions import the api functions from")
+    use_action_generator: bool = AutomField(True, description="Render the server action of a generated api file directly from its signature, only the api files it can not parse go to the LLM")
 
 
 @autom_registry(is_internal=False)
-class AutomProjectActionConvertParams(AutomSchema):
+class AutomProjectActionConvertParams(LLMCacheParams, StreamDumpParams, ResumeParams):
     autom_frontend_root_path: Path = AutomField(
         ...,
         description="The root path of the Autom Frontend Project",
     )
+    api_src_relpath: str = AutomField('lib/backend-api', description="The directory of the api files to convert, relative to the frontend root")
+    use_action_generator: bool = AutomField(True, description="Render the server action of a generated api file directly from its signature, only the api files it can not parse go to the LLM")
+    max_llm_concurrency: PositiveInt = AutomField(1, description="Max number of LLM calls in flight at once, shared by all files. With more than 1, the LLM conversions are prefetched concurrently")
 
 
 ProjectActionConvertPlannerInput = AutomProjectActionConvertParams
@@ -25,4 +33,9 @@ class ProjectActionConvertPlan(AutomSchema):
         ...,
         description="The root path of the Autom Frontend Project",
     )
+    api_module: str = '@/lib/backend-api'
+    use_action_generator: bool = True
+    use_llm_cache: bool = True
+    max_llm_concurrency: PositiveInt = 1
+    resume: bool = False
     src_dst_filepaths_pair: list[tuple[Path, Path]]
@@ -0,0 +1,187 @@
+import re
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+api_export_pattern = re.compile(r'export\s+const\s+(\w+)\s*=\s*cache\(\s*async\s*\(')
+ts_string_literal_pattern = re.compile(r'"[^"]*"|\'[^\']*\'')
+ts_type_name_pattern = re.compile(r'(?<![\w."\'])([A-Z]\w*)')
+ts_builtin_type_names = {
+    'Array', 'ReadonlyArray', 'Record', 'Partial', 'Required', 'Readonly', 'Pick', 'Omit', 'Promise',
+    'Date', 'Map', 'Set', 'File', 'Blob', 'FormData',
+}
+
+
+class APIFunctionParam(BaseModel):
+    name: str
+    ts_type: str
+    optional: bool = False
+    default: Optional[str] = Field(None, description="Source of the default value in the destructuring pattern, if any")
+
+
+class APIFunctionSignature(BaseModel):
+    """Signature of an exported `cache(async ({...}: {...}): Promise<...> => ...)` backend api function."""
+    function_name: str
+    params: list[APIFunctionParam] = Field(default_factory=list)
+
+    @property
+    def has_access_token(self) -> bool:
+        return any(param.name == 'accessToken' for param in self.params)
+
+
+def parse_api_function_signature(api_source: str) -> APIFunctionSignature | None:
+    """Parse the signature of the only exported api function of a `lib/backend-api` file.
+
+    Only the shape generated by `FunctionConvertKeyResult.to_frontend_code` and close variants are understood. None is returned for anything else(several exports, rest params, non destructured params...), the file is then left to the LLM.
+    """
+    matches = list(api_export_pattern.finditer(api_source))
+    if len(matches) != 1 or len(re.findall(r'^export\s', api_source, flags=re.MULTILINE)) != 1:
+        return None
+    match = matches[0]
+
+    position = skip_whitespace(api_source, match.end())
+    if api_source.startswith(')', position):
+        return APIFunctionSignature(function_name=match.group(1))
+    pattern_source, position = read_balanced(api_source, position)
+    if pattern_source is None:
+        return None
+    position = skip_whitespace(api_source, position)
+    if not api_source.startswith(':', position):
+        return None
+    type_source, position = read_balanced(api_source, skip_whitespace(api_source, position + 1))
+    if type_source is None or not api_source.startswith(')', skip_whitespace(api_source, position)):
+        return None
+
+    defaults: dict[str, Optional[str]] = {}
+    for item in split_top_level(pattern_source[1:-1], ','):
+        name, _, default = item.partition('=')
+        name = name.strip()
+        if not name.isidentifier():
+            return None
+        defaults[name] = default.strip() or None
+
+    params: list[APIFunctionParam] = []
+    for item in split_top_level(type_source[1:-1], ',;\n'):
+        name, colon, ts_type = item.partition(':')
+        optional = name.strip().endswith('?')
+        name = name.strip().rstrip('?').strip()
+        if not colon or not name.isidentifier() or not ts_type.strip():
+            return None
+        params.append(APIFunctionParam(name=name, ts_type=ts_type.strip(), optional=optional, default=defaults.get(name)))
+
+    if set(defaults) != {param.name for param in params}:
+        return None
+    # keep the order of the destructuring pattern
+    param_order = list(defaults)
+    params.sort(key=lambda param: param_order.index(param.name))
+    return APIFunctionSignature(function_name=match.group(1), params=params)
+
+
+def render_server_action(signature: APIFunctionSignature, api_module: str = '@/lib/backend-api') -> str:
+    """Render the server action of an api function, following the rules of `api_convert_system_prompt`. The api function is imported from `api_module`."""
+    action_params = [param for param in signature.params if param.name != 'accessToken']
+    type_names = sorted({
+        type_name
+        for param in action_params
+        for type_name in ts_type_name_pattern.findall(ts_string_literal_pattern.sub('""', param.ts_type))
+        if type_name not in ts_builtin_type_names
+    })
+
+    import_lines = [
+        f'import {{ {signature.function_name} }} from "{api_module}";',
+    ]
+    if signature.has_access_token:
+        import_lines.append('import { getAccessTokenAction } from "@/actions/get-access-token";')
+    if type_names:
+        import_lines.append(f'import {{ {", ".join(type_names)} }} from "@/types";')
+
+    if action_params:
+        pattern = ', '.join(param.name + (f" = {param.default}" if param.default else '') for param in action_params)
+        type_literal = '; '.join(f"{param.name}{'?' if param.optional else ''}: {param.ts_type}" for param in action_params)
+        action_params_source = f"{{ {pattern} }}: {{ {type_literal} }}"
+    else:
+        action_params_source = ''
+
+    body_lines = []
+    if signature.has_access_token:
+        body_lines.append('  const accessToken = await getAccessTokenAction();')
+        body_lines.append('  if (!accessToken) throw new Error("Not Authenticated");')
+    call_args = [param.name for param in signature.params]
+    if call_args:
+        body_lines.append(f'  const result = await {signature.function_name}({{')
+        body_lines.extend(f'    {arg},' for arg in call_args)
+        body_lines.append('  });')
+    else:
+        body_lines.append(f'  const result = await {signature.function_name}({{}});')
+    body_lines.append('  return result;')
+
+    return '\n'.join([
+        '"use server";',
+        '',
+        *import_lines,
+        '',
+        f'export const {signature.function_name}Action = async ({action_params_source}) => {{',
+        *body_lines,
+        '};',
+    ]) + '\n'
+
+
+def skip_whitespace(source: str, position: int) -> int:
+    while position < len(source) and source[position].isspace():
+        position += 1
+    return position
+
+
+def read_balanced(source: str, position: int) -> tuple[str | None, int]:
+    """Read the bracketed expression starting at `position`, returns (None, position) if it does not start with `{`."""
+    if not source.startswith('{', position):
+        return None, position
+    depth = 0
+    quote = None
+    for index in range(position, len(source)):
+        char = source[index]
+        if quote:
+            if char == quote and source[index - 1] != '\\':
+                quote = None
+        elif char in '"\'`':
+            quote = char
+        elif char in '{[(<':
+            depth += 1
+        elif char in '}])>' and not (char == '>' and source[index - 1] == '='):
+            depth -= 1
+            if depth == 0:
+                return source[position:index + 1], index + 1
+    return None, position
+
+
+def split_top_level(source: str, separators: str) -> list[str]:
+    """Split on the separators which are not nested in brackets or strings, empty items are dropped."""
+    items = []
+    depth = 0
+    quote = None
+    current = ''
+    for index, char in enumerate(source):
+        if quote:
+            if char == quote and source[index - 1] != '\\':
+                quote = None
+        elif char in '"\'`':
+            quote = char
+        elif char in '{[(<':
+            depth += 1
+        elif char in '}])>' and not (char == '>' and source[index - 1] == '='):
+            depth -= 1
+        elif char in separators and depth == 0:
+            items.append(current)
+            current = ''
+            continue
+        current += char
+    items.append(current)
+    return [item.strip() for item in items if item.strip()]
+
+
+__all__ = [
+    'APIFunctionSignature',
+    'parse_api_function_signature',
+    'render_server_action',
+]
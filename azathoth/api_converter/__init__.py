@@ -1,4 +1,6 @@
 from .schema import *
 from .file_api_converter import *
 from .function_api_converter import *
+from .function_api_batch_converter import *
 from .project_api_converter import *
+from .estimator import *
@@ -0,0 +1,84 @@
+from pathlib import Path
+
+from autom.engine import Request, Response, AgentWorker, AggregatorWorker, AutomSchema, Socket
+
+from azathoth.common import FilesContent
+from .schema import APIManifestUpdateParams
+from .manifest import APIManifestEntry, load_api_manifest, save_api_manifest
+
+
+class APIManifestUpdateParamsAggregator(AggregatorWorker):
+    @classmethod
+    def define_output_schema(cls) -> AutomSchema | None:
+        return APIManifestUpdateParams
+
+    @classmethod
+    def define_socket_list(cls) -> list[Socket]:
+        return [
+            Socket(
+                name='set_autom_backend_root_path',
+                input_type=Path,
+                socket_handler=cls._set_autom_backend_root_path,
+            ),
+            Socket(
+                name='set_autom_frontend_root_path',
+                input_type=Path,
+                socket_handler=cls._set_autom_frontend_root_path,
+            ),
+            Socket(
+                name='set_files_content',
+                input_type=FilesContent,
+                socket_handler=cls._set_files_content,
+            ),
+        ]
+
+    def _set_autom_backend_root_path(self, data: Path):
+        self._output_as_dict['autom_backend_root_path'] = data
+
+    def _set_autom_frontend_root_path(self, data: Path):
+        self._output_as_dict['autom_frontend_root_path'] = data
+
+    def _set_files_content(self, data: FilesContent):
+        self._output_as_dict['files_content'] = data
+
+
+class APIManifestUpdater(AgentWorker):
+    """Record the header hash of every api function whose frontend api file has been dumped, so that the next incremental run can skip it.
+
+    The header hash is the one planned(`FilesContent.source_stamps`), the header actually converted, not a re-parse of the source after the dump.
+    """
+    @classmethod
+    def define_input_schema(cls) -> AutomSchema | None:
+        return APIManifestUpdateParams
+
+    @classmethod
+    def define_output_schema(cls) -> AutomSchema | None:
+        return FilesContent
+
+    def invoke(self, req: Request) -> Response:
+        req_body: APIManifestUpdateParams = req.body
+        backend_repo_root = req_body.autom_backend_root_path
+        frontend_repo_root = req_body.autom_frontend_root_path
+
+        manifest = load_api_manifest(frontend_repo_root)
+        for dst_filepath in req_body.files_content.map:
+            source_stamp = req_body.files_content.source_stamps.get(dst_filepath)
+            if source_stamp is None or source_stamp.part is None:
+                continue
+            manifest.entries[dst_filepath.relative_to(frontend_repo_root).as_posix()] = APIManifestEntry(
+                src_relpath=source_stamp.src_filepath.relative_to(backend_repo_root).as_posix(),
+                function_name=source_stamp.part,
+                header_hash=source_stamp.content_hash,
+            )
+
+        save_api_manifest(frontend_repo_root, manifest)
+
+        return Response[FilesContent].from_worker(self).success(
+            body=req_body.files_content
+        )
+
+
+__all__ = [
+    'APIManifestUpdateParamsAggregator',
+    'APIManifestUpdater',
+]
@@ -0,0 +1,73 @@
+from azathoth.common import LLMRequestEstimate, get_llm_result_cache, get_run_journal
+from .schema import AutomProjectAPIConvertParams
+from .file_api_converter import plan_file_api_convert
+from .function_api_converter import FunctionAPIConverter, function_api_converter_model, api_run_journal_name, get_function_journal_key
+from .function_api_batch_converter import FunctionAPIBatchConverter, function_api_batch_converter_model, pack_function_batches
+from .function_signature_classifier import classify_function_signature
+from .project_api_converter import list_api_src_file_fullpaths, make_file_api_converter_input
+
+
+# a FunctionConvertKeyResult is a handful of short JSON fields
+estimated_key_result_tokens = 80
+
+
+def estimate_api_convert_requests(req_body: AutomProjectAPIConvertParams) -> list[LLMRequestEstimate]:
+    """The LLM requests AutomProjectAPIConverter would send for the api functions which can not be classified statically, batched as FunctionAPIBatchConverter does.
+
+    Only the enumerator and the planners run. Batched requests are assumed to extract every function of their batch.
+    """
+    journal = get_run_journal(req_body.autom_frontend_root_path, api_run_journal_name)
+    llm_cache = get_llm_result_cache() if req_body.use_llm_cache else None
+    request_estimates: list[LLMRequestEstimate] = []
+    seen_keys: set[str] = set()
+
+    def add_request_estimate(item: str, model: str, request_key: str, messages: list[dict], n_functions: int):
+        predicted_hit = None
+        if request_key in seen_keys:
+            predicted_hit = 'duplicate'
+        elif llm_cache is not None and llm_cache.contains(request_key):
+            predicted_hit = 'llm_cache'
+        seen_keys.add(request_key)
+        request_estimates.append(LLMRequestEstimate.from_messages(
+            'api', item, model, messages, n_functions * estimated_key_result_tokens, predicted_hit,
+        ))
+
+    for src_file_fullpath in list_api_src_file_fullpaths(req_body.autom_backend_root_path):
+        file_api_convert_plan = plan_file_api_convert(make_file_api_converter_input(req_body, src_file_fullpath))
+        src_relpath = src_file_fullpath.relative_to(req_body.autom_backend_root_path).as_posix()
+
+        llm_function_name_source_dict: dict[str, str] = {}
+        for function_name, function_source in file_api_convert_plan.function_name_source_dict.items():
+            signature = file_api_convert_plan.function_name_signature_dict.get(function_name)
+            if signature is not None and classify_function_signature(signature) is not None:
+                continue
+            if req_body.resume and journal.get(get_function_journal_key(req_body.autom_backend_root_path, src_file_fullpath, function_name, function_source)) is not None:
+                request_estimates.append(LLMRequestEstimate.from_messages(
+                    'api', f'{src_relpath}:{function_name}', function_api_converter_model,
+                    FunctionAPIConverter.get_messages(function_source), estimated_key_result_tokens, 'journal',
+                ))
+                continue
+            llm_function_name_source_dict[function_name] = function_source
+
+        batches = [[function_name] for function_name in llm_function_name_source_dict]
+        if req_body.max_functions_per_batch > 1:
+            batches = pack_function_batches(llm_function_name_source_dict, req_body.max_functions_per_batch, req_body.max_tokens_per_batch)
+        for batch in batches:
+            function_name_source_dict = {function_name: llm_function_name_source_dict[function_name] for function_name in batch}
+            if len(batch) == 1:
+                function_source = function_name_source_dict[batch[0]]
+                add_request_estimate(
+                    f'{src_relpath}:{batch[0]}', function_api_converter_model,
+                    FunctionAPIConverter.get_request_key(function_source), FunctionAPIConverter.get_messages(function_source), 1,
+                )
+            else:
+                add_request_estimate(
+                    f'{src_relpath}:{",".join(batch)}', function_api_batch_converter_model,
+                    FunctionAPIBatchConverter.get_batch_key(function_name_source_dict), FunctionAPIBatchConverter.get_messages(function_name_source_dict), len(batch),
+                )
+    return request_estimates
+
+
+__all__ = [
+    'estimate_api_convert_requests',
+]
@@ -1,14 +1,16 @@
-import inflection
 from autom.engine import (
-    AutomSchema, Request, Response,
-    AgentWorker, DispatchBridgeWorker, GraphAgentWorker, AutomGraph, Node, Link, 
+    AutomSchema, Request, Response, SocketCall, SocketRequestBody,
+    AgentWorker, PluggerWorker, DispatchBridgeWorker, GraphAgentWorker, AutomGraph, Node, Link, 
 )
+from autom.logger import autom_logger
 from autom.official import HolderAgentWorker, IdentityBridgeWorker
 
-from azathoth.common import FilesContentAggregator, FileContentFilesContentCollectPlugger
+from azathoth.common import FilesContentAggregator, FileContentFilesContentCollectPlugger, SourceStamp, sha256_text, get_llm_call_executor
 from ..ast_utils import extract_python_parts
 from .schema import *
-from .function_api_converter import FunctionAPIConverter
+from .manifest import load_api_manifest, get_router_name, get_function_api_dst_filepath
+from .function_api_converter import StreamingFunctionAPIConverter, prefetch_function_api_conversions
+from .function_api_batch_converter import FunctionAPIBatchConverter
 
 
 class FileAPIConvertPlanner(AgentWorker):
@@ -21,16 +23,56 @@ class FileAPIConvertPlanner(AgentWorker):
         return FileAPIConvertPlan
 
     def invoke(self, req: Request) -> Response:
-        req_body: FileAPIConverterInput = req.body
-        python_parts = extract_python_parts(file_path=req_body.src_file_fullpath, project_root=req_body.autom_backend_root_path)
-        return Response[FileAPIConvertPlan].from_worker(self).success(
-            body=FileAPIConvertPlan(
-                src_file_fullpath=req_body.src_file_fullpath,
-                autom_backend_root_path=req_body.autom_backend_root_path,
-                autom_frontend_root_path=req_body.autom_frontend_root_path,
-                function_name_source_dict=python_parts.get_function_name_source_dict(with_dependencies=False)
+        req_body: FileAPIConvertPlannerInput = req.body
+        return Response[FileAPIConvertPlan].from_worker(self).success(body=plan_file_api_convert(req_body))
+
+
+def plan_file_api_convert(req_body: FileAPIConvertPlannerInput) -> FileAPIConvertPlan:
+    """Plan the api functions of a router file to convert, what FileAPIConvertPlanner outputs."""
+    python_parts = extract_python_parts(file_path=req_body.src_file_fullpath, project_root=req_body.autom_backend_root_path)
+    function_name_source_dict = python_parts.get_function_name_source_dict(with_dependencies=False)
+    router_name = get_router_name(req_body.autom_backend_root_path, req_body.src_file_fullpath)
+    function_name_header_hash_dict = {
+        function_name: sha256_text(function_header)
+        for function_name, function_header in python_parts.function_name_header_dict.items()
+    }
+
+    if req_body.incremental:
+        # Only the function header matters to the frontend api, so body-only edits never trigger a reconversion
+        manifest = load_api_manifest(req_body.autom_frontend_root_path)
+        changed_function_name_source_dict: dict[str, str] = {}
+        for function_name, function_source in function_name_source_dict.items():
+            dst_filepath = get_function_api_dst_filepath(req_body.autom_frontend_root_path, router_name, function_name)
+            entry = manifest.entries.get(dst_filepath.relative_to(req_body.autom_frontend_root_path).as_posix())
+            if entry is None or entry.header_hash != function_name_header_hash_dict[function_name] or not dst_filepath.exists():
+                changed_function_name_source_dict[function_name] = function_source
+
+        autom_logger.info(f"[FileAPIConvertPlanner] Incremental plan of {req_body.src_file_fullpath.name}: {len(changed_function_name_source_dict)}/{len(function_name_source_dict)} functions to convert.")
+        function_name_source_dict = changed_function_name_source_dict
+
+    return FileAPIConvertPlan(
+        src_file_fullpath=req_body.src_file_fullpath,
+        autom_backend_root_path=req_body.autom_backend_root_path,
+        autom_frontend_root_path=req_body.autom_frontend_root_path,
+        function_name_source_dict=function_name_source_dict,
+        function_name_signature_dict={
+            function_name: python_parts.function_name_signature_dict[function_name]
+            for function_name in function_name_source_dict
+        },
+        max_functions_per_batch=req_body.max_functions_per_batch,
+        max_tokens_per_batch=req_body.max_tokens_per_batch,
+        use_llm_cache=req_body.use_llm_cache,
+        max_llm_concurrency=req_body.max_llm_concurrency,
+        resume=req_body.resume,
+        source_stamps={
+            get_function_api_dst_filepath(req_body.autom_frontend_root_path, router_name, function_name): SourceStamp(
+                src_filepath=req_body.src_file_fullpath,
+                part=function_name,
+                content_hash=function_name_header_hash_dict[function_name],
             )
-        )
+            for function_name in function_name_source_dict
+        },
+    )
 
 
 class FileAPIConverter(GraphAgentWorker):
@@ -41,19 +83,25 @@ class FileAPIConverter(GraphAgentWorker):
         entry_node = Node.from_worker(HolderAgentWorker().with_schema(FileAPIConverterInput))
         entry_planner_bridge = Link.from_worker(IdentityBridgeWorker())
         planner = Node.from_worker(FileAPIConvertPlanner())
-        planner_function_api_converter_dispatch_bridge = Link.from_worker(PlannerFunctionAPIConverterDispatchBridgeWorker())
-        function_api_converter = Node.from_worker(FunctionAPIConverter())
+        planner_batch_converter_bridge = Link.from_worker(IdentityBridgeWorker())
+        batch_converter = Node.from_worker(FunctionAPIBatchConverter())
+        batch_converter_function_api_converter_dispatch_bridge = Link.from_worker(PlannerFunctionAPIConverterDispatchBridgeWorker())
+        function_api_converter = Node.from_worker(StreamingFunctionAPIConverter())
         function_api_converter_exit_collect_plugger = Link.from_worker(FileContentFilesContentCollectPlugger())
+        planner_exit_plugger = Link.from_worker(FileAPIConvertPlanSourceStampsPlugger())
         exit_aggregator = Node.from_worker(FilesContentAggregator())
 
         graph.add_node(entry_node)
         graph.add_node(planner)
+        graph.add_node(batch_converter)
         graph.add_node(function_api_converter)
         graph.add_node(exit_aggregator)
 
         graph.bridge(entry_node, planner, entry_planner_bridge)
-        graph.bridge(planner, function_api_converter, planner_function_api_converter_dispatch_bridge)
+        graph.bridge(planner, batch_converter, planner_batch_converter_bridge)
+        graph.bridge(batch_converter, function_api_converter, batch_converter_function_api_converter_dispatch_bridge)
         graph.plug(function_api_converter, exit_aggregator, function_api_converter_exit_collect_plugger)
+        graph.plug(planner, exit_aggregator, planner_exit_plugger)
 
         graph.set_entry_node(entry_node)
         graph.set_exit_node(exit_aggregator)
@@ -74,18 +122,46 @@ class PlannerFunctionAPIConverterDispatchBridgeWorker(DispatchBridgeWorker):
         req_body: FileAPIConvertPlan = req.body
         batch_responses: dict[int, Response[FunctionAPIConverterInput]] = {}
         
-        router_name = req_body.src_file_fullpath.stem
+        router_name = get_router_name(req_body.autom_backend_root_path, req_body.src_file_fullpath)
 
         for function_name, function_source in req_body.function_name_source_dict.items():
             batch_responses[len(batch_responses)] = Response[FunctionAPIConverterInput].from_worker(self).success(
                 body=FunctionAPIConverterInput(
                     api_function_name=function_name,
                     api_function_source=function_source,
+                    api_function_signature=req_body.function_name_signature_dict.get(function_name),
+                    api_function_key_result=req_body.function_name_key_result_dict.get(function_name),
                     src_file_fullpath=req_body.src_file_fullpath,
-                    dst_file_fullpath=req_body.autom_frontend_root_path / f"lib/apis/{router_name}/{inflection.camelize(function_name, uppercase_first_letter=False)}.ts",
+                    dst_file_fullpath=get_function_api_dst_filepath(req_body.autom_frontend_root_path, router_name, function_name),
                     autom_backend_root_path=req_body.autom_backend_root_path,
                     autom_frontend_root_path=req_body.autom_frontend_root_path,
+                    use_llm_cache=req_body.use_llm_cache,
+                    resume=req_body.resume,
                 )
             )
 
+        if req_body.max_llm_concurrency > 1:
+            get_llm_call_executor().configure(req_body.max_llm_concurrency)
+            prefetch_function_api_conversions([response.body for response in batch_responses.values()])
+
         return batch_responses
+
+
+class FileAPIConvertPlanSourceStampsPlugger(PluggerWorker):
+    """Merge the source stamps of the plan into the converted files, for the api manifest."""
+    @classmethod
+    def define_input_schema(cls) -> AutomSchema | None:
+        return FileAPIConvertPlan
+
+    def invoke(self, req: Request) -> Response:
+        req_body: FileAPIConvertPlan = req.body
+        return Response[SocketRequestBody].from_worker(self).success(
+            body=SocketRequestBody(
+                calls=[
+                    SocketCall(
+                        socket_name="update_source_stamps",
+                        data=req_body.source_stamps,
+                    ),
+                ]
+            )
+        )
@@ -0,0 +1,188 @@
+from autom.logger import autom_logger
+from autom.utils import SingleLLMUsage
+from autom.official import BaseOpenAIWorker
+from autom.engine import AgentWorker, AutomSchema, Request, Response
+
+from azathoth.common import make_llm_cache_key, get_llm_result_cache, get_llm_call_executor, get_openai_client, parse_chat_completion, estimate_tokens, get_run_journal, LLMUsageLabel, LLMBudgetExceeded
+from .schema import FileAPIConvertPlan, FunctionConvertKeyResult, FunctionConvertKeyResultBatch
+from .prompt import (
+    function_api_batch_converter_system_prompt, function_api_batch_converter_user_input_prompt,
+    function_api_batch_converter_function_source_prompt,
+)
+from .function_signature_classifier import classify_function_signature, ignored_other_params
+from .function_api_converter import api_run_journal_name, get_function_journal_key
+from .manifest import get_router_name
+
+
+function_api_batch_converter_model = "gpt-4o-mini"
+
+
+class FunctionAPIBatchConverter(BaseOpenAIWorker, AgentWorker):
+    """Extract the key results of several api functions of a router with one LLM request, the functions missing from its output are left to FunctionAPIConverter."""
+    @classmethod
+    def define_input_schema(cls) -> AutomSchema | None:
+        return FileAPIConvertPlan
+
+    @classmethod
+    def define_output_schema(cls) -> AutomSchema | None:
+        return FileAPIConvertPlan
+
+    def invoke(self, req: Request) -> Response:
+        req_body: FileAPIConvertPlan = req.body
+        resp = Response[FileAPIConvertPlan].from_worker(self)
+        if req_body.max_functions_per_batch <= 1:
+            return resp.success(body=req_body)
+
+        journal = get_run_journal(req_body.autom_frontend_root_path, api_run_journal_name)
+        function_name_journal_key_dict = {
+            function_name: get_function_journal_key(req_body.autom_backend_root_path, req_body.src_file_fullpath, function_name, function_source)
+            for function_name, function_source in req_body.function_name_source_dict.items()
+        }
+        function_name_key_result_dict = dict(req_body.function_name_key_result_dict)
+        llm_function_names: list[str] = []
+        for function_name in req_body.function_name_source_dict:
+            signature = req_body.function_name_signature_dict.get(function_name)
+            if signature is not None and classify_function_signature(signature) is not None:
+                continue
+            recorded = journal.get(function_name_journal_key_dict[function_name]) if req_body.resume else None
+            if recorded is not None:
+                function_name_key_result_dict[function_name] = FunctionConvertKeyResult.model_validate(recorded)
+            else:
+                llm_function_names.append(function_name)
+        batches = [
+            batch for batch in pack_function_batches(
+                {function_name: req_body.function_name_source_dict[function_name] for function_name in llm_function_names},
+                req_body.max_functions_per_batch,
+                req_body.max_tokens_per_batch,
+            )
+            # a single function is converted alone anyway
+            if len(batch) > 1
+        ]
+
+        executor = get_llm_call_executor()
+        src_file_relpath = req_body.src_file_fullpath.relative_to(req_body.autom_backend_root_path).as_posix()
+        batch_keys = []
+        n_extracted_functions = 0
+        for batch in batches:
+            function_name_source_dict = {function_name: req_body.function_name_source_dict[function_name] for function_name in batch}
+            usage_label = LLMUsageLabel(stage='api', filepath=src_file_relpath, router=get_router_name(req_body.autom_backend_root_path, req_body.src_file_fullpath), functions=batch)
+            batch_key = self.get_batch_key(function_name_source_dict)
+            executor.submit(batch_key, lambda function_name_source_dict=function_name_source_dict, usage_label=usage_label: self.convert_batch(function_name_source_dict, req_body.use_llm_cache, usage_label))
+            batch_keys.append((batch_key, function_name_source_dict, usage_label))
+
+        for batch_key, function_name_source_dict, usage_label in batch_keys:
+            try:
+                key_results, llm_usage = executor.result(batch_key, lambda function_name_source_dict=function_name_source_dict, usage_label=usage_label: self.convert_batch(function_name_source_dict, req_body.use_llm_cache, usage_label))
+            except LLMBudgetExceeded:
+                raise
+            except Exception as e:
+                autom_logger.warning(f"[FunctionAPIBatchConverter] Batched request failed({e}), {len(function_name_source_dict)} functions will be converted one by one.")
+                continue
+            if llm_usage is not None:
+                resp.add_llm_usage(llm_usage)
+            n_extracted_functions += len(key_results)
+            function_name_key_result_dict.update(key_results)
+            for function_name, key_result in key_results.items():
+                journal.record(function_name_journal_key_dict[function_name], key_result.model_dump())
+
+        n_batched_functions = sum(len(batch) for batch in batches)
+        if batches:
+            autom_logger.info(f"[FunctionAPIBatchConverter] {req_body.src_file_fullpath.name}: {n_extracted_functions}/{n_batched_functions} functions extracted by {len(batches)} batched requests.")
+
+        return resp.success(body=req_body.model_copy(update={'function_name_key_result_dict': function_name_key_result_dict}))
+
+    @classmethod
+    def get_batch_key(cls, function_name_source_dict: dict[str, str]) -> str:
+        return make_llm_cache_key(
+            function_api_batch_converter_model,
+            function_api_batch_converter_system_prompt,
+            function_api_batch_converter_user_input_prompt,
+            function_api_batch_converter_function_source_prompt,
+            *(part for item in function_name_source_dict.items() for part in item),
+        )
+
+    @classmethod
+    def get_messages(cls, function_name_source_dict: dict[str, str]) -> list[dict]:
+        return [
+            {"role": "system", "content": function_api_batch_converter_system_prompt.format()},
+            {"role": "user", "content": function_api_batch_converter_user_input_prompt.format(
+                api_function_sources="\n\n".join(
+                    function_api_batch_converter_function_source_prompt.format(
+                        api_function_name=function_name,
+                        api_function_source=function_source,
+                    )
+                    for function_name, function_source in function_name_source_dict.items()
+                ),
+            )},
+        ]
+
+    def convert_batch(self, function_name_source_dict: dict[str, str], use_llm_cache: bool = True, usage_label: LLMUsageLabel | None = None) -> tuple[dict[str, FunctionConvertKeyResult], SingleLLMUsage | None]:
+        """Extract the key results of a batch of functions, through the LLM result cache if enabled. Only the valid results of the requested functions are returned, the usage is None on a cache hit."""
+        llm_cache = get_llm_result_cache() if use_llm_cache else None
+        cache_key = self.get_batch_key(function_name_source_dict)
+        cached = llm_cache.get(cache_key) if llm_cache is not None else None
+        if cached is not None:
+            return {function_name: FunctionConvertKeyResult.model_validate(key_result) for function_name, key_result in cached.items()}, None
+
+        chat_completion = parse_chat_completion(
+            get_openai_client(self),
+            model=function_api_batch_converter_model,
+            messages=self.get_messages(function_name_source_dict),
+            response_format=FunctionConvertKeyResultBatch,
+            usage_label=usage_label,
+        )
+        llm_usage = SingleLLMUsage.from_openai_chat_completion(chat_completion)
+        parsed: FunctionConvertKeyResultBatch | None = chat_completion.choices[0].message.parsed
+        if parsed is None:
+            autom_logger.warning(f"[FunctionAPIBatchConverter] Failed to parse the batched response, {len(function_name_source_dict)} functions will be converted one by one.")
+            return {}, llm_usage
+
+        key_results: dict[str, FunctionConvertKeyResult] = {}
+        for named_result in parsed.results:
+            if named_result.function_name not in function_name_source_dict or named_result.function_name in key_results:
+                continue
+            key_result = FunctionConvertKeyResult.model_validate(named_result.model_dump(exclude={'function_name'}))
+            if not is_valid_key_result(key_result):
+                continue
+            if key_result.other_params:
+                key_result.other_params = {k: v for k, v in key_result.other_params.items() if k not in ignored_other_params}
+            key_results[named_result.function_name] = key_result
+        # a batch extracting nothing is retried function by function, it is not worth caching
+        if llm_cache is not None and key_results:
+            llm_cache.set(cache_key, {function_name: key_result.model_dump() for function_name, key_result in key_results.items()})
+        return key_results, llm_usage
+
+
+def is_valid_key_result(key_result: FunctionConvertKeyResult) -> bool:
+    """Whether a key result is consistent enough to generate the frontend code from."""
+    if not key_result.api_suffix_route.startswith('/'):
+        return False
+    if key_result.has_response_model and not key_result.response_model:
+        return False
+    if key_result.has_body_data and not key_result.body_data_type:
+        return False
+    return True
+
+
+def pack_function_batches(function_name_source_dict: dict[str, str], max_functions: int, max_tokens: int) -> list[list[str]]:
+    """Pack functions into batches in order, each of at most `max_functions` functions and `max_tokens` estimated source tokens."""
+    batches: list[list[str]] = []
+    current: list[str] = []
+    current_tokens = 0
+    for function_name, function_source in function_name_source_dict.items():
+        n_tokens = estimate_tokens(function_source)
+        if current and (len(current) >= max_functions or current_tokens + n_tokens > max_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(function_name)
+        current_tokens += n_tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+__all__ = [
+    'function_api_batch_converter_model',
+    'FunctionAPIBatchConverter',
+    'pack_function_batches',
+]
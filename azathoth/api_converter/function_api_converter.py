@@ -1,18 +1,27 @@
-import re
+import threading
+from pathlib import Path
 
+from autom.logger import autom_logger
 from autom.utils import SingleLLMUsage
-from autom.official import BaseOpenAIWorker
-from autom.engine import AgentWorker, AutomSchema, Request, Response
+from autom.official import BaseOpenAIWorker, HolderAgentWorker, IdentityBridgeWorker
+from autom.engine import AgentWorker, GraphAgentWorker, AutomGraph, AutomSchema, Node, Link, Request, Response
 
-from azathoth.common import FileContent
+from azathoth.common import (
+    FileContent, FileContentStreamer, make_llm_cache_key, get_llm_result_cache, get_llm_call_executor, get_openai_client, parse_chat_completion,
+    get_run_journal, make_journal_key, sha256_text, ConvertFailure, LLMUsageLabel, LLMBudgetExceeded,
+)
 from .schema import FunctionAPIConverterInput, FunctionConvertKeyResult
 from .prompt import function_api_converter_system_prompt, function_api_converter_user_input_prompt
+from .function_signature_classifier import classify_function_signature, ignored_other_params
+from .manifest import get_router_name
 
 
-ignored_other_params = set(['db', 'body_data', 'current_user', 'weaviate_client', 'background_tasks'])
+function_api_converter_model = "gpt-4o-mini"
+api_run_journal_name = 'api'
 
 
 class FunctionAPIConverter(BaseOpenAIWorker, AgentWorker):
+    """Convert a backend api function to a frontend api file, the LLM only extracts the key results which can not be built statically."""
     @classmethod
     def define_input_schema(cls) -> AutomSchema | None:
         return FunctionAPIConverterInput
@@ -23,43 +32,173 @@ class FunctionAPIConverter(BaseOpenAIWorker, AgentWorker):
 
     def invoke(self, req: Request) -> Response:
         req_body: FunctionAPIConverterInput = req.body
-        api_function_source = req_body.api_function_source
-        src_relpath = req_body.src_file_fullpath.relative_to(req_body.autom_backend_root_path)
-        match = re.search(r'app/api/v1/endpoints/(.+)\.py$', str(src_relpath))
-        if match:
-            router_name = match.group(1)
-        else:
-            raise RuntimeError(f"Failed to extract router name from source file path: {src_relpath}")
+        router_name = get_router_name(req_body.autom_backend_root_path, req_body.src_file_fullpath)
 
         resp = Response[FileContent].from_worker(self)
-        chat_completion = self.openai_client.beta.chat.completions.parse(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": function_api_converter_system_prompt.format()},
-                    {"role": "user", "content": function_api_converter_user_input_prompt.format(
-                        api_function_source=api_function_source,
-                    )},
-                ],
-                response_format=FunctionConvertKeyResult,
+        key_result = req_body.api_function_key_result
+        if key_result is None and req_body.api_function_signature is not None:
+            key_result = classify_function_signature(req_body.api_function_signature)
+        if key_result is None:
+            journal = get_run_journal(req_body.autom_frontend_root_path, api_run_journal_name)
+            journal_key = get_function_journal_key(
+                req_body.autom_backend_root_path, req_body.src_file_fullpath,
+                req_body.api_function_name, req_body.api_function_source,
             )
-        resp.add_llm_usage(SingleLLMUsage.from_openai_chat_completion(chat_completion))
-        parsed = chat_completion.choices[0].message.parsed
-        if parsed is None:
-            raise RuntimeError(f"Failed to parse the response from OpenAI: {chat_completion.choices[0].message}. Request: {req}")
-
-        if parsed.other_params:
-            parsed.other_params = {k: v for k, v in parsed.other_params.items() if k not in ignored_other_params}
+            recorded = journal.get(journal_key) if req_body.resume else None
+            if recorded is not None:
+                key_result = FunctionConvertKeyResult.model_validate(recorded)
+            else:
+                try:
+                    key_result, llm_usage = get_llm_call_executor().result(
+                        self.get_request_key(req_body.api_function_source),
+                        lambda: self.convert_by_llm(req_body.api_function_source, req_body.use_llm_cache, self.get_usage_label(req_body)),
+                    )
+                except LLMBudgetExceeded:
+                    raise
+                except Exception as e:
+                    autom_logger.error(f"[FunctionAPIConverter] Failed to convert {router_name}.{req_body.api_function_name}: {e}")
+                    resp.body = FileContent(
+                        filepath=req_body.dst_file_fullpath,
+                        content='',
+                        failure=ConvertFailure.from_exception(f'function {router_name}.{req_body.api_function_name}', e, req_body.dst_file_fullpath),
+                    )
+                    return resp.success()
+                if llm_usage is not None:
+                    resp.add_llm_usage(llm_usage)
+                journal.record(journal_key, key_result.model_dump())
 
         resp.body = FileContent(
             filepath=req_body.dst_file_fullpath,
-            content=parsed.to_frontend_code(
+            content=key_result.to_frontend_code(
                 router_name=router_name,
                 function_name=req_body.api_function_name,
             ),
         )
         return resp.success()
 
+    def prefetch(self, req_body: FunctionAPIConverterInput):
+        """Start extracting the key result by the LLM in the background if it is needed, a later `invoke` with the same params collects the result."""
+        if req_body.api_function_key_result is not None:
+            return
+        if req_body.api_function_signature is not None and classify_function_signature(req_body.api_function_signature) is not None:
+            return
+        if req_body.resume and get_run_journal(req_body.autom_frontend_root_path, api_run_journal_name).get(get_function_journal_key(
+            req_body.autom_backend_root_path, req_body.src_file_fullpath, req_body.api_function_name, req_body.api_function_source,
+        )) is not None:
+            return
+        get_llm_call_executor().submit(
+            self.get_request_key(req_body.api_function_source),
+            lambda: self.convert_by_llm(req_body.api_function_source, req_body.use_llm_cache, self.get_usage_label(req_body)),
+        )
+
+    def convert_by_llm(self, function_source: str, use_llm_cache: bool = True, usage_label: LLMUsageLabel | None = None) -> tuple[FunctionConvertKeyResult, SingleLLMUsage | None]:
+        """Extract the key result of the function by the LLM, through the LLM result cache if enabled. The usage is None on a cache hit."""
+        llm_cache = get_llm_result_cache() if use_llm_cache else None
+        cache_key = self.get_request_key(function_source)
+        cached = llm_cache.get(cache_key) if llm_cache is not None else None
+        if cached is not None:
+            return FunctionConvertKeyResult.model_validate(cached), None
+
+        chat_completion = parse_chat_completion(
+            get_openai_client(self),
+            model=function_api_converter_model,
+            messages=self.get_messages(function_source),
+            response_format=FunctionConvertKeyResult,
+            usage_label=usage_label,
+        )
+        llm_usage = SingleLLMUsage.from_openai_chat_completion(chat_completion)
+        parsed = chat_completion.choices[0].message.parsed
+        if parsed is None:
+            raise RuntimeError(f"Failed to parse the response from OpenAI: {chat_completion.choices[0].message}.")
+
+        if parsed.other_params:
+            parsed.other_params = {k: v for k, v in parsed.other_params.items() if k not in ignored_other_params}
+        if llm_cache is not None:
+            llm_cache.set(cache_key, parsed.model_dump())
+        return parsed, llm_usage
+
+    @classmethod
+    def get_usage_label(cls, req_body: FunctionAPIConverterInput) -> LLMUsageLabel:
+        return LLMUsageLabel(
+            stage='api',
+            filepath=req_body.src_file_fullpath.relative_to(req_body.autom_backend_root_path).as_posix(),
+            router=get_router_name(req_body.autom_backend_root_path, req_body.src_file_fullpath),
+            functions=[req_body.api_function_name],
+        )
+
+    @classmethod
+    def get_request_key(cls, function_source: str) -> str:
+        return make_llm_cache_key(
+            function_api_converter_model,
+            function_api_converter_system_prompt,
+            function_api_converter_user_input_prompt,
+            function_source,
+        )
+
+    @classmethod
+    def get_messages(cls, function_source: str) -> list[dict]:
+        return [
+            {"role": "system", "content": function_api_converter_system_prompt.format()},
+            {"role": "user", "content": function_api_converter_user_input_prompt.format(
+                api_function_source=function_source,
+            )},
+        ]
+
+
+def get_function_journal_key(backend_root_path: Path, src_file_fullpath: Path, function_name: str, function_source: str) -> str:
+    """The key of an api function's key result in the `api` run journal."""
+    return make_journal_key(
+        'function',
+        src_file_fullpath.relative_to(backend_root_path).as_posix(),
+        function_name,
+        sha256_text(function_source),
+    )
+
+
+class StreamingFunctionAPIConverter(GraphAgentWorker):
+    """FunctionAPIConverter followed by the FileContentStreamer, so the api file is dumped as soon as it is converted in streaming mode."""
+    @classmethod
+    def define_graph(cls) -> AutomGraph:
+        graph = AutomGraph()
+
+        entry_node = Node.from_worker(HolderAgentWorker().with_schema(FunctionAPIConverterInput))
+        entry_function_api_converter_bridge = Link.from_worker(IdentityBridgeWorker())
+        function_api_converter = Node.from_worker(FunctionAPIConverter())
+        function_api_converter_streamer_bridge = Link.from_worker(IdentityBridgeWorker())
+        streamer = Node.from_worker(FileContentStreamer())
+
+        graph.add_node(entry_node)
+        graph.add_node(function_api_converter)
+        graph.add_node(streamer)
+
+        graph.bridge(entry_node, function_api_converter, entry_function_api_converter_bridge)
+        graph.bridge(function_api_converter, streamer, function_api_converter_streamer_bridge)
+
+        graph.set_entry_node(entry_node)
+        graph.set_exit_node(streamer)
+
+        return graph
+
+
+_prefetch_worker: FunctionAPIConverter | None = None
+_prefetch_worker_lock = threading.Lock()
+
+
+def prefetch_function_api_conversions(params_list: list[FunctionAPIConverterInput]):
+    """Submit the LLM extraction of every function which needs it to the shared LLMCallExecutor."""
+    global _prefetch_worker
+    with _prefetch_worker_lock:
+        if _prefetch_worker is None:
+            _prefetch_worker = FunctionAPIConverter()
+    for params in params_list:
+        _prefetch_worker.prefetch(params)
+
 
 __all__ = [
+    'function_api_converter_model',
+    'api_run_journal_name',
     'FunctionAPIConverter',
+    'StreamingFunctionAPIConverter',
+    'get_function_journal_key',
+    'prefetch_function_api_conversions',
 ]
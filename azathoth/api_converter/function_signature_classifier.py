@@ -0,0 +1,115 @@
+import re
+import ast
+import string
+
+import inflection
+
+from ..ast_utils import FunctionSignatureInfo
+from .schema import FunctionConvertKeyResult, camel_to_snake
+
+
+route_decorator_pattern = re.compile(r'^\w+\.(get|post|put|patch|delete)$')
+type_name_pattern = re.compile(r'^[A-Za-z_][\w\.]*(\[[\w\.\[\], ]+\])?$')
+ignored_other_params = set(['db', 'body_data', 'current_user', 'weaviate_client', 'background_tasks'])
+builtin_generic_types = set(['list', 'List', 'dict', 'Dict', 'set', 'Set', 'tuple', 'Tuple', 'Optional', 'Union', 'Any'])
+other_param_type_map = {
+    'str': 'string',
+    'int': 'number',
+    'float': 'number',
+    'bool': 'boolean',
+}
+
+
+def classify_function_signature(signature: FunctionSignatureInfo) -> FunctionConvertKeyResult | None:
+    """Build the FunctionConvertKeyResult of a FastAPI endpoint statically from its signature.
+
+    This follows the same rules as `function_api_converter_system_prompt`. Returns None if the signature can not be classified with confidence, the caller should fall back to the LLM then.
+    """
+    if signature.has_var_params:
+        return None
+
+    route_decorators = [decorator for decorator in signature.decorators if route_decorator_pattern.match(decorator.name)]
+    if len(route_decorators) != 1:
+        return None
+    route_decorator = route_decorators[0]
+
+    # Rule 1: api_suffix_route
+    route_source = route_decorator.args[0] if route_decorator.args else route_decorator.kwargs.get('path')
+    api_suffix_route = _literal_str(route_source)
+    if api_suffix_route is None:
+        return None
+    if not api_suffix_route.startswith('/'):
+        api_suffix_route = '/' + api_suffix_route
+
+    # Rule 2 & 3: response_model
+    response_model = route_decorator.kwargs.get('response_model')
+    if response_model == 'None':
+        response_model = None
+    if response_model is not None and not _is_schema_type(response_model):
+        return None
+
+    # Rule 4 ~ 7: params
+    body_data_type = None
+    has_current_user = False
+    other_params: dict[str, str] = {}
+    for param in signature.params:
+        if param.name == 'body_data':
+            if param.annotation is None or not _is_schema_type(param.annotation):
+                return None
+            body_data_type = param.annotation
+        elif param.name == 'current_user':
+            has_current_user = True
+        elif param.name in ignored_other_params:
+            continue
+        else:
+            # unknown injected dependencies are left to the LLM
+            if param.default is not None and param.default.startswith('Depends('):
+                return None
+            param_type = other_param_type_map.get(param.annotation)
+            if param_type is None:
+                return None
+            param_key = inflection.camelize(param.name, uppercase_first_letter=False)
+            if camel_to_snake(param_key) != param.name:
+                return None
+            other_params[param_key] = param_type
+
+    # every route placeholder must be filled by an other param
+    try:
+        placeholders = [field_name for _, field_name, _, _ in string.Formatter().parse(api_suffix_route) if field_name is not None]
+    except ValueError:
+        return None
+    if any(placeholder not in {camel_to_snake(param_key) for param_key in other_params} for placeholder in placeholders):
+        return None
+
+    return FunctionConvertKeyResult(
+        api_suffix_route=api_suffix_route,
+        has_response_model=response_model is not None,
+        response_model=response_model,
+        has_body_data=body_data_type is not None,
+        body_data_type=body_data_type,
+        has_current_user=has_current_user,
+        other_params=other_params or None,
+    )
+
+
+def _literal_str(source: str | None) -> str | None:
+    if source is None:
+        return None
+    try:
+        value = ast.literal_eval(source)
+    except (ValueError, SyntaxError):
+        return None
+    return value if isinstance(value, str) else None
+
+
+def _is_schema_type(type_source: str) -> bool:
+    """Whether the type is a (possibly generic) schema class, e.g. `UserSafe` or `PaginatedSearchResult[UserSafe]`."""
+    if not type_name_pattern.match(type_source):
+        return False
+    type_names = [name.strip(' ]') for name in re.split(r'[\[,]', type_source)]
+    return all(name and name not in builtin_generic_types and name[0].isupper() for name in type_names)
+
+
+__all__ = [
+    'classify_function_signature',
+]
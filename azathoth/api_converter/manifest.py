@@ -0,0 +1,63 @@
+import os
+import re
+from pathlib import Path
+
+import inflection
+from pydantic import BaseModel, Field
+
+from azathoth.common import get_state_dir, load_state_json, dump_state_json
+
+
+api_manifest_filename = 'api-manifest.json'
+
+
+class APIManifestEntry(BaseModel):
+    """The header hash of an api function at the last successful dump of its frontend api file."""
+    src_relpath: str = Field(..., description="Endpoint source path relative to the backend root, in posix form")
+    function_name: str
+    header_hash: str = Field(..., description="sha256 of the function header(decorators, signature and docstring)")
+
+
+class APIManifest(BaseModel):
+    entries: dict[str, APIManifestEntry] = Field(default_factory=dict, description="Manifest entries keyed by the frontend api file path relative to the frontend root")
+
+
+def get_api_manifest_path(autom_frontend_root_path: os.PathLike) -> Path:
+    return get_state_dir(autom_frontend_root_path) / api_manifest_filename
+
+
+def load_api_manifest(autom_frontend_root_path: os.PathLike) -> APIManifest:
+    data = load_state_json(get_api_manifest_path(autom_frontend_root_path), default={})
+    try:
+        return APIManifest.model_validate(data)
+    except ValueError:
+        return APIManifest()
+
+
+def save_api_manifest(autom_frontend_root_path: os.PathLike, manifest: APIManifest):
+    dump_state_json(get_api_manifest_path(autom_frontend_root_path), manifest.model_dump(mode='json'))
+
+
+def get_router_name(autom_backend_root_path: Path, src_file_fullpath: Path) -> str:
+    """Get the router name of a backend endpoint file, its path under /app/api/v1/endpoints without suffix, e.g. `admin/users`."""
+    src_relpath = src_file_fullpath.relative_to(autom_backend_root_path).as_posix()
+    match = re.search(r'app/api/v1/endpoints/(.+)\.py$', src_relpath)
+    if match is None:
+        raise RuntimeError(f"Failed to extract router name from source file path: {src_relpath}")
+    return match.group(1)
+
+
+def get_function_api_dst_filepath(autom_frontend_root_path: Path, router_name: str, function_name: str) -> Path:
+    """Get the frontend api file path of a backend api function: `lib/apis/{router}/{fn}.ts`"""
+    return autom_frontend_root_path / f"lib/apis/{router_name}/{inflection.camelize(function_name, uppercase_first_letter=False)}.ts"
+
+
+__all__ = [
+    'APIManifestEntry',
+    'APIManifest',
+    'get_api_manifest_path',
+    'load_api_manifest',
+    'save_api_manifest',
+    'get_router_name',
+    'get_function_api_dst_filepath',
+]
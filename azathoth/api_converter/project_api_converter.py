@@ -1,3 +1,5 @@
+from pathlib import Path
+
 from autom.engine import (
     AutomSchema, Request, Response, SocketCall, SocketRequestBody,
     AgentWorker, PluggerWorker, DispatchBridgeWorker, GraphAgentWorker, AutomGraph, Node, Link,
@@ -7,9 +9,12 @@ from autom.official import HolderAgentWorker, IdentityBridgeWorker, NullPlugger
 
 from azathoth.common import (
     TSExportHelperInputAggregator, FilesDumper,
-    FilesContentFilesContentCollectPlugger, FilesContentAggregator, TSExportHerlper, FilesContentFilesContentPlugger,
+    FilesContentFilesContentCollectPlugger, FilesContentAggregator, TSExportHerlper, TSExportSignaturesSaver, FilesContentFilesContentPlugger,
+    FilesContent, get_files_stream_writer, open_run_journal,
 )
-from .file_api_converter import FileAPIConverter
+from .file_api_converter import FileAPIConverter, plan_file_api_convert
+from .function_api_converter import api_run_journal_name
+from .api_manifest_updater import APIManifestUpdateParamsAggregator, APIManifestUpdater
 from .schema import AutomProjectAPIConvertParams, EnumeratedFiles, FileAPIConverterInput, FileEnumeratorInput
 
 
@@ -53,32 +58,46 @@ class AutomProjectAPIConverter(GraphAgentWorker):
         inner_api_converter_api_files_dumper_bridge = Link.from_worker(IdentityBridgeWorker())
         api_files_dumper = Node.from_worker(FilesDumper())
         api_files_dumper_ts_export_aggregator_plugger = Link.from_worker(NullPlugger())
-        api_files_dumper_exit_plugger = Link.from_worker(FilesContentFilesContentPlugger())
+        api_files_dumper_manifest_aggregator_plugger = Link.from_worker(FilesContentAPIManifestUpdaterPlugger())
+        entry_manifest_aggregator_plugger = Link.from_worker(APIConverterManifestUpdaterPlugger())
+        manifest_aggregator = Node.from_worker(APIManifestUpdateParamsAggregator())
+        manifest_aggregator_manifest_updater_bridge = Link.from_worker(IdentityBridgeWorker())
+        manifest_updater = Node.from_worker(APIManifestUpdater())
+        manifest_updater_exit_plugger = Link.from_worker(FilesContentFilesContentPlugger())
         entry_ts_export_aggregator_plugger = Link.from_worker(APIConverterTSExportHelperPlugger())
         ts_export_aggregator = Node.from_worker(TSExportHelperInputAggregator())
         ts_export_aggregator_ts_export_helper_bridge = Link.from_worker(IdentityBridgeWorker())
         ts_export_helper = Node.from_worker(TSExportHerlper())
         ts_export_helper_index_files_dumper_bridge = Link.from_worker(IdentityBridgeWorker())
         index_files_dumper = Node.from_worker(FilesDumper())
-        index_files_dumper_exit_plugger = Link.from_worker(FilesContentFilesContentPlugger())
+        index_files_dumper_signatures_saver_bridge = Link.from_worker(IdentityBridgeWorker())
+        signatures_saver = Node.from_worker(TSExportSignaturesSaver())
+        signatures_saver_exit_plugger = Link.from_worker(FilesContentFilesContentPlugger())
         exit_aggregator = Node.from_worker(FilesContentAggregator())
 
         graph.add_node(entry_node)
         graph.add_node(inner_api_converter)
         graph.add_node(api_files_dumper)        
+        graph.add_node(manifest_aggregator)
+        graph.add_node(manifest_updater)
         graph.add_node(ts_export_aggregator)
         graph.add_node(ts_export_helper)
         graph.add_node(index_files_dumper)
+        graph.add_node(signatures_saver)
         graph.add_node(exit_aggregator)
 
         graph.bridge(entry_node, inner_api_converter, entry_inner_api_converter_bridge)
         graph.bridge(inner_api_converter, api_files_dumper, inner_api_converter_api_files_dumper_bridge)
-        graph.plug(api_files_dumper, exit_aggregator, api_files_dumper_exit_plugger)
+        graph.plug(api_files_dumper, manifest_aggregator, api_files_dumper_manifest_aggregator_plugger)
+        graph.plug(entry_node, manifest_aggregator, entry_manifest_aggregator_plugger)
+        graph.bridge(manifest_aggregator, manifest_updater, manifest_aggregator_manifest_updater_bridge)
+        graph.plug(manifest_updater, exit_aggregator, manifest_updater_exit_plugger)
         graph.plug(api_files_dumper, ts_export_aggregator, api_files_dumper_ts_export_aggregator_plugger)
         graph.plug(entry_node, ts_export_aggregator, entry_ts_export_aggregator_plugger)
         graph.bridge(ts_export_aggregator, ts_export_helper, ts_export_aggregator_ts_export_helper_bridge)
         graph.bridge(ts_export_helper, index_files_dumper, ts_export_helper_index_files_dumper_bridge)
-        graph.plug(index_files_dumper, exit_aggregator, index_files_dumper_exit_plugger)
+        graph.bridge(index_files_dumper, signatures_saver, index_files_dumper_signatures_saver_bridge)
+        graph.plug(signatures_saver, exit_aggregator, signatures_saver_exit_plugger)
 
         graph.set_entry_node(entry_node)
         graph.set_exit_node(exit_aggregator)
@@ -109,6 +128,48 @@ class APIConverterTSExportHelperPlugger(PluggerWorker):
         )
 
 
+class APIConverterManifestUpdaterPlugger(PluggerWorker):
+    @classmethod
+    def define_input_schema(cls) -> AutomSchema | None:
+        return AutomProjectAPIConvertParams
+
+    def invoke(self, req: Request) -> Response:
+        req_body: AutomProjectAPIConvertParams = req.body
+        return Response[SocketRequestBody].from_worker(self).success(
+            body=SocketRequestBody(
+                calls=[
+                    SocketCall(
+                        socket_name="set_autom_backend_root_path",
+                        data=req_body.autom_backend_root_path,
+                    ),
+                    SocketCall(
+                        socket_name="set_autom_frontend_root_path",
+                        data=req_body.autom_frontend_root_path,
+                    ),
+                ]
+            )
+        )
+
+
+class FilesContentAPIManifestUpdaterPlugger(PluggerWorker):
+    @classmethod
+    def define_input_schema(cls) -> AutomSchema | None:
+        return FilesContent
+
+    def invoke(self, req: Request) -> Response:
+        req_body: FilesContent = req.body
+        return Response[SocketRequestBody].from_worker(self).success(
+            body=SocketRequestBody(
+                calls=[
+                    SocketCall(
+                        socket_name="set_files_content",
+                        data=req_body,
+                    ),
+                ]
+            )
+        )
+
+
 class AutomProjectAPIFileEnumerator(AgentWorker):
     @classmethod
     def define_input_schema(cls) -> AutomSchema | None:
@@ -120,18 +181,21 @@ class AutomProjectAPIFileEnumerator(AgentWorker):
 
     def invoke(self, req: Request) -> Response:
         req_body: FileEnumeratorInput = req.body
-        endpoints_dir = req_body.autom_backend_root_path / 'app/api/v1/endpoints'
-        excluded_files = ["__init__.py", "token.py"]
+        get_files_stream_writer().configure(req_body.stream_dump, req_body.autom_frontend_root_path / 'lib/apis')
+        open_run_journal(req_body.autom_frontend_root_path, api_run_journal_name, req_body.resume)
+        src_file_fullpaths = list_api_src_file_fullpaths(req_body.autom_backend_root_path)
 
-        # iterate over all files in the endpoints directory except for the excluded files using rglob
-        src_file_fullpaths = list(endpoints_dir.rglob('*.py'))
-        src_file_fullpaths = [f for f in src_file_fullpaths if f.name not in excluded_files]
-        
         return Response[EnumeratedFiles].from_worker(self).success(
             body=EnumeratedFiles(
                 autom_backend_root_path=req_body.autom_backend_root_path,
                 autom_frontend_root_path=req_body.autom_frontend_root_path,
                 src_file_fullpaths=src_file_fullpaths,
+                incremental=req_body.incremental,
+                max_functions_per_batch=req_body.max_functions_per_batch,
+                max_tokens_per_batch=req_body.max_tokens_per_batch,
+                use_llm_cache=req_body.use_llm_cache,
+                max_llm_concurrency=req_body.max_llm_concurrency,
+                resume=req_body.resume,
             )
         )
 
@@ -151,11 +215,39 @@ class EnumeratorFileAPIConverterDispatchBridgeWorker(DispatchBridgeWorker):
 
         for i, src_file_fullpath in enumerate(req_body.src_file_fullpaths):
             batch_responses[i] = Response[FileAPIConverterInput].from_worker(self).success(
-                body=FileAPIConverterInput(
-                    src_file_fullpath=src_file_fullpath,
-                    autom_backend_root_path=req_body.autom_backend_root_path,
-                    autom_frontend_root_path=req_body.autom_frontend_root_path,
-                )
+                body=make_file_api_converter_input(req_body, src_file_fullpath)
             )
 
         return batch_responses
+
+
+def list_api_src_file_fullpaths(autom_backend_root_path: Path) -> list[Path]:
+    """List the backend router files to convert, in the /app/api/v1/endpoints directory."""
+    endpoints_dir = autom_backend_root_path / 'app/api/v1/endpoints'
+    excluded_files = ["__init__.py", "token.py"]
+
+    # iterate over all files in the endpoints directory except for the excluded files using rglob
+    src_file_fullpaths = list(endpoints_dir.rglob('*.py'))
+    return [f for f in src_file_fullpaths if f.name not in excluded_files]
+
+
+def plan_api_dst_filepaths(req_body: AutomProjectAPIConvertParams) -> set[Path]:
+    """The api files AutomProjectAPIConverter is planned to write, the unchanged functions are left out in incremental mode."""
+    dst_filepaths: set[Path] = set()
+    for src_file_fullpath in list_api_src_file_fullpaths(req_body.autom_backend_root_path):
+        dst_filepaths.update(plan_file_api_convert(make_file_api_converter_input(req_body, src_file_fullpath)).source_stamps)
+    return dst_filepaths
+
+
+def make_file_api_converter_input(req_body: AutomProjectAPIConvertParams | EnumeratedFiles, src_file_fullpath: Path) -> FileAPIConverterInput:
+    return FileAPIConverterInput(
+        src_file_fullpath=src_file_fullpath,
+        autom_backend_root_path=req_body.autom_backend_root_path,
+        autom_frontend_root_path=req_body.autom_frontend_root_path,
+        incremental=req_body.incremental,
+        max_functions_per_batch=req_body.max_functions_per_batch,
+        max_tokens_per_batch=req_body.max_tokens_per_batch,
+        use_llm_cache=req_body.use_llm_cache,
+        max_llm_concurrency=req_body.max_llm_concurrency,
+        resume=req_body.resume,
+    )
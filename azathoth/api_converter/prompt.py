@@ -18,3 +18,20 @@ function_api_converter_user_input_prompt = """
 {api_function_source}
 【输出】
 """.strip()
+
+
+function_api_batch_converter_system_prompt = function_api_converter_system_prompt.rstrip() + '''
+
+这次输入包含多个 api 函数, 每个函数都以 `<api_function name="函数名">` 开头. 请你对每个函数分别提取上述信息, 并在 `function_name` 中填写对应的函数名, 每个函数输出且只输出一个结果.
+'''
+
+function_api_batch_converter_user_input_prompt = """
+【输入】
+{api_function_sources}
+【输出】
+""".strip()
+
+function_api_batch_converter_function_source_prompt = """
+<api_function name="{api_function_name}">
+{api_function_source}
+""".strip()
@@ -1,13 +1,22 @@
 from pathlib import Path
 from typing import Literal, Optional
 
+from pydantic import PositiveInt
+
 import inflection
-from autom.engine import AutomSchema
+from autom.engine import AutomSchema, AutomField
+
+from azathoth.common import FilesContent, SourceStamp, LLMCacheParams, ResumeParams, StreamDumpParams
+from ..ast_utils import FunctionSignatureInfo
 
 
-class AutomProjectAPIConvertParams(AutomSchema):
+class AutomProjectAPIConvertParams(LLMCacheParams, StreamDumpParams, ResumeParams):
     autom_backend_root_path: Path
     autom_frontend_root_path: Path
+    incremental: bool = AutomField(False, description="Only convert the api functions whose header changed since the last successful run, or whose frontend api file is missing")
+    max_functions_per_batch: PositiveInt = AutomField(1, description="Max api functions of a router converted by one LLM request. 1 disables batching, functions which can be classified statically never go to the LLM")
+    max_tokens_per_batch: PositiveInt = AutomField(4096, description="Max estimated tokens of the function sources packed into one batched LLM request")
+    max_llm_concurrency: PositiveInt = AutomField(1, description="Max number of LLM calls in flight at once, shared by all files and functions. With more than 1, the function conversions are prefetched concurrently")
 
 
 FileEnumeratorInput = AutomProjectAPIConvertParams
@@ -17,12 +26,24 @@ class EnumeratedFiles(AutomSchema):
     autom_backend_root_path: Path
     autom_frontend_root_path: Path
     src_file_fullpaths: list[Path]
+    incremental: bool = False
+    max_functions_per_batch: PositiveInt = 1
+    max_tokens_per_batch: PositiveInt = 4096
+    use_llm_cache: bool = True
+    max_llm_concurrency: PositiveInt = 1
+    resume: bool = False
 
 
 class FileAPIConverterInput(AutomSchema):
     src_file_fullpath: Path
     autom_backend_root_path: Path
     autom_frontend_root_path: Path
+    incremental: bool = False
+    max_functions_per_batch: PositiveInt = 1
+    max_tokens_per_batch: PositiveInt = 4096
+    use_llm_cache: bool = True
+    max_llm_concurrency: PositiveInt = 1
+    resume: bool = False
 
 
 FileAPIConvertPlannerInput = FileAPIConverterInput
@@ -33,15 +54,43 @@ class FileAPIConvertPlan(AutomSchema):
     autom_backend_root_path: Path
     autom_frontend_root_path: Path
     function_name_source_dict: dict[str, str]
+    function_name_signature_dict: dict[str, FunctionSignatureInfo] = AutomField(
+        default_factory=dict,
+        description="The structured signature of each function, used to build the api without LLM when possible"
+    )
+    max_functions_per_batch: PositiveInt = 1
+    max_tokens_per_batch: PositiveInt = 4096
+    use_llm_cache: bool = True
+    max_llm_concurrency: PositiveInt = 1
+    resume: bool = False
+    function_name_key_result_dict: dict[str, 'FunctionConvertKeyResult'] = AutomField(
+        default_factory=dict,
+        description="The key results already extracted by batched LLM requests, the other functions are converted one by one"
+    )
+    source_stamps: dict[Path, SourceStamp] = AutomField(
+        default_factory=dict,
+        description="The header hash of every planned function as it was when planning, keyed by its frontend api file path. The api manifest records them"
+    )
 
 
 class FunctionAPIConverterInput(AutomSchema):
     api_function_name: str
     api_function_source: str
+    api_function_signature: Optional[FunctionSignatureInfo] = None
+    api_function_key_result: Optional['FunctionConvertKeyResult'] = None
     src_file_fullpath: Path
     dst_file_fullpath: Path
     autom_backend_root_path: Path
     autom_frontend_root_path: Path
+    use_llm_cache: bool = True
+    resume: bool = False
+
+
+class APIManifestUpdateParams(AutomSchema):
+    """Input Params for APIManifestUpdater"""
+    autom_backend_root_path: Path
+    autom_frontend_root_path: Path
+    files_content: FilesContent = AutomField(..., description="The converted api files which have been dumped to disk")
 
 import re
 def camel_to_snake(name):
@@ -145,3 +194,16 @@ export const {inflection.camelize(function_name, uppercase_first_letter=False)}
   }}
 );
 """.strip() + '\n'
+
+
+class NamedFunctionConvertKeyResult(FunctionConvertKeyResult):
+    function_name: str
+
+
+class FunctionConvertKeyResultBatch(AutomSchema):
+    """Output of a batched FunctionConvertKeyResult extraction"""
+    results: list[NamedFunctionConvertKeyResult]
+
+
+FileAPIConvertPlan.model_rebuild()
+FunctionAPIConverterInput.model_rebuild()
@@ -6,6 +6,30 @@ from pathlib import Path
 
 from pydantic import BaseModel, Field
 
+from .common import read_source_file
+from .symbol_index import SymbolIndex, get_symbol_index
+
+
+class FunctionParamInfo(BaseModel):
+    name: str
+    annotation: str | None = Field(None, description="The unparsed annotation, None if not annotated")
+    default: str | None = Field(None, description="The unparsed default value, None if no default value")
+
+
+class FunctionDecoratorInfo(BaseModel):
+    name: str = Field(..., description="The unparsed decorator callee, e.g. `router.post`")
+    args: list[str] = Field(default_factory=list, description="The unparsed positional arguments of the decorator call")
+    kwargs: dict[str, str] = Field(default_factory=dict, description="The unparsed keyword arguments of the decorator call")
+
+
+class FunctionSignatureInfo(BaseModel):
+    """The structured signature of a function, extracted from its AST node."""
+    name: str
+    decorators: list[FunctionDecoratorInfo] = Field(default_factory=list)
+    params: list[FunctionParamInfo] = Field(default_factory=list)
+    has_var_params: bool = Field(False, description="Whether the function accepts `*args` or `**kwargs`")
+    returns: str | None = None
+
 
 class PythonParts(BaseModel):
     code: str
@@ -13,6 +37,7 @@ class PythonParts(BaseModel):
     project_root: Path
     imports: list[str]
     function_name_header_dict: dict[str, str] = Field(default_factory=dict)
+    function_name_signature_dict: dict[str, FunctionSignatureInfo] = Field(default_factory=dict)
 
     @property
     def n_functions(self):
@@ -28,12 +53,14 @@ class PythonParts(BaseModel):
             dict[str, str]: The function name source dict
         """
         function_name_source_dict: dict[str, str] = {}
+        symbol_index = get_symbol_index(self.project_root) if with_dependencies else None
         for function_name, function_header in self.function_name_header_dict.items():
             if with_dependencies:
                 function_source = extract_function_dependencies(
                     function_header=function_header,
                     imports=self.imports,
-                    project_root=self.project_root
+                    project_root=self.project_root,
+                    symbol_index=symbol_index,
                 ).to_string()
             else:
                 function_source = function_header
@@ -61,15 +88,15 @@ def extract_python_parts(file_path: PathLike, project_root: PathLike) -> PythonP
     file_path = Path(file_path)
     project_root = Path(project_root)
 
-    with open(file_path, 'r', encoding='utf-8') as file:
-        file_content = file.read()
-
-    # Parse the content into an AST
-    tree = ast.parse(file_content)
+    # Read and parse through the shared cache, the file may have been parsed by another step already
+    source_file = read_source_file(file_path)
+    file_content = source_file.text
+    tree = source_file.tree
 
     # To store the import statements and function signatures
     import_parts = []
     function_name_header_dict = {}
+    function_name_signature_dict = {}
 
     for node in ast.iter_child_nodes(tree):
         if isinstance(node, ast.Import) or isinstance(node, ast.ImportFrom):
@@ -96,6 +123,7 @@ def extract_python_parts(file_path: PathLike, project_root: PathLike) -> PythonP
 
             # Store the result in the dictionary with function name as the key
             function_name_header_dict[func_name] = function_output.strip()
+            function_name_signature_dict[func_name] = extract_function_signature(node)
 
     return PythonParts(
         code=file_content,
@@ -103,6 +131,40 @@ def extract_python_parts(file_path: PathLike, project_root: PathLike) -> PythonP
         project_root=project_root,
         imports=import_parts,
         function_name_header_dict=function_name_header_dict,
+        function_name_signature_dict=function_name_signature_dict,
+    )
+
+
+def extract_function_signature(node: ast.FunctionDef | ast.AsyncFunctionDef) -> FunctionSignatureInfo:
+    """Extract the structured signature(decorators, params and return type) of a function node."""
+    decorators = []
+    for decorator in node.decorator_list:
+        if isinstance(decorator, ast.Call):
+            decorators.append(FunctionDecoratorInfo(
+                name=ast.unparse(decorator.func),
+                args=[ast.unparse(arg) for arg in decorator.args],
+                kwargs={kw.arg: ast.unparse(kw.value) for kw in decorator.keywords if kw.arg is not None},
+            ))
+        else:
+            decorators.append(FunctionDecoratorInfo(name=ast.unparse(decorator)))
+
+    params = []
+    # defaults of positional params are aligned to the last ones
+    positional_args = node.args.posonlyargs + node.args.args
+    positional_defaults = [None] * (len(positional_args) - len(node.args.defaults)) + node.args.defaults
+    for arg, default in list(zip(positional_args, positional_defaults)) + list(zip(node.args.kwonlyargs, node.args.kw_defaults)):
+        params.append(FunctionParamInfo(
+            name=arg.arg,
+            annotation=ast.unparse(arg.annotation) if arg.annotation else None,
+            default=ast.unparse(default) if default is not None else None,
+        ))
+
+    return FunctionSignatureInfo(
+        name=node.name,
+        decorators=decorators,
+        params=params,
+        has_var_params=node.args.vararg is not None or node.args.kwarg is not None,
+        returns=ast.unparse(node.returns) if node.returns else None,
     )
 
 
@@ -218,11 +280,7 @@ def find_class_source_in_file(file_path: PathLike, class_names: list[str]) -> li
     Returns:
         list[str]: The list of class definitions found in the file.
     """
-    with open(file_path, 'r', encoding='utf-8') as file:
-        file_content = file.read()
-
-    # Parse the content into an AST
-    tree = ast.parse(file_content)
+    tree = read_source_file(file_path).tree
 
     class_definitions = []
 
@@ -257,7 +315,20 @@ def find_class_source_in_directory(directory: PathLike, class_names: list[str])
     return class_definitions
 
 
-def extract_function_dependencies(function_header: str, imports: list[str], project_root: PathLike) -> FunctionHeaderWithDependencies:
+def extract_function_dependencies(
+    function_header: str,
+    imports: list[str],
+    project_root: PathLike,
+    symbol_index: SymbolIndex | None = None,
+) -> FunctionHeaderWithDependencies:
+    """Collect the class sources of the imported annotations of a function.
+
+    Classes are resolved through the SymbolIndex of `project_root`, which is refreshed here unless given.
+    """
+    project_root = Path(project_root)
+    if symbol_index is None:
+        symbol_index = get_symbol_index(project_root)
+
     # Parse the function_part into an AST
     tree = ast.parse(function_header)
     dependency_classes = set()
@@ -289,14 +360,14 @@ def extract_function_dependencies(function_header: str, imports: list[str], proj
 
                     if full_source_folder.is_dir():
                         # Search for the class definition in the entire module folder
-                        class_definitions = find_class_source_in_directory(full_source_folder, [item])
+                        class_definitions = [symbol.source for symbol in symbol_index.find_classes(item, full_source_folder)]
                         if class_definitions:
                             class_sources[item] = class_definitions
                     else:
                         # Assume it's a single file import
                         full_source_path = full_source_folder.with_suffix(".py")
                         if full_source_path.exists():
-                            class_sources[item] = find_class_source_in_file(full_source_path, [item])
+                            class_sources[item] = [symbol.source for symbol in symbol_index.find_classes(item, full_source_path)]
 
     # Collect the found class definitions
     dependency_parts = []
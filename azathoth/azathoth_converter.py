@@ -1,14 +1,242 @@
+from typing import Optional
 from pathlib import Path
 
-from autom.engine import GraphAgentWorker, AutomGraph, AutomSchema, BridgeWorker
+from pydantic import PositiveInt, PositiveFloat, NonNegativeInt
+from autom.engine import (
+    autom_registry,
+    GraphAgentWorker, AutomGraph, AutomSchema, AutomField, BridgeWorker, AgentWorker, AggregatorWorker, PluggerWorker,
+    Node, Link, Request, Response, Socket, SocketCall, SocketRequestBody,
+)
+from autom.logger import autom_logger
+from autom.official import HolderAgentWorker, IdentityBridgeWorker, NullPlugger
 
-from .schema_converter import AutomProjectSchemaConvertParams
+from .common import (
+    FilesContent, FilesContentAggregator, FilesContentFilesContentPlugger, SchemaConvertEngine, StageSpan, LLMCallStats,
+    get_llm_call_executor, get_stage_timeline, get_critical_path, get_llm_call_policy, configure_llm_call_policy, get_llm_call_stats,
+    enable_tracing, get_tracer, LLMUsageReport, get_llm_usage_ledger,
+    LLMBudget, LLMBudgetExceeded, LLMRunEstimate, get_llm_budget_guard, get_files_stream_writer,
+    LLMCacheParams, ResumeParams, StreamDumpParams,
+)
+from .schema_converter import AutomProjectSchemaConvertParams, BackendSchemaConverter, estimate_schema_convert_requests
+from .api_converter import AutomProjectAPIConvertParams, AutomProjectAPIConverter, estimate_api_convert_requests, plan_api_dst_filepaths
+from .action_converter import (
+    AutomProjectActionConvertParams, AutomProjectActionConverter, ProjectActionConvertPlan,
+    plan_project_action_convert, make_file_action_convert_params, get_action_dst_filepath, prefetch_action_conversions, estimate_action_convert_requests,
+)
 
 
-class AzathothParams(AutomSchema):
+# name of the FilesStreamWriter put listener prefetching the action conversions
+action_prefetch_listener_name = 'action_prefetch'
+# the stages each stage waits for
+stage_dependencies: dict[str, list[str]] = {
+    'schema': [],
+    'api': [],
+    'action': ['api'],
+}
+
+
+@autom_registry(is_internal=False)
+class AzathothParams(LLMCacheParams, StreamDumpParams, ResumeParams):
     autom_engine_root_path: Path
     autom_backend_root_path: Path
     autom_frontend_root_path: Path
+    max_llm_concurrency: PositiveInt = AutomField(1, description="Max number of LLM calls in flight at once, shared by the schema, api and action stages")
+    incremental: bool = AutomField(False, description="Only convert the schema files and api functions which changed since the last run")
+    schema_convert_engine: SchemaConvertEngine = AutomField(SchemaConvertEngine.llm, description="How the schema stage converts the schema files")
+    max_functions_per_batch: PositiveInt = AutomField(1, description="Max api functions of a router converted by one LLM request in the api stage")
+    max_tokens_per_batch: PositiveInt = AutomField(4096, description="Max estimated tokens of the function sources packed into one batched LLM request in the api stage")
+    llm_timeout: PositiveFloat = AutomField(default_factory=lambda: get_llm_call_policy().timeout, description="Seconds before an LLM request times out and is retried")
+    llm_max_retries: NonNegativeInt = AutomField(default_factory=lambda: get_llm_call_policy().max_retries, description="Max retries of an LLM call which timed out, failed transiently or returned an unparsable completion. An item still failing is reported in `files_content.failures`, the rest of the run goes on")
+    llm_hedge_percentile: float = AutomField(default_factory=lambda: get_llm_call_policy().hedge_percentile, ge=0, lt=1, description="Send a duplicate of an LLM request still running after this quantile of the recent latencies, the first completion wins. 0 disables hedging")
+    trace_path: Optional[Path] = AutomField(None, description="Trace every worker, dispatch, socket call and LLM request of the run, and write the Chrome trace JSON(viewable in Perfetto) there")
+    llm_usage_report_path: Optional[Path] = AutomField(None, description="Write the LLM usage report of the run there as JSON, and next to it as a table(.txt)")
+    action_api_src_relpath: str = AutomField('lib/apis', description="The directory of the api files the action stage converts, relative to the frontend root. Defaults to the output directory of the api stage")
+    llm_budget_usd: Optional[PositiveFloat] = AutomField(default_factory=lambda: LLMBudget().max_cost, description="Max LLM cost of the run in USD, checked against the pre-flight estimate before the run starts and against the spend before every LLM request. Defaults to `$AZATHOTH_LLM_BUDGET_USD`, None is unlimited")
+    llm_budget_tokens: Optional[PositiveInt] = AutomField(default_factory=lambda: LLMBudget().max_tokens, description="Max LLM tokens of the run, enforced like `llm_budget_usd`. Defaults to `$AZATHOTH_LLM_BUDGET_TOKENS`, None is unlimited")
+
+    def get_llm_budget(self) -> LLMBudget:
+        return LLMBudget(max_cost=self.llm_budget_usd, max_tokens=self.llm_budget_tokens)
+
+
+class AzathothConvertResult(AutomSchema):
+    """Output of AzathothConverter"""
+    files_content: FilesContent
+    stage_spans: list[StageSpan] = AutomField(default_factory=list, description="Wall time of each stage, in seconds since the conversion started")
+    critical_path: list[str] = AutomField(default_factory=list, description="The chain of stages which determined the total wall time")
+    llm_call_stats: LLMCallStats = AutomField(default_factory=LLMCallStats, description="Retries and hedges of the LLM calls of the process")
+    llm_usage_report: Optional[LLMUsageReport] = AutomField(None, description="Tokens, requests, latency and cost of the LLM calls of the run, by stage, model, source file, router and api function")
+
+
+class AzathothDryRunResult(AutomSchema):
+    """Output of AzathothDryRunner"""
+    llm_run_estimate: LLMRunEstimate
+    budget_exceeded: Optional[str] = AutomField(None, description="Why the run would be aborted by its LLM budget, None if it fits")
+
+
+@autom_registry(is_internal=False)
+class AzathothConverter(GraphAgentWorker):
+    """Convert a whole Autom project: backend schemas, api functions and server actions.
+
+    The schema and api stages run side by side, the LLM conversions of the action stage are prefetched as the api files are produced.
+    """
+    @classmethod
+    def define_graph(cls) -> AutomGraph:
+        graph = AutomGraph()
+
+        entry_node = Node.from_worker(HolderAgentWorker().with_schema(AzathothParams))
+        entry_starter_bridge = Link.from_worker(IdentityBridgeWorker())
+        starter = Node.from_worker(AzathothStarter())
+
+        starter_schema_converter_bridge = Link.from_worker(AzathothSchemaConverterBridge())
+        schema_converter = Node.from_worker(BackendSchemaConverter())
+        schema_converter_exit_plugger = Link.from_worker(SchemaStageFilesContentPlugger())
+
+        starter_api_aggregator_plugger = Link.from_worker(AzathothAPIConvertParamsPlugger())
+        api_aggregator = Node.from_worker(APIConvertParamsAggregator())
+        api_aggregator_api_converter_bridge = Link.from_worker(APIStageBridge())
+        api_converter = Node.from_worker(AutomProjectAPIConverter())
+        api_converter_exit_plugger = Link.from_worker(APIStageFilesContentPlugger())
+        api_converter_action_aggregator_plugger = Link.from_worker(NullPlugger())
+
+        starter_action_aggregator_plugger = Link.from_worker(AzathothActionConvertParamsPlugger())
+        action_aggregator = Node.from_worker(ActionConvertParamsAggregator())
+        action_aggregator_action_converter_bridge = Link.from_worker(ActionStageBridge())
+        action_converter = Node.from_worker(AutomProjectActionConverter())
+        action_converter_exit_plugger = Link.from_worker(ActionStageFilesContentPlugger())
+
+        files_aggregator = Node.from_worker(FilesContentAggregator())
+        files_aggregator_reporter_bridge = Link.from_worker(IdentityBridgeWorker())
+        reporter = Node.from_worker(AzathothReporter())
+
+        graph.add_node(entry_node)
+        graph.add_node(starter)
+        graph.add_node(schema_converter)
+        graph.add_node(api_aggregator)
+        graph.add_node(api_converter)
+        graph.add_node(action_aggregator)
+        graph.add_node(action_converter)
+        graph.add_node(files_aggregator)
+        graph.add_node(reporter)
+
+        graph.bridge(entry_node, starter, entry_starter_bridge)
+
+        # (1) schema stage
+        graph.bridge(starter, schema_converter, starter_schema_converter_bridge)
+        graph.plug(schema_converter, files_aggregator, schema_converter_exit_plugger)
+
+        # (2) api stage, in parallel with the schema stage
+        graph.plug(starter, api_aggregator, starter_api_aggregator_plugger)
+        graph.bridge(api_aggregator, api_converter, api_aggregator_api_converter_bridge)
+        graph.plug(api_converter, files_aggregator, api_converter_exit_plugger)
+
+        # (3) action stage, collecting the prefetched conversions once the api files are dumped
+        graph.plug(starter, action_aggregator, starter_action_aggregator_plugger)
+        graph.plug(api_converter, action_aggregator, api_converter_action_aggregator_plugger)
+        graph.bridge(action_aggregator, action_converter, action_aggregator_action_converter_bridge)
+        graph.plug(action_converter, files_aggregator, action_converter_exit_plugger)
+
+        graph.bridge(files_aggregator, reporter, files_aggregator_reporter_bridge)
+
+        graph.set_entry_node(entry_node)
+        graph.set_exit_node(reporter)
+
+        return graph
+
+
+@autom_registry(is_internal=False)
+class AzathothDryRunner(AgentWorker):
+    """Plan a run of AzathothConverter without calling the LLM: the requests each stage would send, their tokens, cost and wall time, and whether they fit the LLM budget.
+
+    Only the planners and the segmenters run, the run journals and the output files are left untouched.
+    """
+    @classmethod
+    def define_input_schema(cls) -> AutomSchema | None:
+        return AzathothParams
+
+    @classmethod
+    def define_output_schema(cls) -> AutomSchema | None:
+        return AzathothDryRunResult
+
+    def invoke(self, req: Request) -> Response:
+        req_body: AzathothParams = req.body
+        llm_run_estimate = estimate_azathoth_run(req_body)
+        autom_logger.info(f"[AzathothDryRunner] LLM estimate:\n{llm_run_estimate.format()}")
+        budget_exceeded = None
+        try:
+            llm_run_estimate.check(req_body.get_llm_budget())
+        except LLMBudgetExceeded as e:
+            budget_exceeded = str(e)
+            autom_logger.warning(f"[AzathothDryRunner] {e}")
+
+        return Response[AzathothDryRunResult].from_worker(self).success(
+            body=AzathothDryRunResult(llm_run_estimate=llm_run_estimate, budget_exceeded=budget_exceeded)
+        )
+
+
+class AzathothStarter(AgentWorker):
+    """Reset the per-run state(stage timeline, LLM usage ledger, stream records), apply the LLM settings of the run and prefetch the action conversions which need the LLM.
+
+    With an LLM budget, the run is aborted with LLMBudgetExceeded before any LLM request if its estimate does not fit.
+    """
+    @classmethod
+    def define_input_schema(cls) -> AutomSchema | None:
+        return AzathothParams
+
+    @classmethod
+    def define_output_schema(cls) -> AutomSchema | None:
+        return AzathothParams
+
+    def invoke(self, req: Request) -> Response:
+        req_body: AzathothParams = req.body
+        get_stage_timeline().reset()
+        llm_usage_ledger = get_llm_usage_ledger()
+        llm_usage_ledger.reset()
+        llm_usage_ledger.output_path = req_body.llm_usage_report_path
+        if req_body.trace_path is not None:
+            tracer = enable_tracing()
+            tracer.reset()
+            tracer.output_path = req_body.trace_path
+        get_llm_call_executor().configure(req_body.max_llm_concurrency)
+        configure_llm_call_policy(
+            timeout=req_body.llm_timeout,
+            max_retries=req_body.llm_max_retries,
+            hedge_percentile=req_body.llm_hedge_percentile,
+        )
+        llm_budget = req_body.get_llm_budget()
+        get_llm_budget_guard().configure(llm_budget)
+        if llm_budget.is_limited:
+            llm_run_estimate = estimate_azathoth_run(req_body)
+            autom_logger.info(f"[AzathothStarter] Pre-flight LLM estimate:\n{llm_run_estimate.format()}")
+            llm_run_estimate.check(llm_budget)
+
+        files_stream_writer = get_files_stream_writer()
+        files_stream_writer.configure(req_body.stream_dump)
+        files_stream_writer.set_put_listener(action_prefetch_listener_name, None)
+        if req_body.max_llm_concurrency > 1:
+            action_convert_params = get_action_convert_params(req_body)
+            action_convert_plan = plan_project_action_convert(action_convert_params)
+            files_stream_writer.set_put_listener(action_prefetch_listener_name, ActionConversionPrefetcher(action_convert_params.api_src_relpath, action_convert_plan))
+            # hand-written api files are not touched by the api stage, their conversion can start right away
+            api_dst_filepaths = plan_api_dst_filepaths(get_api_convert_params(req_body))
+            prefetch_action_conversions([
+                make_file_action_convert_params(action_convert_plan, src_filepath, dst_filepath)
+                for src_filepath, dst_filepath in action_convert_plan.src_dst_filepaths_pair
+                if src_filepath not in api_dst_filepaths
+            ])
+
+        return Response[AzathothParams].from_worker(self).success(body=req_body)
+
+
+class ActionConversionPrefetcher:
+    """FilesStreamWriter put listener prefetching the action conversion of each api file as soon as the api stage produces it."""
+    def __init__(self, api_src_relpath: str, action_convert_plan: ProjectActionConvertPlan):
+        self.api_src_relpath = api_src_relpath
+        self.action_convert_plan = action_convert_plan
+
+    def __call__(self, filepath: Path, content: str):
+        dst_filepath = get_action_dst_filepath(self.action_convert_plan.autom_frontend_root_path, self.api_src_relpath, filepath)
+        if dst_filepath is not None:
+            prefetch_action_conversions([make_file_action_convert_params(self.action_convert_plan, filepath, dst_filepath)], {filepath: content})
 
 
 class AzathothSchemaConverterBridge(BridgeWorker):
@@ -20,10 +248,251 @@ class AzathothSchemaConverterBridge(BridgeWorker):
     def define_output_schema(cls) -> AutomSchema | None:
         return AutomProjectSchemaConvertParams
 
+    def invoke(self, req: Request) -> Response:
+        req_body: AzathothParams = req.body
+        get_stage_timeline().start('schema')
+        return Response[AutomProjectSchemaConvertParams].from_worker(self).success(body=get_schema_convert_params(req_body))
 
-class AzathothConverter(GraphAgentWorker):
+
+class AzathothAPIConvertParamsPlugger(PluggerWorker):
     @classmethod
-    def define_graph(cls) -> AutomGraph:
-        graph = AutomGraph()
-        
-        return graph
+    def define_input_schema(cls) -> AutomSchema | None:
+        return AzathothParams
+
+    def invoke(self, req: Request) -> Response:
+        req_body: AzathothParams = req.body
+        return Response[SocketRequestBody].from_worker(self).success(
+            body=SocketRequestBody(
+                calls=[
+                    SocketCall(
+                        socket_name="set_params",
+                        data=get_api_convert_params(req_body),
+                    ),
+                ]
+            )
+        )
+
+
+class AzathothActionConvertParamsPlugger(PluggerWorker):
+    @classmethod
+    def define_input_schema(cls) -> AutomSchema | None:
+        return AzathothParams
+
+    def invoke(self, req: Request) -> Response:
+        req_body: AzathothParams = req.body
+        return Response[SocketRequestBody].from_worker(self).success(
+            body=SocketRequestBody(
+                calls=[
+                    SocketCall(
+                        socket_name="set_params",
+                        data=get_action_convert_params(req_body),
+                    ),
+                ]
+            )
+        )
+
+
+class APIConvertParamsAggregator(AggregatorWorker):
+    @classmethod
+    def define_output_schema(cls) -> AutomSchema | None:
+        return AutomProjectAPIConvertParams
+
+    @classmethod
+    def define_socket_list(cls) -> list[Socket]:
+        return [
+            Socket(
+                name="set_params",
+                input_type=AutomProjectAPIConvertParams,
+                socket_handler=cls._set_params,
+            ),
+        ]
+
+    def _set_params(self, data: AutomProjectAPIConvertParams) -> SocketCall:
+        self._output_as_dict.update(dict(data))
+
+
+class ActionConvertParamsAggregator(AggregatorWorker):
+    """Holds the action stage params until the api stage is done(the `null` socket)."""
+    @classmethod
+    def define_output_schema(cls) -> AutomSchema | None:
+        return AutomProjectActionConvertParams
+
+    @classmethod
+    def define_socket_list(cls) -> list[Socket]:
+        return [
+            Socket(
+                name="set_params",
+                input_type=AutomProjectActionConvertParams,
+                socket_handler=cls._set_params,
+            ),
+            Socket(
+                name="null",
+                input_type=None,
+                socket_handler=cls._null_hdlr,
+            ),
+        ]
+
+    def _set_params(self, data: AutomProjectActionConvertParams) -> SocketCall:
+        self._output_as_dict.update(dict(data))
+
+    def _null_hdlr(self, data: None = None) -> SocketCall:
+        pass
+
+
+class APIStageBridge(BridgeWorker):
+    @classmethod
+    def define_input_schema(cls) -> AutomSchema | None:
+        return AutomProjectAPIConvertParams
+
+    @classmethod
+    def define_output_schema(cls) -> AutomSchema | None:
+        return AutomProjectAPIConvertParams
+
+    def invoke(self, req: Request) -> Response:
+        get_stage_timeline().start('api')
+        return Response[AutomProjectAPIConvertParams].from_worker(self).success(body=req.body)
+
+
+class ActionStageBridge(BridgeWorker):
+    @classmethod
+    def define_input_schema(cls) -> AutomSchema | None:
+        return AutomProjectActionConvertParams
+
+    @classmethod
+    def define_output_schema(cls) -> AutomSchema | None:
+        return AutomProjectActionConvertParams
+
+    def invoke(self, req: Request) -> Response:
+        # every api file is on disk now, the action stage reads them itself
+        get_files_stream_writer().set_put_listener(action_prefetch_listener_name, None)
+        get_stage_timeline().start('action')
+        return Response[AutomProjectActionConvertParams].from_worker(self).success(body=req.body)
+
+
+class SchemaStageFilesContentPlugger(FilesContentFilesContentPlugger):
+    def invoke(self, req: Request) -> Response:
+        get_stage_timeline().end('schema')
+        return super().invoke(req)
+
+
+class APIStageFilesContentPlugger(FilesContentFilesContentPlugger):
+    def invoke(self, req: Request) -> Response:
+        get_stage_timeline().end('api')
+        return super().invoke(req)
+
+
+class ActionStageFilesContentPlugger(FilesContentFilesContentPlugger):
+    def invoke(self, req: Request) -> Response:
+        get_stage_timeline().end('action')
+        return super().invoke(req)
+
+
+class AzathothReporter(AgentWorker):
+    """Report the wall time of every stage, the critical path of the conversion, the LLM usage and the items which failed, and write the trace and usage report if asked."""
+    @classmethod
+    def define_input_schema(cls) -> AutomSchema | None:
+        return FilesContent
+
+    @classmethod
+    def define_output_schema(cls) -> AutomSchema | None:
+        return AzathothConvertResult
+
+    def invoke(self, req: Request) -> Response:
+        req_body: FilesContent = req.body
+        stage_spans = get_stage_timeline().get_spans()
+        critical_path = get_critical_path(stage_spans, stage_dependencies)
+
+        for span in stage_spans:
+            autom_logger.info(f"[AzathothReporter] Stage {span.stage}: {span.start:.2f}s -> {span.end or span.start:.2f}s ({span.duration:.2f}s).")
+        if critical_path:
+            autom_logger.info(
+                f"[AzathothReporter] Critical path: {' -> '.join(f'{span.stage}({span.duration:.2f}s)' for span in critical_path)}, "
+                f"{len(req_body.map)} files in {critical_path[-1].end:.2f}s."
+            )
+        llm_call_stats = get_llm_call_stats()
+        autom_logger.info(f"[AzathothReporter] {llm_call_stats.n_calls} LLM calls, {llm_call_stats.n_retries} retries, {llm_call_stats.n_hedged} hedged({llm_call_stats.n_hedge_wins} won by the hedge).")
+        llm_usage_ledger = get_llm_usage_ledger()
+        llm_usage_report = llm_usage_ledger.build_report()
+        autom_logger.info(f"[AzathothReporter] LLM usage:\n{llm_usage_report.format()}")
+        if llm_usage_ledger.output_path is not None:
+            json_path, text_path = llm_usage_report.dump(llm_usage_ledger.output_path)
+            autom_logger.info(f"[AzathothReporter] LLM usage report written to {json_path} and {text_path}.")
+        for failure in req_body.failures:
+            autom_logger.warning(f"[AzathothReporter] Failed {failure.item}: {failure.error}")
+        tracer = get_tracer()
+        if tracer is not None and tracer.output_path is not None:
+            tracer.dump_chrome_trace(tracer.output_path)
+
+        return Response[AzathothConvertResult].from_worker(self).success(
+            body=AzathothConvertResult(
+                files_content=req_body,
+                stage_spans=stage_spans,
+                critical_path=[span.stage for span in critical_path],
+                llm_call_stats=llm_call_stats,
+                llm_usage_report=llm_usage_report,
+            )
+        )
+
+
+def get_schema_convert_params(params: AzathothParams) -> AutomProjectSchemaConvertParams:
+    return AutomProjectSchemaConvertParams(
+        autom_engine_root_path=params.autom_engine_root_path,
+        autom_backend_root_path=params.autom_backend_root_path,
+        autom_frontend_root_path=params.autom_frontend_root_path,
+        use_llm_cache=params.use_llm_cache,
+        max_llm_concurrency=params.max_llm_concurrency,
+        engine=params.schema_convert_engine,
+        incremental=params.incremental,
+        stream_dump=params.stream_dump,
+        resume=params.resume,
+    )
+
+
+def get_api_convert_params(params: AzathothParams) -> AutomProjectAPIConvertParams:
+    return AutomProjectAPIConvertParams(
+        autom_backend_root_path=params.autom_backend_root_path,
+        autom_frontend_root_path=params.autom_frontend_root_path,
+        incremental=params.incremental,
+        max_functions_per_batch=params.max_functions_per_batch,
+        max_tokens_per_batch=params.max_tokens_per_batch,
+        use_llm_cache=params.use_llm_cache,
+        max_llm_concurrency=params.max_llm_concurrency,
+        stream_dump=params.stream_dump,
+        resume=params.resume,
+    )
+
+
+def get_action_convert_params(params: AzathothParams) -> AutomProjectActionConvertParams:
+    return AutomProjectActionConvertParams(
+        autom_frontend_root_path=params.autom_frontend_root_path,
+        api_src_relpath=params.action_api_src_relpath,
+        use_llm_cache=params.use_llm_cache,
+        max_llm_concurrency=params.max_llm_concurrency,
+        stream_dump=params.stream_dump,
+        resume=params.resume,
+    )
+
+
+def estimate_azathoth_run(params: AzathothParams) -> LLMRunEstimate:
+    """Estimate the LLM requests of every stage of a run locally, with the hits of the LLM result cache and of the run journals(when resuming) predicted.
+
+    The action stage is estimated over the api files already on disk, the api stage may still change them.
+    """
+    return LLMRunEstimate.from_requests(
+        [
+            *estimate_schema_convert_requests(get_schema_convert_params(params)),
+            *estimate_api_convert_requests(get_api_convert_params(params)),
+            *estimate_action_convert_requests(get_action_convert_params(params)),
+        ],
+        params.max_llm_concurrency,
+    )
+
+
+__all__ = [
+    'AzathothParams',
+    'AzathothConvertResult',
+    'AzathothDryRunResult',
+    'AzathothConverter',
+    'AzathothDryRunner',
+    'estimate_azathoth_run',
+]
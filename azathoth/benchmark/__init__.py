@@ -0,0 +1,4 @@
+from .fake_llm import *
+from .corpus import *
+from .e2e import *
+from .micro import *
@@ -0,0 +1,86 @@
+import sys
+import argparse
+from pathlib import Path
+
+from .fake_llm import FakeLLMConfig
+from .corpus import CorpusConfig
+from .e2e import E2EBenchmarkParams, run_e2e_benchmark
+from .micro import MicroBenchmarkReport, micro_benchmark_sizes, run_micro_benchmarks
+
+
+def main():
+    if sys.argv[1:2] == ['micro']:
+        return main_micro(sys.argv[2:])
+
+    parser = argparse.ArgumentParser(prog='python -m azathoth.benchmark', description="Run the schema, api and action converters end to end on a synthetic project against a fake LLM.")
+    parser.add_argument('--schema-files', type=int, default=20)
+    parser.add_argument('--models-per-file', type=int, default=5)
+    parser.add_argument('--routers', type=int, default=10)
+    parser.add_argument('--functions-per-router', type=int, default=8)
+    parser.add_argument('--handwritten-api-files', type=int, default=5)
+    parser.add_argument('--llm-fraction', type=float, default=0.2, help="Fraction of the models and endpoints the static converters can not handle")
+    parser.add_argument('--latency-median', type=float, default=0.5, help="Median latency of a fake LLM request, in seconds")
+    parser.add_argument('--latency-sigma', type=float, default=0.5, help="Sigma of the log-normal latency distribution")
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--concurrency', type=int, default=8, help="Max LLM calls in flight")
+    parser.add_argument('--batch', type=int, default=1, help="Max api functions per LLM request")
+    parser.add_argument('--stream-dump', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', type=Path, default=None, help="Keep the corpus and outputs there instead of a temporary directory")
+    parser.add_argument('--trace', type=Path, default=None, help="Write a Chrome trace of the run there, open it in https://ui.perfetto.dev")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = run_e2e_benchmark(E2EBenchmarkParams(
+        corpus=CorpusConfig(
+            n_schema_files=args.schema_files,
+            n_models_per_file=args.models_per_file,
+            n_routers=args.routers,
+            n_functions_per_router=args.functions_per_router,
+            n_handwritten_api_files=args.handwritten_api_files,
+            llm_fraction=args.llm_fraction,
+            seed=args.seed,
+        ),
+        fake_llm=FakeLLMConfig(
+            latency_median=args.latency_median,
+            latency_sigma=args.latency_sigma,
+            failure_rate=args.failure_rate,
+            seed=args.seed,
+        ),
+        max_llm_concurrency=args.concurrency,
+        max_functions_per_batch=args.batch,
+        stream_dump=args.stream_dump,
+        workdir=args.workdir,
+        trace_path=args.trace,
+    ))
+    print(report.model_dump_json(indent=2) if args.json else f'{report.format()}\n\n{report.llm_usage.format()}')
+
+
+def main_micro(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog='python -m azathoth.benchmark micro', description="Time the CPU hot paths of azathoth on generated inputs, and compare them to a saved baseline.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=micro_benchmark_sizes, help="File counts of the directory benchmarks")
+    parser.add_argument('--filter', default=None, help="Only run the benchmarks whose name contains this")
+    parser.add_argument('--min-time', type=float, default=1.0, help="Min seconds timed per benchmark")
+    parser.add_argument('--save-baseline', type=Path, default=None, help="Write the report there as the new baseline")
+    parser.add_argument('--compare', type=Path, default=None, help="Fail if a benchmark regressed against this baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Relative slowdown or allocation growth tolerated by --compare")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = run_micro_benchmarks(sizes=args.sizes, name_filter=args.filter, min_time=args.min_time)
+    print(report.model_dump_json(indent=2) if args.json else report.format())
+    if args.save_baseline is not None:
+        args.save_baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.save_baseline.write_text(report.model_dump_json(indent=2))
+    if args.compare is not None:
+        baseline = MicroBenchmarkReport.model_validate_json(args.compare.read_text())
+        regressions = report.compare(baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression.name} {regression.metric}: {regression.baseline:.2f} -> {regression.current:.2f} ({regression.change:+.1%})", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
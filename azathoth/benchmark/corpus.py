@@ -0,0 +1,135 @@
+import random
+from pathlib import Path
+
+from pydantic import BaseModel
+
+
+class CorpusConfig(BaseModel):
+    """Size and shape of a synthetic Autom project."""
+    n_schema_files: int = 20
+    n_models_per_file: int = 5
+    n_routers: int = 10
+    n_functions_per_router: int = 8
+    n_handwritten_api_files: int = 5
+    llm_fraction: float = 0.2
+    seed: int = 0
+
+
+class FakeCorpus(BaseModel):
+    """The roots of a synthetic Autom project, as the converters expect them."""
+    autom_engine_root_path: Path
+    autom_backend_root_path: Path
+    autom_frontend_root_path: Path
+    n_models: int
+    n_functions: int
+
+
+def generate_fake_corpus(root_path: Path, config: CorpusConfig | None = None) -> FakeCorpus:
+    """Write a fake `autom-backend`(schema files and endpoint routers), an empty `autom` engine and a fake `autom-frontend` under `root_path`.
+
+    About `llm_fraction` of the models and endpoints are written in a shape the static converters do not support(class keywords, unknown injected dependencies), so they go to the LLM. The frontend holds `n_handwritten_api_files` api files the action generator can not parse.
+    Generation is deterministic for a given config.
+    """
+    config = config or CorpusConfig()
+    rng = random.Random(config.seed)
+    engine_root = root_path / 'autom'
+    backend_root = root_path / 'autom-backend'
+    frontend_root = root_path / 'autom-frontend'
+    engine_root.mkdir(parents=True, exist_ok=True)
+
+    schemas_dir = backend_root / 'app/schemas'
+    schemas_dir.mkdir(parents=True, exist_ok=True)
+    (schemas_dir / '__init__.py').write_text('')
+    model_names: list[tuple[str, str]] = []  # (module, model name)
+    for i in range(config.n_schema_files):
+        module = f'schema_{i}'
+        lines = [
+            'from enum import Enum',
+            'from typing import Literal, Optional',
+            '',
+            'from pydantic import BaseModel, Field',
+        ]
+        if model_names:
+            dep_module, dep_name = rng.choice(model_names)
+            lines.append(f'from app.schemas.{dep_module} import {dep_name}')
+        else:
+            dep_name = None
+        lines += ['', '', f'class Status{i}(str, Enum):', '    active = "active"', '    archived = "archived"', '']
+        lines += ['', f'Kind{i} = Literal["a", "b", "c"]', '']
+        for j in range(config.n_models_per_file):
+            name = f'Model{i}x{j}'
+            keywords = ', frozen=True' if rng.random() < config.llm_fraction else ''
+            lines += [
+                '',
+                f'class {name}(BaseModel{keywords}):',
+                f'    """Model {j} of schema {i}."""',
+                '    id: str',
+                f'    name: str = Field(..., description="The name of {name}")',
+                '    count: int = 0',
+                '    score: Optional[float] = None',
+                f'    status: Status{i} = Status{i}.active',
+                f'    kind: Kind{i} = "a"',
+                '    tags: list[str] = []',
+            ]
+            if dep_name is not None and j == 0:
+                lines.append(f'    parent: Optional[{dep_name}] = None')
+            lines.append('')
+            model_names.append((module, name))
+        (schemas_dir / f'{module}.py').write_text('\n'.join(lines))
+
+    endpoints_dir = backend_root / 'app/api/v1/endpoints'
+    endpoints_dir.mkdir(parents=True, exist_ok=True)
+    (endpoints_dir / '__init__.py').write_text('')
+    for i in range(config.n_routers):
+        used_models = sorted(set(rng.choice(model_names) for _ in range(3)) if model_names else [])
+        lines = ['from fastapi import APIRouter, Depends', '']
+        lines += [f'from app.schemas.{module} import {name}' for module, name in used_models]
+        lines += ['from app.api.deps import get_db, get_current_user, check_quota', '', '', 'router = APIRouter()', '']
+        for j in range(config.n_functions_per_router):
+            function_name = f'handle_item_{i}_{j}'
+            params = ['item_id: str'] if j % 2 else []
+            response_model = f', response_model={used_models[j % len(used_models)][1]}' if used_models and j % 3 else ''
+            if used_models and j % 4 == 1:
+                params.append(f'body_data: {used_models[0][1]}')
+            params.append('db = Depends(get_db)')
+            if j % 2 == 0:
+                params.append('current_user = Depends(get_current_user)')
+            if rng.random() < config.llm_fraction:
+                params.append('quota = Depends(check_quota)')
+            route = f'/{function_name}' + ('/{item_id}' if 'item_id: str' in params else '')
+            lines += [
+                '',
+                f'@router.post("{route}"{response_model})',
+                f'async def {function_name}({", ".join(params)}):',
+                f'    """Endpoint {j} of router {i}."""',
+                '    return None',
+                '',
+            ]
+        (endpoints_dir / f'router_{i}.py').write_text('\n'.join(lines))
+
+    for dirname in ['types', 'lib/apis/handwritten', 'actions']:
+        (frontend_root / dirname).mkdir(parents=True, exist_ok=True)
+    for i in range(config.n_handwritten_api_files):
+        (frontend_root / f'lib/apis/handwritten/legacyCall{i}.ts').write_text(
+            'import { BACKEND_API_URL } from "@/config";\n\n'
+            f'export async function legacyCall{i}(query: Record<string, string>) {{\n'
+            '  const params = new URLSearchParams(query);\n'
+            f'  const response = await fetch(`${{BACKEND_API_URL}}/legacy/{i}?${{params}}`);\n'
+            '  return await response.json();\n'
+            '}\n'
+        )
+
+    return FakeCorpus(
+        autom_engine_root_path=engine_root,
+        autom_backend_root_path=backend_root,
+        autom_frontend_root_path=frontend_root,
+        n_models=len(model_names),
+        n_functions=config.n_routers * config.n_functions_per_router,
+    )
+
+
+__all__ = [
+    'CorpusConfig',
+    'FakeCorpus',
+    'generate_fake_corpus',
+]
@@ -0,0 +1,182 @@
+import sys
+import time
+import shutil
+import resource
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from pydantic import BaseModel
+from autom.engine import Request
+from autom.logger import autom_logger
+
+from azathoth.common import (
+    FilesContent, get_llm_call_executor, get_openai_rate_limiter, get_files_stream_writer, set_openai_client_override,
+    enable_tracing, disable_tracing, get_tracer, LLMUsageReport, get_llm_usage_ledger,
+)
+from azathoth.schema_converter import AutomProjectSchemaConvertParams, BackendSchemaConverter
+from azathoth.api_converter import AutomProjectAPIConvertParams, AutomProjectAPIConverter
+from azathoth.action_converter import AutomProjectActionConvertParams, AutomProjectActionConverter
+from .fake_llm import FakeLLMConfig, FakeOpenAIClient
+from .corpus import CorpusConfig, generate_fake_corpus
+
+
+class E2EBenchmarkParams(BaseModel):
+    corpus: CorpusConfig = CorpusConfig()
+    fake_llm: FakeLLMConfig = FakeLLMConfig()
+    max_llm_concurrency: int = 8
+    max_functions_per_batch: int = 1
+    stream_dump: bool = False
+    # the fake LLM is local, the limits default to never throttle it
+    openai_rpm: int = 1_000_000
+    openai_tpm: int = 1_000_000_000
+    workdir: Optional[Path] = None
+    trace_path: Optional[Path] = None
+
+
+class StageBenchmark(BaseModel):
+    stage: str
+    wall_time: float
+    n_files: int
+    n_failures: int
+    n_requests: int
+    prompt_tokens: int
+    completion_tokens: int
+    llm_latency: float
+    peak_rss_mb: float
+
+
+class E2EBenchmarkReport(BaseModel):
+    params: E2EBenchmarkParams
+    wall_time: float
+    peak_rss_mb: float
+    n_requests: int
+    stages: list[StageBenchmark]
+    llm_usage: LLMUsageReport
+
+    def format(self) -> str:
+        lines = [f"{'stage':<8} {'wall(s)':>9} {'files':>6} {'fails':>6} {'reqs':>6} {'llm(s)':>9} {'overhead(s)':>12} {'rss(MB)':>9}"]
+        for stage in self.stages:
+            # the LLM latency summed over the calls, spread over the concurrency, is what a perfect scheduler would wait
+            overhead = stage.wall_time - stage.llm_latency / max(1, self.params.max_llm_concurrency)
+            lines.append(
+                f"{stage.stage:<8} {stage.wall_time:>9.2f} {stage.n_files:>6} {stage.n_failures:>6} {stage.n_requests:>6} "
+                f"{stage.llm_latency:>9.2f} {overhead:>12.2f} {stage.peak_rss_mb:>9.1f}"
+            )
+        lines.append(f"{'total':<8} {self.wall_time:>9.2f} {'':>6} {'':>6} {self.n_requests:>6} {'':>9} {'':>12} {self.peak_rss_mb:>9.1f}")
+        return '\n'.join(lines)
+
+
+def get_peak_rss_mb() -> float:
+    """Peak resident set size of the process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_e2e_benchmark(params: E2EBenchmarkParams | None = None) -> E2EBenchmarkReport:
+    """Generate a synthetic project, then run BackendSchemaConverter, AutomProjectAPIConverter and AutomProjectActionConverter on it, one after the other, against the FakeOpenAIClient.
+
+    The LLM result cache is off so every LLM call reaches the fake client. Each stage reports its wall time, the requests it issued, the LLM latency they summed to, and the peak RSS of the process at its end. The LLM usage of the run is attributed as in AzathothConverter, so its JSON can be diffed between releases.
+    With `trace_path`, the three stages are traced and the Chrome trace is written there.
+    The process-wide rate limiter, LLM call executor, files stream writer and tracing are configured for the run, and restored afterwards.
+    """
+    params = params or E2EBenchmarkParams()
+    workdir = params.workdir or Path(tempfile.mkdtemp(prefix='azathoth-bench-'))
+    corpus = generate_fake_corpus(workdir, params.corpus)
+    autom_logger.info(f"[E2EBenchmark] Corpus at {workdir}: {params.corpus.n_schema_files} schema files({corpus.n_models} models), {params.corpus.n_routers} routers({corpus.n_functions} functions).")
+
+    rate_limiter = get_openai_rate_limiter()
+    llm_call_executor = get_llm_call_executor()
+    files_stream_writer = get_files_stream_writer()
+    previous_rpm, previous_tpm = rate_limiter.rpm, rate_limiter.tpm
+    previous_max_llm_concurrency = llm_call_executor.max_concurrency
+    previous_stream_dump = files_stream_writer.enabled
+    was_tracing = get_tracer() is not None
+
+    fake_client = FakeOpenAIClient(params.fake_llm)
+    set_openai_client_override(fake_client)
+    rate_limiter.configure(rpm=params.openai_rpm, tpm=params.openai_tpm)
+    llm_call_executor.configure(params.max_llm_concurrency)
+    files_stream_writer.configure(params.stream_dump)
+    get_llm_usage_ledger().reset()
+    tracer = enable_tracing() if params.trace_path is not None else None
+    if tracer is not None:
+        tracer.reset()
+
+    stages = [
+        ('schema', BackendSchemaConverter(), AutomProjectSchemaConvertParams(
+            autom_engine_root_path=corpus.autom_engine_root_path,
+            autom_backend_root_path=corpus.autom_backend_root_path,
+            autom_frontend_root_path=corpus.autom_frontend_root_path,
+            use_llm_cache=False,
+            max_llm_concurrency=params.max_llm_concurrency,
+            stream_dump=params.stream_dump,
+        )),
+        ('api', AutomProjectAPIConverter(), AutomProjectAPIConvertParams(
+            autom_backend_root_path=corpus.autom_backend_root_path,
+            autom_frontend_root_path=corpus.autom_frontend_root_path,
+            max_functions_per_batch=params.max_functions_per_batch,
+            use_llm_cache=False,
+            max_llm_concurrency=params.max_llm_concurrency,
+            stream_dump=params.stream_dump,
+        )),
+        ('action', AutomProjectActionConverter(), AutomProjectActionConvertParams(
+            autom_frontend_root_path=corpus.autom_frontend_root_path,
+            api_src_relpath='lib/apis',
+            use_llm_cache=False,
+            max_llm_concurrency=params.max_llm_concurrency,
+            stream_dump=params.stream_dump,
+        )),
+    ]
+
+    stage_benchmarks: list[StageBenchmark] = []
+    started_at = time.perf_counter()
+    try:
+        for stage, worker, stage_params in stages:
+            before = fake_client.stats()
+            stage_started_at = time.perf_counter()
+            resp = worker.invoke(Request(body=stage_params))
+            wall_time = time.perf_counter() - stage_started_at
+            after = fake_client.stats()
+            files_content: FilesContent = resp.body
+            stage_benchmarks.append(StageBenchmark(
+                stage=stage,
+                wall_time=wall_time,
+                n_files=len(files_content.map),
+                n_failures=len(files_content.failures),
+                n_requests=after.n_requests - before.n_requests,
+                prompt_tokens=after.prompt_tokens - before.prompt_tokens,
+                completion_tokens=after.completion_tokens - before.completion_tokens,
+                llm_latency=after.total_latency - before.total_latency,
+                peak_rss_mb=get_peak_rss_mb(),
+            ))
+            autom_logger.info(f"[E2EBenchmark] Stage {stage}: {wall_time:.2f}s, {stage_benchmarks[-1].n_requests} requests.")
+    finally:
+        set_openai_client_override(None)
+        rate_limiter.configure(rpm=previous_rpm, tpm=previous_tpm)
+        llm_call_executor.configure(previous_max_llm_concurrency)
+        files_stream_writer.configure(previous_stream_dump)
+        if tracer is not None:
+            tracer.dump_chrome_trace(params.trace_path)
+            if not was_tracing:
+                disable_tracing()
+        if params.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return E2EBenchmarkReport(
+        params=params,
+        wall_time=time.perf_counter() - started_at,
+        peak_rss_mb=get_peak_rss_mb(),
+        n_requests=fake_client.stats().n_requests,
+        stages=stage_benchmarks,
+        llm_usage=get_llm_usage_ledger().build_report(),
+    )
+
+
+__all__ = [
+    'E2EBenchmarkParams',
+    'StageBenchmark',
+    'E2EBenchmarkReport',
+    'run_e2e_benchmark',
+]
@@ -0,0 +1,200 @@
+import re
+import math
+import time
+import types
+import random
+import typing
+import threading
+from typing import Any, Callable, Optional
+
+from pydantic import BaseModel
+from openai.types import CompletionUsage
+from openai.types.chat import ParsedChatCompletion, ParsedChoice, ParsedChatCompletionMessage
+
+from azathoth.common import estimate_tokens, estimate_messages_tokens
+
+
+class FakeLLMConfig(BaseModel):
+    """How the FakeOpenAIClient behaves. Latencies follow a log-normal distribution."""
+    latency_median: float = 0.5
+    latency_sigma: float = 0.5
+    failure_rate: float = 0.0
+    seed: int = 0
+
+
+class FakeLLMStats(BaseModel):
+    n_requests: int = 0
+    n_failures: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_latency: float = 0.0
+    model_n_requests: dict[str, int] = {}
+
+
+FakeOutputBuilder = Callable[[type[BaseModel], list[dict]], dict]
+
+
+class FakeOpenAIClient:
+    """Local stand-in for the OpenAI client, `beta.chat.completions.parse` returns a deterministic structured output after a simulated latency. Install it with `set_openai_client_override`."""
+    def __init__(self, config: FakeLLMConfig | None = None):
+        self.config = config or FakeLLMConfig()
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._stats = FakeLLMStats()
+
+    @property
+    def beta(self) -> 'FakeOpenAIClient':
+        return self
+
+    @property
+    def chat(self) -> 'FakeOpenAIClient':
+        return self
+
+    @property
+    def completions(self) -> 'FakeOpenAIClient':
+        return self
+
+    def stats(self) -> FakeLLMStats:
+        with self._lock:
+            return self._stats.model_copy(deep=True)
+
+    def _draw(self) -> tuple[float, bool]:
+        with self._lock:
+            latency = self._rng.lognormvariate(math.log(self.config.latency_median), self.config.latency_sigma) if self.config.latency_median > 0 else 0.0
+            return latency, self._rng.random() < self.config.failure_rate
+
+    def parse(self, *, model: str, messages: list[dict], response_format: type[BaseModel], timeout: Optional[float] = None, **kwargs: Any) -> ParsedChatCompletion:
+        latency, is_failure = self._draw()
+        is_timeout = timeout is not None and latency > timeout
+        time.sleep(min(latency, timeout) if is_timeout else latency)
+
+        prompt_tokens = estimate_messages_tokens(messages)
+        with self._lock:
+            self._stats.n_requests += 1
+            request_id = f'fake-{self._stats.n_requests}'
+            self._stats.total_latency += latency
+            self._stats.model_n_requests[model] = self._stats.model_n_requests.get(model, 0) + 1
+            if is_failure or is_timeout:
+                self._stats.n_failures += 1
+        if is_failure or is_timeout:
+            raise TimeoutError(f"Fake {model} request timed out")
+
+        parsed = response_format.model_validate(build_fake_output(response_format, messages))
+        content = parsed.model_dump_json()
+        completion_tokens = estimate_tokens(content)
+        with self._lock:
+            self._stats.prompt_tokens += prompt_tokens
+            self._stats.completion_tokens += completion_tokens
+
+        return ParsedChatCompletion.model_construct(
+            id=request_id,
+            object='chat.completion',
+            created=int(time.time()),
+            model=model,
+            choices=[ParsedChoice.model_construct(
+                index=0,
+                finish_reason='stop',
+                logprobs=None,
+                message=ParsedChatCompletionMessage.model_construct(role='assistant', content=content, parsed=parsed, refusal=None),
+            )],
+            usage=CompletionUsage(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, total_tokens=prompt_tokens + completion_tokens),
+        )
+
+
+route_decorator_pattern = re.compile(r'@\w+\.(?:get|post|put|patch|delete)\(\s*["\']([^"\']*)["\']')
+response_model_pattern = re.compile(r'response_model\s*=\s*([\w\.\[\], ]+?)\s*[,)]')
+body_data_pattern = re.compile(r'body_data\s*:\s*([\w\.\[\]]+)')
+class_name_pattern = re.compile(r'^class\s+(\w+)', re.MULTILINE)
+export_name_pattern = re.compile(r'^export\s+(?:const|async function|function)\s+(\w+)', re.MULTILINE)
+batch_function_pattern = re.compile(r'<api_function name="(\w+)">\n')
+
+
+def _snake_to_camel(name: str) -> str:
+    head, *tail = name.split('_')
+    return head + ''.join(part.title() for part in tail)
+
+
+def fake_function_key_result(function_source: str) -> dict:
+    match = route_decorator_pattern.search(function_source)
+    route = '/' + (match.group(1) if match else '').lstrip('/')
+    response_model = response_model_pattern.search(function_source)
+    body_data = body_data_pattern.search(function_source)
+    placeholders = re.findall(r'\{(\w+)\}', route)
+    return {
+        'api_suffix_route': route,
+        'has_response_model': response_model is not None,
+        'response_model': response_model.group(1).strip() if response_model else None,
+        'has_body_data': body_data is not None,
+        'body_data_type': body_data.group(1) if body_data else None,
+        'has_current_user': 'current_user' in function_source,
+        'other_params': {_snake_to_camel(placeholder): 'string' for placeholder in placeholders} or None,
+    }
+
+
+def fake_segment_output(response_format: type[BaseModel], messages: list[dict]) -> dict:
+    code = messages[-1]['content']
+    return {'converted_segment': '\n\n'.join(
+        f'export type {class_name} = {{\n  id: string;\n}};' for class_name in class_name_pattern.findall(code)
+    )}
+
+
+def fake_key_result_output(response_format: type[BaseModel], messages: list[dict]) -> dict:
+    return fake_function_key_result(messages[-1]['content'])
+
+
+def fake_key_result_batch_output(response_format: type[BaseModel], messages: list[dict]) -> dict:
+    parts = batch_function_pattern.split(messages[-1]['content'])
+    # parts: [preamble, name_1, source_1, name_2, source_2, ...]
+    return {'results': [
+        {'function_name': function_name, **fake_function_key_result(function_source)}
+        for function_name, function_source in zip(parts[1::2], parts[2::2])
+    ]}
+
+
+def fake_server_action_output(response_format: type[BaseModel], messages: list[dict]) -> dict:
+    api_source = messages[-1]['content']
+    return {'server_action_code': '"use server";\n\n' + '\n\n'.join(
+        f'export async function {name}Action(params: any) {{\n  return await {name}(params);\n}}' for name in export_name_pattern.findall(api_source)
+    ) + '\n'}
+
+
+# the builders of the structured outputs azathoth asks for, matched by the field names of the response format
+fake_output_builders: list[tuple[set[str], FakeOutputBuilder]] = [
+    ({'converted_segment'}, fake_segment_output),
+    ({'api_suffix_route', 'has_response_model'}, fake_key_result_output),
+    ({'results'}, fake_key_result_batch_output),
+    ({'server_action_code'}, fake_server_action_output),
+]
+
+
+def build_fake_output(response_format: type[BaseModel], messages: list[dict]) -> dict:
+    """Build the raw structured output of `response_format` for the messages."""
+    field_names = set(response_format.model_fields)
+    for required_field_names, builder in fake_output_builders:
+        if required_field_names <= field_names:
+            return builder(response_format, messages)
+    return {name: fake_value(field.annotation) for name, field in response_format.model_fields.items() if field.is_required()}
+
+
+def fake_value(annotation: Any) -> Any:
+    """A placeholder value of a type annotation."""
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin in (typing.Union, types.UnionType):
+        return None if type(None) in args else fake_value(args[0])
+    if origin is typing.Literal:
+        return args[0]
+    if origin in (list, set, tuple):
+        return []
+    if origin is dict:
+        return {}
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return {name: fake_value(field.annotation) for name, field in annotation.model_fields.items() if field.is_required()}
+    return {str: 'fake', int: 0, float: 0.0, bool: False}.get(annotation)
+
+
+__all__ = [
+    'FakeLLMConfig',
+    'FakeLLMStats',
+    'FakeOpenAIClient',
+]
@@ -0,0 +1,335 @@
+import gc
+import sys
+import time
+import shutil
+import platform
+import tempfile
+import tracemalloc
+from pathlib import Path
+from statistics import median
+from typing import Any, Callable, Optional
+
+from pydantic import BaseModel
+from autom.engine import Request
+from autom.logger import autom_logger
+
+from azathoth.ast_utils import extract_python_parts, extract_imports_info, extract_function_dependencies, find_class_source_in_directory
+from azathoth.symbol_index import SymbolIndex, get_symbol_index
+from azathoth.common import PyFilePath, PyImportsRemainsSplitter, recursive_segment_text, split_py_imports_remains, get_source_file_cache
+from azathoth.common.agent.ts_export_helper import add_index_ts_recursive
+
+
+micro_benchmark_sizes = [10, 100, 1000, 10000]
+# a file of about 400 lines, and one of about 40,000
+normal_file_shape = (5, 20)
+long_file_shape = (500, 2000)
+
+
+class MicroBenchmarkResult(BaseModel):
+    name: str
+    n_rounds: int
+    ops_per_sec: float
+    median_seconds: float
+    alloc_peak_kb: float
+    alloc_retained_kb: float
+
+
+class MicroBenchmarkRegression(BaseModel):
+    name: str
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def change(self) -> float:
+        return self.current / self.baseline - 1 if self.baseline else 0.0
+
+
+class MicroBenchmarkReport(BaseModel):
+    python_version: str
+    platform: str
+    results: list[MicroBenchmarkResult]
+
+    def format(self) -> str:
+        lines = [f"{'benchmark':<64} {'rounds':>7} {'ops/s':>11} {'median(ms)':>11} {'peak(KB)':>10} {'kept(KB)':>10}"]
+        for result in self.results:
+            lines.append(
+                f"{result.name:<64} {result.n_rounds:>7} {result.ops_per_sec:>11.2f} {result.median_seconds * 1000:>11.3f} "
+                f"{result.alloc_peak_kb:>10.1f} {result.alloc_retained_kb:>10.1f}"
+            )
+        return '\n'.join(lines)
+
+    def compare(self, baseline: 'MicroBenchmarkReport', tolerance: float = 0.2) -> list[MicroBenchmarkRegression]:
+        """The benchmarks of both reports whose ops/sec dropped, or whose peak allocation grew, by more than `tolerance`."""
+        baseline_results = {result.name: result for result in baseline.results}
+        regressions: list[MicroBenchmarkRegression] = []
+        for result in self.results:
+            baseline_result = baseline_results.get(result.name)
+            if baseline_result is None:
+                continue
+            if result.ops_per_sec < baseline_result.ops_per_sec * (1 - tolerance):
+                regressions.append(MicroBenchmarkRegression(name=result.name, metric='ops_per_sec', baseline=baseline_result.ops_per_sec, current=result.ops_per_sec))
+            if result.alloc_peak_kb > baseline_result.alloc_peak_kb * (1 + tolerance):
+                regressions.append(MicroBenchmarkRegression(name=result.name, metric='alloc_peak_kb', baseline=baseline_result.alloc_peak_kb, current=result.alloc_peak_kb))
+        return regressions
+
+
+class MicroBenchmarkCase:
+    """A hot path to measure: `setup(workdir)` writes its inputs and returns the operation to time.
+
+    `cold` cases clear the SourceFileCache before each round(untimed), so reading and parsing the files is measured too.
+    """
+    def __init__(self, name: str, setup: Callable[[Path], Callable[[], Any]], cold: bool = False):
+        self.name = name
+        self.setup = setup
+        self.cold = cold
+
+
+def write_python_module(path: Path, n_classes: int, n_functions: int, import_lines: list[str]):
+    """Write a module shaped like a backend router: imports(one multi-line), pydantic classes and decorated endpoints using them."""
+    lines = [
+        'from typing import Optional',
+        'from fastapi import (',
+        '    APIRouter,',
+        '    Depends,',
+        ')',
+        'from pydantic import BaseModel, Field',
+        *import_lines,
+        '',
+        'router = APIRouter()',
+        '',
+    ]
+    for i in range(n_classes):
+        lines += [
+            '',
+            f'class Class{i}(BaseModel):',
+            f'    """Class {i}."""',
+            '    id: str',
+            f'    name: str = Field(..., description="The name of class {i}")',
+            '    count: int = 0',
+            '    score: Optional[float] = None',
+            '',
+        ]
+    for i in range(n_functions):
+        body_class = f'Class{i % n_classes}' if n_classes else 'dict'
+        lines += [
+            '',
+            f'@router.post("/items_{i}/{{item_id}}", response_model={body_class})',
+            f'async def handle_item_{i}(item_id: str, body_data: {body_class}, db = Depends(get_db)) -> {body_class}:',
+            f'    """Endpoint {i}."""',
+            '    result = await db.get(item_id)',
+            '',
+            '',
+            '    return result',
+            '',
+        ]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text('\n'.join(lines))
+
+
+def write_python_package(root: Path, n_files: int, depth: int = 1) -> list[Path]:
+    """Write `n_files` modules of 2 classes under a chain of `depth` nested packages, spread evenly over the levels."""
+    package_dirs = [root / 'pkg']
+    for level in range(1, depth):
+        package_dirs.append(package_dirs[-1] / f'level_{level}')
+    for package_dir in package_dirs:
+        package_dir.mkdir(parents=True, exist_ok=True)
+        (package_dir / '__init__.py').write_text('')
+
+    file_paths = []
+    for i in range(n_files):
+        file_path = package_dirs[i % depth] / f'module_{i}.py'
+        write_python_module(file_path, 2, 2, [])
+        file_paths.append(file_path)
+    return file_paths
+
+
+def write_ts_tree(root: Path, n_files: int, depth: int = 1):
+    """Write `n_files` TypeScript files under a chain of `depth` nested directories, spread evenly over the levels."""
+    dirs = [root]
+    for level in range(1, depth):
+        dirs.append(dirs[-1] / f'level_{level}')
+    for directory in dirs:
+        directory.mkdir(parents=True, exist_ok=True)
+    for i in range(n_files):
+        (dirs[i % depth] / f'api{i}.ts').write_text(f'export const api{i} = () => {i};\n')
+
+
+def get_import_lines(n_imports: int) -> list[str]:
+    return [f'from pkg.module_{i} import Class0, Class1' for i in range(n_imports)]
+
+
+def setup_extract_python_parts(shape: tuple[int, int]) -> Callable[[Path], Callable[[], Any]]:
+    def setup(workdir: Path) -> Callable[[], Any]:
+        file_path = workdir / 'app/api/v1/endpoints/router.py'
+        write_python_module(file_path, *shape, get_import_lines(10))
+        return lambda: extract_python_parts(file_path, workdir)
+    return setup
+
+
+def setup_py_splitter(shape: tuple[int, int]) -> Callable[[Path], Callable[[], Any]]:
+    def setup(workdir: Path) -> Callable[[], Any]:
+        file_path = workdir / 'router.py'
+        write_python_module(file_path, *shape, get_import_lines(10))
+        splitter = PyImportsRemainsSplitter()
+        req = Request(body=PyFilePath(filepath=file_path))
+        return lambda: splitter.invoke(req)
+    return setup
+
+
+def setup_extract_imports_info(n_imports: int) -> Callable[[Path], Callable[[], Any]]:
+    def setup(workdir: Path) -> Callable[[], Any]:
+        multi_line_imports = [f'from pkg.multi_{i} import (\n    Class0,\n    Class1,\n)' for i in range(n_imports // 10)]
+        imports_content = '\n'.join(get_import_lines(n_imports) + multi_line_imports + [f'import module_{i}' for i in range(n_imports // 10)])
+        return lambda: extract_imports_info(imports_content)
+    return setup
+
+
+def setup_recursive_segment_text(shape: tuple[int, int]) -> Callable[[Path], Callable[[], Any]]:
+    def setup(workdir: Path) -> Callable[[], Any]:
+        file_path = workdir / 'router.py'
+        write_python_module(file_path, *shape, [])
+        _, remains_content = split_py_imports_remains(file_path.read_text())
+        return lambda: recursive_segment_text(remains_content, ['\n\n\n'], max_lines_per_segment=200, max_tokens_per_segment=2000)
+    return setup
+
+
+def setup_find_class_source_in_directory(n_files: int, depth: int) -> Callable[[Path], Callable[[], Any]]:
+    def setup(workdir: Path) -> Callable[[], Any]:
+        write_python_package(workdir, n_files, depth)
+        # every module defines them, so every file is parsed and its classes unparsed
+        return lambda: find_class_source_in_directory(workdir / 'pkg', ['Class0', 'Class1'])
+    return setup
+
+
+def setup_extract_function_dependencies(n_files: int, warm_index: bool) -> Callable[[Path], Callable[[], Any]]:
+    """With `warm_index` the SymbolIndex is built once outside the timed operation, else every round builds a new one and its build is timed."""
+    def setup(workdir: Path) -> Callable[[], Any]:
+        write_python_package(workdir, n_files)
+        imports = [f'from pkg.module_{i} import Class0, Class1' for i in range(0, n_files, max(1, n_files // 10))]
+        function_header = '@router.post("/items")\nasync def handle(body_data: Class0, other: Class1, db: Session) -> Class0:\n    pass'
+        if warm_index:
+            symbol_index = get_symbol_index(workdir)
+            return lambda: extract_function_dependencies(function_header, imports, workdir, symbol_index=symbol_index)
+
+        def op():
+            symbol_index = SymbolIndex(workdir)
+            symbol_index.refresh()
+            return extract_function_dependencies(function_header, imports, workdir, symbol_index=symbol_index)
+        return op
+    return setup
+
+
+def setup_add_index_ts_recursive(n_files: int, depth: int) -> Callable[[Path], Callable[[], Any]]:
+    def setup(workdir: Path) -> Callable[[], Any]:
+        write_ts_tree(workdir / 'types', n_files, depth)
+        return lambda: add_index_ts_recursive(workdir / 'types', {})
+    return setup
+
+
+def get_micro_benchmark_cases(sizes: list[int] | None = None) -> list[MicroBenchmarkCase]:
+    """The cases of the suite, the directory cases are repeated for each file count of `sizes` and once deeply nested."""
+    sizes = sizes or micro_benchmark_sizes
+    deep_size = min(1000, max(sizes))
+    cases: list[MicroBenchmarkCase] = []
+    for label, shape in [('normal', normal_file_shape), ('long', long_file_shape)]:
+        cases += [
+            MicroBenchmarkCase(f'extract_python_parts[file={label}]', setup_extract_python_parts(shape), cold=True),
+            MicroBenchmarkCase(f'PyImportsRemainsSplitter.invoke[file={label}]', setup_py_splitter(shape), cold=True),
+            MicroBenchmarkCase(f'recursive_segment_text[file={label}]', setup_recursive_segment_text(shape)),
+        ]
+    cases += [MicroBenchmarkCase(f'extract_imports_info[imports={n_imports}]', setup_extract_imports_info(n_imports)) for n_imports in (100, 10000)]
+    for n_files in sizes:
+        cases += [
+            MicroBenchmarkCase(f'find_class_source_in_directory[files={n_files}]', setup_find_class_source_in_directory(n_files, 1), cold=True),
+            MicroBenchmarkCase(f'extract_function_dependencies[files={n_files},index=warm]', setup_extract_function_dependencies(n_files, warm_index=True)),
+            MicroBenchmarkCase(f'extract_function_dependencies[files={n_files},index=cold]', setup_extract_function_dependencies(n_files, warm_index=False), cold=True),
+            MicroBenchmarkCase(f'add_index_ts_recursive[files={n_files}]', setup_add_index_ts_recursive(n_files, 1)),
+        ]
+    cases += [
+        MicroBenchmarkCase(f'find_class_source_in_directory[files={deep_size},depth=50]', setup_find_class_source_in_directory(deep_size, 50), cold=True),
+        MicroBenchmarkCase(f'add_index_ts_recursive[files={deep_size},depth=50]', setup_add_index_ts_recursive(deep_size, 50)),
+    ]
+    return cases
+
+
+def run_micro_benchmark_case(case: MicroBenchmarkCase, workdir: Path, min_time: float = 1.0, min_rounds: int = 3, max_rounds: int = 10000) -> MicroBenchmarkResult:
+    """Time rounds of the case until `min_time` seconds and `min_rounds` rounds are reached, with the garbage collector paused. Allocations are traced in one extra round."""
+    op = case.setup(workdir)
+    source_file_cache = get_source_file_cache()
+
+    def prepare():
+        if case.cold:
+            source_file_cache.clear()
+
+    # warm up imports, caches of the interpreter and lazily built lookups
+    prepare()
+    op()
+
+    durations: list[float] = []
+    gc.collect()
+    gc.disable()
+    try:
+        while len(durations) < max_rounds and (len(durations) < min_rounds or sum(durations) < min_time):
+            prepare()
+            started_at = time.perf_counter()
+            op()
+            durations.append(time.perf_counter() - started_at)
+    finally:
+        gc.enable()
+
+    prepare()
+    tracemalloc.start()
+    try:
+        result = op()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+
+    return MicroBenchmarkResult(
+        name=case.name,
+        n_rounds=len(durations),
+        ops_per_sec=len(durations) / sum(durations),
+        median_seconds=median(durations),
+        alloc_peak_kb=peak / 1024,
+        alloc_retained_kb=retained / 1024,
+    )
+
+
+def run_micro_benchmarks(sizes: list[int] | None = None, name_filter: Optional[str] = None, min_time: float = 1.0, workdir: Optional[Path] = None) -> MicroBenchmarkReport:
+    """Run the cases of the suite whose name contains `name_filter`, each in a fresh directory under `workdir`(a temporary directory by default).
+
+    The inputs are generated deterministically, so reports of the same code on the same machine are comparable.
+    """
+    root = workdir or Path(tempfile.mkdtemp(prefix='azathoth-micro-'))
+    results: list[MicroBenchmarkResult] = []
+    try:
+        for i, case in enumerate(get_micro_benchmark_cases(sizes)):
+            if name_filter and name_filter not in case.name:
+                continue
+            case_dir = root / f'case_{i}'
+            case_dir.mkdir(parents=True, exist_ok=True)
+            results.append(run_micro_benchmark_case(case, case_dir, min_time=min_time))
+            autom_logger.info(f"[MicroBenchmark] {case.name}: {results[-1].ops_per_sec:.2f} ops/s.")
+            shutil.rmtree(case_dir, ignore_errors=True)
+    finally:
+        if workdir is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+    return MicroBenchmarkReport(
+        python_version=sys.version.split()[0],
+        platform=platform.platform(),
+        results=results,
+    )
+
+
+__all__ = [
+    'MicroBenchmarkResult',
+    'MicroBenchmarkRegression',
+    'MicroBenchmarkReport',
+    'MicroBenchmarkCase',
+    'get_micro_benchmark_cases',
+    'run_micro_benchmark_case',
+    'run_micro_benchmarks',
+]
@@ -1,3 +1,17 @@
 from .enum import *
 from .agent import *
 from .schema import *
+from .state import *
+from .singleton import *
+from .source_file import *
+from .llm_cache import *
+from .llm_executor import *
+from .tokens import *
+from .rate_limiter import *
+from .llm_usage import *
+from .llm_budget import *
+from .llm_call import *
+from .files_stream import *
+from .run_journal import *
+from .stage_timeline import *
+from .tracing import *
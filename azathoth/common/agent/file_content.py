@@ -7,7 +7,8 @@ from autom.engine import (
 )
 from autom.logger import autom_logger
 
-from ..schema import FilesContent, FileContent
+from ..schema import FilesContent, FileContent, ConvertFailure, SourceStamp
+from ..files_stream import get_files_stream_writer
 
 
 class FilesContentAggregator(AggregatorWorker):
@@ -22,7 +23,22 @@ class FilesContentAggregator(AggregatorWorker):
                 name='update_file_map',
                 input_type=dict,
                 socket_handler=cls._update_file_map,
-            )
+            ),
+            Socket(
+                name='add_failures',
+                input_type=list,
+                socket_handler=cls._add_failures,
+            ),
+            Socket(
+                name='add_removed_filepaths',
+                input_type=list,
+                socket_handler=cls._add_removed_filepaths,
+            ),
+            Socket(
+                name='update_source_stamps',
+                input_type=dict,
+                socket_handler=cls._update_source_stamps,
+            ),
         ]
 
     def _update_file_map(self, data: dict[Path, str]):
@@ -34,6 +50,21 @@ class FilesContentAggregator(AggregatorWorker):
             self._output_as_dict['map'] = {}
         self._output_as_dict['map'].update(data)
 
+    def _add_failures(self, data: list[ConvertFailure]):
+        if 'failures' not in self._output_as_dict:
+            self._output_as_dict['failures'] = []
+        self._output_as_dict['failures'].extend(data)
+
+    def _add_removed_filepaths(self, data: list[Path]):
+        if 'removed_filepaths' not in self._output_as_dict:
+            self._output_as_dict['removed_filepaths'] = []
+        self._output_as_dict['removed_filepaths'].extend(data)
+
+    def _update_source_stamps(self, data: dict[Path, SourceStamp]):
+        if 'source_stamps' not in self._output_as_dict:
+            self._output_as_dict['source_stamps'] = {}
+        self._output_as_dict['source_stamps'].update(data)
+
 
 class FileContentFilesContentPlugger(PluggerWorker):
     @classmethod
@@ -44,12 +75,7 @@ class FileContentFilesContentPlugger(PluggerWorker):
         req_body: FileContent = req.body
         return Response[SocketRequestBody].from_worker(self).success(
             body=SocketRequestBody(
-                calls=[
-                    SocketCall(
-                        socket_name='update_file_map',
-                        data={req_body.filepath: req_body.content},
-                    ),
-                ]
+                calls=[file_content_socket_call(req_body)]
             )
         )
 
@@ -64,10 +90,7 @@ class FileContentFilesContentCollectPlugger(CollectPluggerWorker):
         calls = []
         for i, req_item in req_body.batch_requests.items():
             req_item_body: FileContent = req_item.body
-            calls.append(SocketCall(
-                socket_name='update_file_map',
-                data={req_item_body.filepath: req_item_body.content},
-            ))
+            calls.append(file_content_socket_call(req_item_body))
 
         return Response[SocketRequestBody].from_worker(self).success(
             body=SocketRequestBody(
@@ -86,12 +109,7 @@ class FilesContentFilesContentPlugger(PluggerWorker):
         req_body: FilesContent = req.body
         return Response[SocketRequestBody].from_worker(self).success(
             body=SocketRequestBody(
-                calls=[
-                    SocketCall(
-                        socket_name='update_file_map',
-                        data=req_body.map,
-                    ),
-                ]
+                calls=files_content_socket_calls(req_body)
             )
         )
 
@@ -106,10 +124,7 @@ class FilesContentFilesContentCollectPlugger(CollectPluggerWorker):
         calls = []
         for i, req_item in req_body.batch_requests.items():
             req_item_body: FilesContent= req_item.body
-            calls.append(SocketCall(
-                socket_name='update_file_map',
-                data=req_item_body.map,
-            ))
+            calls.extend(files_content_socket_calls(req_item_body))
 
         return Response[SocketRequestBody].from_worker(self).success(
             body=SocketRequestBody(
@@ -118,6 +133,25 @@ class FilesContentFilesContentCollectPlugger(CollectPluggerWorker):
         )
 
 
+def file_content_socket_call(file_content: FileContent) -> SocketCall:
+    """The FilesContentAggregator call merging a FileContent: its content, or its failure."""
+    if file_content.failure is not None:
+        return SocketCall(socket_name='add_failures', data=[file_content.failure])
+    return SocketCall(socket_name='update_file_map', data={file_content.filepath: file_content.content})
+
+
+def files_content_socket_calls(files_content: FilesContent) -> list[SocketCall]:
+    """The FilesContentAggregator calls merging a FilesContent: its map, and its failures, removed filepaths and source stamps if any."""
+    calls = [SocketCall(socket_name='update_file_map', data=files_content.map)]
+    if files_content.failures:
+        calls.append(SocketCall(socket_name='add_failures', data=files_content.failures))
+    if files_content.removed_filepaths:
+        calls.append(SocketCall(socket_name='add_removed_filepaths', data=files_content.removed_filepaths))
+    if files_content.source_stamps:
+        calls.append(SocketCall(socket_name='update_source_stamps', data=files_content.source_stamps))
+    return calls
+
+
 class FileContentAggregator(AggregatorWorker):
     @classmethod
     def define_output_schema(cls) -> AutomSchema | None:
@@ -140,7 +174,12 @@ class FileContentAggregator(AggregatorWorker):
                 name='add_indexed_segment',
                 input_type=dict,
                 socket_handler=cls._add_indexed_segment,
-            )
+            ),
+            Socket(
+                name='add_failure',
+                input_type=ConvertFailure,
+                socket_handler=cls._add_failure,
+            ),
         ]
 
     def _set_filepath(self, filepath: Path):
@@ -154,7 +193,24 @@ class FileContentAggregator(AggregatorWorker):
             self._output_as_dict['indexed_segments'] = {}
         self._output_as_dict['indexed_segments'].update(data)
 
+    def _add_failure(self, failure: ConvertFailure):
+        if 'failures' not in self._output_as_dict:
+            self._output_as_dict['failures'] = []
+        self._output_as_dict['failures'].append(failure)
+
     def build_output_from_dict(self):
+        if self._output_as_dict.get('failures'):
+            # one failed part fails the whole file, the others are not worth a partial file
+            failures: list[ConvertFailure] = self._output_as_dict['failures']
+            return FileContent(
+                filepath=self._output_as_dict['filepath'],
+                content='',
+                failure=ConvertFailure(
+                    item=f"{len(failures)} parts of {self._output_as_dict['filepath'].name}",
+                    filepath=self._output_as_dict['filepath'],
+                    error='; '.join(f'{failure.item}: {failure.error}' for failure in failures),
+                ),
+            )
         if 'content' in self._output_as_dict:
             return FileContent(
                 filepath=self._output_as_dict['filepath'],
@@ -170,7 +226,28 @@ class FileContentAggregator(AggregatorWorker):
         )
 
 
+class FileContentStreamer(AgentWorker):
+    """Hand a converted file to the FilesStreamWriter as soon as it is produced, if streaming is enabled. The output is the input."""
+    @classmethod
+    def define_input_schema(cls) -> AutomSchema | None:
+        return FileContent
+
+    @classmethod
+    def define_output_schema(cls) -> AutomSchema | None:
+        return FileContent
+
+    def invoke(self, req: Request) -> Response:
+        req_body: FileContent = req.body
+        if req_body.failure is None:
+            get_files_stream_writer().put(req_body.filepath, req_body.content)
+        return Response[FileContent].from_worker(self).success(body=req_body)
+
+
 class FilesDumper(AgentWorker):
+    """Dump FilesContent to disk, only writing the files which changed. The output is the input with its `dump_report` set.
+
+    The files already streamed by the FilesStreamWriter with the same content are not dumped again.
+    """
     @classmethod
     def define_input_schema(cls) -> AutomSchema | None:
         return FilesContent
@@ -182,12 +259,16 @@ class FilesDumper(AgentWorker):
     def invoke(self, req: Request) -> Response:
         req_body: FilesContent = req.body
         try:
-            req_body.dump_to_disk()
+            already_dumped = get_files_stream_writer().take_dumped(req_body)
+            dump_report = req_body.dump_to_disk(already_dumped=already_dumped)
         except Exception as e:
             autom_logger.error(f"Failed to dump FilesContent to disk: {e}.")
             raise e
+        autom_logger.info(f"[FilesDumper] {dump_report.n_written} files written, {dump_report.n_skipped} unchanged, {dump_report.n_removed} removed, {len(already_dumped)} of them streamed before.")
+        for failure in req_body.failures:
+            autom_logger.warning(f"[FilesDumper] Not dumped, {failure.item} failed: {failure.error}")
         return Response[FilesContent].from_worker(self).success(
-            body=req_body
+            body=req_body.model_copy(update={'dump_report': dump_report})
         )
 
 
@@ -196,6 +277,7 @@ __all__ = [
     'FilesContentFilesContentPlugger',
     'FilesContentFilesContentCollectPlugger',
     'FileContentFilesContentPlugger',
+    'FileContentStreamer',
     'FileContentFilesContentCollectPlugger',
     'FileContentAggregator',
     'FilesDumper',
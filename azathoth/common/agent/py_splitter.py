@@ -1,8 +1,10 @@
+import io
 import re
 
 from autom.engine import AutomSchema, Request, Response, AgentWorker
 
 from ..schema import PyFilePath, SplittedPyFileContent
+from ..source_file import read_source_file
 
 
 class PyImportsRemainsSplitter(AgentWorker):
@@ -19,51 +21,62 @@ class PyImportsRemainsSplitter(AgentWorker):
         req_body: PyFilePath = req.body
         file_path = req_body.filepath
 
-        imports_content = []
-        remains_content = []
-        is_import_section = False
+        imports_content, remains_content = split_py_imports_remains(read_source_file(file_path).text)
 
-        # Define regex patterns for `import` and `from ... import` statements
-        import_pattern = re.compile(r'^(import|from)\s+.*')
+        return Response[SplittedPyFileContent].from_worker(self).success(
+            body=SplittedPyFileContent(
+                filepath=req_body.filepath,
+                imports_content=imports_content,
+                remains_content=remains_content,
+            )
+        )
 
-        with file_path.open('r', encoding='utf-8') as f:
-            lines = f.readlines()
 
-        current_import_block = []
+def split_py_imports_remains(text: str) -> tuple[str, str]:
+    """Split the content of a Python file into its import statements and the remaining content.
 
-        for line in lines:
-            stripped_line = line.strip()
+    Returns:
+        tuple[str, str]: (imports_content, remains_content)
+    """
+    imports_content = []
+    remains_content = []
+    is_import_section = False
 
-            # Handle multiline imports by checking for parentheses
-            if import_pattern.match(stripped_line) or is_import_section:
-                current_import_block.append(line)
+    # Define regex patterns for `import` and `from ... import` statements
+    import_pattern = re.compile(r'^(import|from)\s+.*')
 
-                if "(" in stripped_line and not ")" in stripped_line:
-                    is_import_section = True  # Start of multiline import
-                elif ")" in stripped_line:
-                    is_import_section = False  # End of multiline import
-                    imports_content.extend(current_import_block)
-                    current_import_block = []
-                elif not is_import_section:
-                    imports_content.extend(current_import_block)
-                    current_import_block = []
+    lines = io.StringIO(text).readlines()
 
-            else:
-                remains_content.append(line)
+    current_import_block = []
 
-        # If there's leftover import block content, add it to imports
-        if current_import_block:
-            imports_content.extend(current_import_block)
+    for line in lines:
+        stripped_line = line.strip()
 
-        return Response[SplittedPyFileContent].from_worker(self).success(
-            body=SplittedPyFileContent(
-                filepath=req_body.filepath,
-                imports_content="".join(imports_content),
-                remains_content="".join(remains_content)
-            )
-        )
+        # Handle multiline imports by checking for parentheses
+        if import_pattern.match(stripped_line) or is_import_section:
+            current_import_block.append(line)
+
+            if "(" in stripped_line and not ")" in stripped_line:
+                is_import_section = True  # Start of multiline import
+            elif ")" in stripped_line:
+                is_import_section = False  # End of multiline import
+                imports_content.extend(current_import_block)
+                current_import_block = []
+            elif not is_import_section:
+                imports_content.extend(current_import_block)
+                current_import_block = []
+
+        else:
+            remains_content.append(line)
+
+    # If there's leftover import block content, add it to imports
+    if current_import_block:
+        imports_content.extend(current_import_block)
+
+    return "".join(imports_content), "".join(remains_content)
 
 
 __all__ = [
     'PyImportsRemainsSplitter',
+    'split_py_imports_remains',
 ]
@@ -1,15 +1,19 @@
-from typing import Type
+import ast
+
+from autom.logger import autom_logger
 from autom.engine import Request, Response, AgentWorker, AggregatorWorker, Socket
 from autom.engine.graph.base.worker import AutomSchema
 
-from ..schema import FileRecursiveSegmentParams, TextSegments, TextRecursiveSegmentParams
+from ..enum import SegmentStrategy
+from ..tokens import estimate_tokens
+from ..schema import BaseRecursiveSegmentParams, FileRecursiveSegmentParams, TextSegments, TextRecursiveSegmentParams
 
 
 # TODO: use langchain recursive text splitter in the future
 class FileRecursiveSegmenter(AgentWorker):
-    """File Segmenter to split a file into segments. User can specify `max_lines_per_segment` and `separators`.
+    """File Segmenter to split a file into segments. User can specify `strategy`, `max_lines_per_segment`, `max_tokens_per_segment` and `separators`.
 
-    Segmenter will first split the file by separators recursively until each segment has less than `max_lines_per_segment`. Too short segments will be merged until the segment has at most `max_lines_per_segment` lines.
+    See `segment_text` for how the strategies find segment boundaries.
     """
     @classmethod
     def define_input_schema(cls):
@@ -22,18 +26,17 @@ class FileRecursiveSegmenter(AgentWorker):
     def invoke(self, req: Request) -> Response:
         req_body: FileRecursiveSegmentParams = req.body
 
-        src_file_path = req_body.src_file_fullpath
-        with open(src_file_path, 'r') as f:
+        with open(req_body.filepath, 'r', encoding='utf-8') as f:
             content = f.read()
 
-        segments = recursive_segment_text(content, req_body.separators, req_body.max_lines_per_segment)
+        segments = segment_text(content, req_body)
         return Response[TextSegments].from_worker(self).success(body=segments)
 
 
 class TextRecursiveSegmenter(AgentWorker):
-    """Text Segmenter to split a text into segments. User can specify `max_lines_per_segment` and `separators`.
-    
-    RecursiveSegmenter will first split the text by separators recursively until each segment has less than `max_lines_per_segment`. Too short segments will be merged until the segment has at most `max_lines_per_segment` lines.
+    """Text Segmenter to split a text into segments. User can specify `strategy`, `max_lines_per_segment`, `max_tokens_per_segment` and `separators`.
+
+    See `segment_text` for how the strategies find segment boundaries.
     """
     @classmethod
     def define_input_schema(cls):
@@ -45,7 +48,7 @@ class TextRecursiveSegmenter(AgentWorker):
 
     def invoke(self, req: Request) -> Response:
         req_body: TextRecursiveSegmentParams = req.body
-        segments = recursive_segment_text(req_body.original_text, req_body.separators, req_body.max_lines_per_segment)
+        segments = segment_text(req_body.original_text, req_body)
         return Response[TextSegments].from_worker(self).success(body=segments)
 
 
@@ -62,6 +65,11 @@ class TextRecursiveSegmentParamsAggregator(AggregatorWorker):
                 input_type=int,
                 socket_handler=cls._set_max_lines_per_segment,
             ),
+            Socket(
+                name='set_max_tokens_per_segment',
+                input_type=int | None,
+                socket_handler=cls._set_max_tokens_per_segment,
+            ),
             Socket(
                 name='set_original_text',
                 input_type=str,
@@ -72,53 +80,215 @@ class TextRecursiveSegmentParamsAggregator(AggregatorWorker):
     def _set_max_lines_per_segment(self, max_lines_per_segment: int):
         self._output_as_dict['max_lines_per_segment'] = max_lines_per_segment
 
+    def _set_max_tokens_per_segment(self, max_tokens_per_segment: int | None):
+        self._output_as_dict['max_tokens_per_segment'] = max_tokens_per_segment
+
     def _set_original_text(self, original_text: str):
         self._output_as_dict['original_text'] = original_text
 
 
-def recursive_segment_text(text: str, separators: list[str], max_lines_per_segment: int) -> TextSegments:
+def segment_text(text: str, params: BaseRecursiveSegmentParams) -> TextSegments:
+    """Segment `text` with the strategy and budget of `params`."""
+    if params.strategy == SegmentStrategy.python_ast:
+        return ast_segment_python_text(
+            text,
+            params.max_lines_per_segment,
+            max_tokens_per_segment=params.max_tokens_per_segment,
+            separators=params.separators,
+        )
+    return recursive_segment_text(text, params.separators, params.max_lines_per_segment, max_tokens_per_segment=params.max_tokens_per_segment)
+
+
+def count_lines(text: str) -> int:
+    return text.count('\n') + 1
+
+
+class SegmentBudget:
+    """Max lines and, optionally, max estimated LLM tokens of a segment."""
+    def __init__(self, max_lines: int, max_tokens: int | None = None):
+        self.max_lines = max_lines
+        self.max_tokens = max_tokens
+
+    def measure(self, text: str) -> tuple[int, int]:
+        """Lines and estimated tokens of `text`, tokens are only estimated if there is a token budget."""
+        return count_lines(text), estimate_tokens(text) if self.max_tokens is not None else 0
+
+    def fits(self, size: tuple[int, int]) -> bool:
+        return size[0] <= self.max_lines and (self.max_tokens is None or size[1] <= self.max_tokens)
+
+    def fill_ratio(self, size: tuple[int, int]) -> float:
+        """The share of the budget taken by `size`, on its tightest dimension."""
+        ratio = size[0] / self.max_lines
+        if self.max_tokens is not None:
+            ratio = max(ratio, size[1] / self.max_tokens)
+        return ratio
+
+    def describe(self, size: tuple[int, int]) -> str:
+        return f"{size[0]} lines" + (f" / {size[1]} tokens" if self.max_tokens is not None else "")
+
+    def __str__(self) -> str:
+        return self.describe((self.max_lines, self.max_tokens))
+
+
+def make_text_segments(segments: list[str]) -> TextSegments:
+    return TextSegments(
+        n_segment=len(segments),
+        segments=segments,
+        n_tokens=[estimate_tokens(segment) for segment in segments],
+    )
+
+
+def ast_segment_python_text(
+    text: str,
+    max_lines_per_segment: int,
+    max_tokens_per_segment: int | None = None,
+    separators: list[str] | None = None,
+) -> TextSegments:
+    """
+    Segment Python source along its top-level statements.
+
+    Every top-level statement(class, assignment, type alias, function...) together with its decorators and the comments right above it is an atomic unit. Units are packed into as few segments as possible with first-fit-decreasing: they keep their source order inside a segment, but not across segments, so a segment may use a name defined in a later one. A class over the budget is split between its body statements, each chunk repeating the class header, the converted chunks are declarations of the same name to merge back. Any other oversize unit becomes a segment of its own.
+
+    Falls back to `recursive_segment_text` if `text` is not valid Python.
+    """
+    try:
+        module = ast.parse(text)
+    except SyntaxError:
+        return recursive_segment_text(text, separators or ['\n\n'], max_lines_per_segment, max_tokens_per_segment=max_tokens_per_segment)
+
+    budget = SegmentBudget(max_lines_per_segment, max_tokens_per_segment)
+    lines = text.splitlines(keepends=True)
+    units: list[str] = []
+    start = 0
+    for i, node in enumerate(module.body):
+        # trailing lines of the text belong to the last unit
+        end = node.end_lineno if i < len(module.body) - 1 else len(lines)
+        unit = ''.join(lines[start:end]).strip('\n')
+        if unit and isinstance(node, ast.ClassDef) and not budget.fits(budget.measure(unit)):
+            units.extend(split_class_lines(lines, start, end, node, budget))
+        elif unit:
+            units.append(unit)
+        start = end
+
+    if not units:
+        return make_text_segments([text])
+
+    return make_text_segments(['\n\n\n'.join(units[i] for i in bin) for bin in pack_first_fit_decreasing(units, budget)])
+
+
+def split_class_lines(lines: list[str], start: int, end: int, node: ast.ClassDef, budget: SegmentBudget) -> list[str]:
+    """Split an oversize class(`lines[start:end]` of the source) into chunks between its body statements, every chunk starts with the class header(and docstring).
+
+    The decorators and comments above a body statement stay with it, the header ends at the class signature.
+    """
+    body = node.body
+    has_docstring = isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) and isinstance(body[0].value.value, str)
+    stmts = body[1:] if has_docstring else body
+    if not stmts:
+        return [''.join(lines[start:end]).strip('\n')]
+
+    if has_docstring:
+        header_end = body[0].end_lineno
+    else:
+        header_end = min([body[0].lineno] + [decorator.lineno for decorator in getattr(body[0], 'decorator_list', [])]) - 1
+        # the signature may span lines, it ends before the comments and blank lines above the first statement
+        signature_end = max([node.lineno] + [arg.end_lineno for arg in node.bases + node.keywords])
+        while header_end > signature_end and (not lines[header_end - 1].strip() or lines[header_end - 1].lstrip().startswith('#')):
+            header_end -= 1
+
+    header = ''.join(lines[start:header_end])
+    # statement boundaries, decorators and comments above a statement go with it
+    boundaries = [header_end] + [stmt.end_lineno for stmt in stmts[:-1]] + [end]
+    pieces = [''.join(lines[boundaries[i]:boundaries[i + 1]]) for i in range(len(stmts))]
+
+    chunks = []
+    current = ''
+    for piece in pieces:
+        if current and not budget.fits(budget.measure((header + current + piece).strip('\n'))):
+            chunks.append(current)
+            current = ''
+        current += piece
+    chunks.append(current)
+
+    if len(chunks) > 1:
+        autom_logger.info(f"[Segmenter] Split class `{node.name}` into {len(chunks)} segments of at most {budget}.")
+    return [(header + chunk).strip('\n') for chunk in chunks]
+
+
+def pack_first_fit_decreasing(items: list[str], budget: SegmentBudget) -> list[list[int]]:
+    """Pack items into bins of `budget` by first-fit-decreasing, items joined by 2 blank lines.
+
+    The source order is kept inside a bin only: an item may land in a bin before the one of an earlier item.
+
+    Returns:
+        list[list[int]]: Item indices of every bin, sorted. Bins are ordered by their first item.
+    """
+    # the joining blank lines count as lines, their tokens are negligible
+    sizes = [(lines + 2, tokens) for lines, tokens in map(budget.measure, items)]
+    bins: list[list[int]] = []
+    loads: list[tuple[int, int]] = []
+    for i in sorted(range(len(items)), key=lambda i: (-budget.fill_ratio(sizes[i]), i)):
+        if not budget.fits((sizes[i][0] - 2, sizes[i][1])):
+            autom_logger.warning(f"[Segmenter] A segment exceeds the budget of {budget} with {budget.describe((sizes[i][0] - 2, sizes[i][1]))}.")
+        for j, load in enumerate(loads):
+            new_load = (load[0] + sizes[i][0], load[1] + sizes[i][1])
+            if budget.fits((new_load[0] - 2, new_load[1])):
+                bins[j].append(i)
+                loads[j] = new_load
+                break
+        else:
+            bins.append([i])
+            loads.append(sizes[i])
+
+    return sorted(sorted(bin) for bin in bins)
+
+
+def recursive_segment_text(text: str, separators: list[str], max_lines_per_segment: int, max_tokens_per_segment: int | None = None) -> TextSegments:
     """
     Recursively segment the given text using the first separator in the list until
-    each segment has at most `max_lines_per_segment`. Segments that are too small
-    will be merged until they meet the line limit.
+    each segment has at most `max_lines_per_segment`(and `max_tokens_per_segment` if given).
+    Segments that are too small will be merged until they meet the limit.
 
     TODO: Extend functionality to handle multiple separators.
     """
+    budget = SegmentBudget(max_lines_per_segment, max_tokens_per_segment)
     separator: str = separators[0]  # TODO: Extend to handle multiple separators
     segments_raw = text.split(separator)
     segments = []
     current_segment = []
-    current_lines = 0
+    current_lines, current_tokens = 0, 0
 
     # Iterate over the raw segments
     for segment in segments_raw:
-        lines_in_segment = segment.count('\n') + 1  # Calculate lines in this segment
+        lines_in_segment, tokens_in_segment = budget.measure(segment)  # Calculate lines and tokens in this segment
 
-        if current_lines + lines_in_segment > max_lines_per_segment:
-            # If the current segment exceeds max_lines_per_segment, append the current_segment
+        if current_segment and not budget.fits((current_lines + lines_in_segment, current_tokens + tokens_in_segment)):
+            # If the current segment exceeds the budget, append the current_segment
             segments.append(separator.join(current_segment))
             current_segment = []
-            current_lines = 0
+            current_lines, current_tokens = 0, 0
 
-        if lines_in_segment > max_lines_per_segment:
-            print(f"Warning: A segment exceeds max_lines_per_segment with {lines_in_segment} lines.")
+        if not budget.fits((lines_in_segment, tokens_in_segment)):
+            autom_logger.warning(f"[Segmenter] A segment exceeds the budget of {budget} with {budget.describe((lines_in_segment, tokens_in_segment))}.")
 
-        # Add the segment and update line count
+        # Add the segment and update line and token count
         current_segment.append(segment)
         current_lines += lines_in_segment
+        current_tokens += tokens_in_segment
 
     # Append the final segment if any content remains
     if current_segment:
         segments.append(separator.join(current_segment))
 
-    return TextSegments(
-        n_segment=len(segments),
-        segments=segments
-    )
+    return make_text_segments(segments)
 
 
 __all__ = [
     'FileRecursiveSegmenter',
     'TextRecursiveSegmenter',
     'TextRecursiveSegmentParamsAggregator',
+    'SegmentBudget',
+    'segment_text',
+    'ast_segment_python_text',
+    'recursive_segment_text',
 ]
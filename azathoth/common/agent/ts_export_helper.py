@@ -1,9 +1,15 @@
+import os
 from os import PathLike
 from pathlib import Path
 
+from autom.logger import autom_logger
 from autom.engine import AutomSchema, Request, Response, AgentWorker, AggregatorWorker, PluggerWorker, Socket, SocketCall, SocketRequestBody
 
-from ..schema import TSExportHelperInput, FilesContent
+from ..schema import TSExportHelperInput, FilesContent, TSExportFilesContent
+from ..state import get_state_dir, sha256_text, load_state_json, dump_state_json
+
+
+ts_export_signatures_filename = 'ts-export-signatures.json'
 
 
 class TSExportHelperInputAggregator(AggregatorWorker):
@@ -42,52 +48,117 @@ class TSExportHelperInputAggregator(AggregatorWorker):
 
 
 class TSExportHerlper(AgentWorker):
+    """Generate the `index.ts` re-exporting every module of each directory under `module_to_exports`, only for the directories whose listing changed in incremental mode."""
     @classmethod
     def define_input_schema(cls) -> AutomSchema | None:
         return TSExportHelperInput
     
     @classmethod
     def define_output_schema(cls) -> AutomSchema | None:
-        return FilesContent
+        return TSExportFilesContent
 
     def invoke(self, req: Request) -> Response:
         req_body: TSExportHelperInput = req.body
+        signatures_path = get_state_dir(req_body.project_root_path) / ts_export_signatures_filename
+        listing_signatures: dict[str, str] | None = None
+        if req_body.incremental:
+            listing_signatures = load_state_json(signatures_path, default={})
 
         map: dict[Path, str] = {}
         for module_path in req_body.module_to_exports:
-            module_file_map = add_index_ts(module_path)
+            module_file_map = add_index_ts(module_path, listing_signatures=listing_signatures)
             map.update(module_file_map)
 
-        return Response[FilesContent].from_worker(self).success(
-            body=FilesContent(map=map)
+        if listing_signatures is not None:
+            autom_logger.info(f"[TSExportHelper] {len(map)} index.ts files to update.")
+
+        return Response[TSExportFilesContent].from_worker(self).success(
+            body=TSExportFilesContent(map=map, signatures_path=signatures_path, listing_signatures=listing_signatures)
         )
 
 
-def add_index_ts(module_dir: PathLike) -> dict[Path, str]:
-    return add_index_ts_recursive(module_dir, {})
+class TSExportSignaturesSaver(AgentWorker):
+    """Save the listing signatures of TSExportHelper once its `index.ts` files are dumped, so an index.ts which failed to dump is generated again by the next run. The output is the input."""
+    @classmethod
+    def define_input_schema(cls) -> AutomSchema | None:
+        return TSExportFilesContent
+
+    @classmethod
+    def define_output_schema(cls) -> AutomSchema | None:
+        return FilesContent
 
+    def invoke(self, req: Request) -> Response:
+        req_body: TSExportFilesContent = req.body
+        if req_body.listing_signatures is not None and req_body.signatures_path is not None:
+            dump_state_json(req_body.signatures_path, req_body.listing_signatures)
+        return Response[FilesContent].from_worker(self).success(body=req_body)
+
+
+def add_index_ts(module_dir: PathLike, listing_signatures: dict[str, str] | None = None) -> dict[Path, str]:
+    """Generate the index.ts of `module_dir` and all its subdirectories.
+
+    Args:
+        module_dir (PathLike): The directory to export.
+        listing_signatures (dict[str, str] | None, optional): Listing signatures keyed by directory path, from the last run. If given, only the directories whose listing changed(or have no index.ts) are generated, and the dict is updated in place. Defaults to None.
+
+    Returns:
+        dict[Path, str]: The index.ts contents keyed by their full path.
+    """
+    module_dir = Path(module_dir)
+    if not module_dir.is_dir():
+        raise ValueError(f"Path {module_dir} does not exist or is not a directory")
+
+    file_map: dict[Path, str] = {}
+    visited: set[str] = set()
+    add_index_ts_recursive(module_dir, file_map, listing_signatures, visited)
+    if listing_signatures is not None:
+        # forget the removed directories of this module
+        module_key = module_dir.as_posix()
+        for key in list(listing_signatures):
+            if (key == module_key or key.startswith(module_key + '/')) and key not in visited:
+                del listing_signatures[key]
+    return file_map
 
-def add_index_ts_recursive(path: PathLike, file_map: dict[Path, str]) -> dict[Path, str]:
-    path = Path(path)
-    if not path.exists() or not path.is_dir():
-        raise ValueError(f"Path {path} does not exist or is not a directory")
 
+def add_index_ts_recursive(
+    path: Path,
+    file_map: dict[Path, str],
+    listing_signatures: dict[str, str] | None = None,
+    visited: set[str] | None = None,
+) -> dict[Path, str]:
     qualifiers = []
-    for f in path.iterdir():
-        if f.is_file() and f.suffix == ".ts" and f.name != "index.ts":
-            qualifiers.append(f.stem)
-        elif f.is_dir():
-            qualifiers.append(f.name)
-            add_index_ts_recursive(f, file_map)
-
-    index_ts_path = path / "index.ts"
-    index_ts_content = "\n".join([f'export * from "./{q}";' for q in qualifiers]) + "\n"
-    file_map[index_ts_path] = index_ts_content
+    subdirs = []
+    has_index_ts = False
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_file():
+                if entry.name == "index.ts":
+                    has_index_ts = True
+                elif entry.name.endswith(".ts"):
+                    qualifiers.append(entry.name[:-len(".ts")])
+            elif entry.is_dir():
+                qualifiers.append(entry.name)
+                subdirs.append(entry.name)
+    qualifiers.sort()
+
+    for subdir in sorted(subdirs):
+        add_index_ts_recursive(path / subdir, file_map, listing_signatures, visited)
 
+    index_ts_content = "\n".join([f'export * from "./{q}";' for q in qualifiers]) + "\n"
+    if listing_signatures is not None:
+        key = path.as_posix()
+        visited.add(key)
+        signature = sha256_text(index_ts_content)
+        if has_index_ts and listing_signatures.get(key) == signature:
+            return file_map
+        listing_signatures[key] = signature
+
+    file_map[path / "index.ts"] = index_ts_content
     return file_map
 
 
 __all__ = [
     'TSExportHerlper',
     'TSExportHelperInputAggregator',
+    'TSExportSignaturesSaver',
 ]
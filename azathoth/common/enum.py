@@ -19,7 +19,19 @@ class RepoEnum(StrEnum):
             return ProgrammingLanguage.typescript
 
 
+class SegmentStrategy(StrEnum):
+    separator = 'separator'  # split on separators, then merge pieces up to the budget
+    python_ast = 'python_ast'  # pack top-level Python statements up to the budget, never cutting one apart
+
+
+class SchemaConvertEngine(StrEnum):
+    llm = 'llm'  # convert the source of every schema file, segment by segment
+    introspection = 'introspection'  # import the backend schemas and render their JSON Schema, the LLM only gets the files which fail to import
+
+
 __all__ = [
     'ProgrammingLanguage',
     'RepoEnum',
+    'SegmentStrategy',
+    'SchemaConvertEngine',
 ]
@@ -0,0 +1,122 @@
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Callable
+
+from autom.logger import autom_logger
+
+from .singleton import ProcessSingleton
+from .schema import FilesContent, dump_file_if_changed, default_dump_max_workers
+from .state import sha256_text
+
+
+default_stream_max_pending = int(os.environ.get('AZATHOTH_STREAM_MAX_PENDING', 64))
+
+
+class FilesStreamWriter:
+    """Process-wide writer dumping each converted file to disk as soon as it is produced.
+
+    `put` blocks while `max_pending` files are waiting, FilesDumper then only dumps the files which were not streamed with the same content.
+    """
+    def __init__(self, max_pending: int = default_stream_max_pending, max_workers: int = default_dump_max_workers):
+        self._lock = threading.Lock()
+        self._enabled = False
+        self._queue: queue.Queue[tuple[Path, str]] = queue.Queue(maxsize=max(1, max_pending))
+        self._max_workers = max(1, max_workers)
+        self._threads: list[threading.Thread] = []
+        self._dumped: dict[Path, tuple[str, bool]] = {}  # path -> (content sha256, whether it was written)
+        self._put_listeners: dict[str, Callable[[Path, str], None]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def configure(self, enabled: bool, output_dir: Path | None = None):
+        """Turn streaming on or off for a run which starts now. Files already queued are still written, then the records of the files streamed before are forgotten.
+
+        With `output_dir`, only the records of the files under it are forgotten: a stage forgets its own files, not those of the stages running alongside it.
+        """
+        # a record left by an earlier run would skip a file edited on disk since, if its content happens to match
+        self._queue.join()
+        with self._lock:
+            self._enabled = enabled
+            if output_dir is None:
+                self._dumped.clear()
+            else:
+                for filepath in [filepath for filepath in self._dumped if filepath.is_relative_to(output_dir)]:
+                    del self._dumped[filepath]
+
+    def _ensure_threads(self):
+        with self._lock:
+            while len(self._threads) < self._max_workers:
+                thread = threading.Thread(target=self._run, name=f'azathoth-dump-{len(self._threads)}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def set_put_listener(self, name: str, listener: Callable[[Path, str], None] | None):
+        """Call `listener` with the path and content of every file `put` from now on, whether streaming is enabled or not. None removes the listener of `name`.
+
+        Listeners run on the producer's thread, they must not block.
+        """
+        with self._lock:
+            if listener is None:
+                self._put_listeners.pop(name, None)
+            else:
+                self._put_listeners[name] = listener
+
+    def put(self, filepath: Path, content: str) -> bool:
+        """Pass the file to the put listeners, and queue it to be dumped if streaming is enabled, blocking while the queue is full. Returns whether it was queued."""
+        with self._lock:
+            listeners = list(self._put_listeners.values())
+        for listener in listeners:
+            try:
+                listener(filepath, content)
+            except Exception as e:
+                autom_logger.warning(f"[FilesStreamWriter] A put listener failed on {filepath}: {e}")
+        if not self._enabled:
+            return False
+        self._ensure_threads()
+        self._queue.put((filepath, content))
+        return True
+
+    def _run(self):
+        while True:
+            filepath, content = self._queue.get()
+            try:
+                is_written = dump_file_if_changed(filepath, content)
+                with self._lock:
+                    self._dumped[filepath] = (sha256_text(content), is_written)
+            except Exception as e:
+                autom_logger.warning(f"[FilesStreamWriter] Failed to dump {filepath}, it is left to FilesDumper: {e}")
+            finally:
+                self._queue.task_done()
+
+    def take_dumped(self, files_content: FilesContent) -> dict[Path, bool]:
+        """Wait for the queued files, and take the files of `files_content` which were streamed with their final content.
+
+        Returns:
+            dict[Path, bool]: Whether each streamed file was written(False if it was already up to date on disk).
+        """
+        self._queue.join()
+        dumped: dict[Path, bool] = {}
+        with self._lock:
+            for filepath, content in files_content.map.items():
+                record = self._dumped.pop(filepath, None)
+                if record is not None and record[0] == sha256_text(content):
+                    dumped[filepath] = record[1]
+        return dumped
+
+
+_default_files_stream_writer = ProcessSingleton(FilesStreamWriter)
+
+
+def get_files_stream_writer() -> FilesStreamWriter:
+    """Get the process-wide FilesStreamWriter, its queue holds at most `$AZATHOTH_STREAM_MAX_PENDING` (default 64) files."""
+    return _default_files_stream_writer.get()
+
+
+__all__ = [
+    'FilesStreamWriter',
+    'get_files_stream_writer',
+]
@@ -0,0 +1,196 @@
+import os
+import threading
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+from .singleton import ProcessSingleton
+from .tokens import estimate_messages_tokens
+from .llm_usage import get_llm_cost
+from .rate_limiter import get_openai_rate_limiter
+
+
+default_llm_budget_usd = float(os.environ['AZATHOTH_LLM_BUDGET_USD']) if os.environ.get('AZATHOTH_LLM_BUDGET_USD') else None
+default_llm_budget_tokens = int(os.environ['AZATHOTH_LLM_BUDGET_TOKENS']) if os.environ.get('AZATHOTH_LLM_BUDGET_TOKENS') else None
+# a dry run can not observe latencies, a request is assumed to take a fixed overhead plus its completion at this throughput
+estimated_request_overhead_seconds = 1.0
+estimated_completion_tokens_per_second = 80.0
+
+
+class LLMBudgetExceeded(RuntimeError):
+    """Raised before an LLM request, or a whole run, which would spend more than the LLMBudget.
+
+    The workers never isolate it as a ConvertFailure of their item, so it stops the run.
+    """
+
+
+class LLMBudget(BaseModel):
+    """Hard limits of the LLM spend of a run, None is unlimited."""
+    max_cost: Optional[float] = default_llm_budget_usd
+    max_tokens: Optional[int] = default_llm_budget_tokens
+
+    @property
+    def is_limited(self) -> bool:
+        return self.max_cost is not None or self.max_tokens is not None
+
+    def check(self, tokens: float, cost: float, what: str):
+        """Raise LLMBudgetExceeded if `tokens` or `cost` are over the budget."""
+        if self.max_tokens is not None and tokens > self.max_tokens:
+            raise LLMBudgetExceeded(f"{what} needs {tokens:.0f} LLM tokens, over the budget of {self.max_tokens}")
+        if self.max_cost is not None and cost > self.max_cost:
+            raise LLMBudgetExceeded(f"{what} costs ${cost:.4f}, over the budget of ${self.max_cost:.4f}")
+
+
+class LLMRequestEstimate(BaseModel):
+    """An LLM request a run is planned to send, estimated locally.
+
+    `predicted_hit` tells why the request will not be sent: its result is in the LLM result cache(`llm_cache`) or the run journal(`journal`), or an identical request comes first(`duplicate`).
+    """
+    stage: str
+    item: str
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    predicted_hit: Optional[str] = None
+
+    @classmethod
+    def from_messages(cls, stage: str, item: str, model: str, messages: list[dict], completion_tokens: int, predicted_hit: Optional[str] = None) -> 'LLMRequestEstimate':
+        return cls(stage=stage, item=item, model=model, prompt_tokens=estimate_messages_tokens(messages), completion_tokens=completion_tokens, predicted_hit=predicted_hit)
+
+    @property
+    def cost(self) -> float:
+        return get_llm_cost(self.model, self.prompt_tokens, 0, self.completion_tokens)
+
+    @property
+    def seconds(self) -> float:
+        return estimated_request_overhead_seconds + self.completion_tokens / estimated_completion_tokens_per_second
+
+
+class LLMStageEstimate(BaseModel):
+    stage: str
+    n_requests: int = 0
+    n_predicted_hits: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+    seconds: float = 0.0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+class LLMRunEstimate(BaseModel):
+    """The LLM requests a run is planned to send, and their tokens, cost and wall time per stage.
+
+    The wall time of a stage is the slowest of its requests spread over `max_llm_concurrency`, and of the RPM/TPM limits of the OpenAIRateLimiter. The total adds the stages up, an upper bound when stages overlap.
+    """
+    requests: list[LLMRequestEstimate]
+    stages: list[LLMStageEstimate]
+    totals: LLMStageEstimate
+
+    @classmethod
+    def from_requests(cls, requests: list[LLMRequestEstimate], max_llm_concurrency: int = 1) -> 'LLMRunEstimate':
+        rate_limiter = get_openai_rate_limiter()
+        stage_estimates: dict[str, LLMStageEstimate] = {}
+        stage_latencies: dict[str, float] = {}
+        for request in requests:
+            stage_estimate = stage_estimates.setdefault(request.stage, LLMStageEstimate(stage=request.stage))
+            if request.predicted_hit is not None:
+                stage_estimate.n_predicted_hits += 1
+                continue
+            stage_estimate.n_requests += 1
+            stage_estimate.prompt_tokens += request.prompt_tokens
+            stage_estimate.completion_tokens += request.completion_tokens
+            stage_estimate.cost += request.cost
+            stage_latencies[request.stage] = stage_latencies.get(request.stage, 0.0) + request.seconds
+
+        totals = LLMStageEstimate(stage='total')
+        for stage_estimate in stage_estimates.values():
+            stage_estimate.seconds = max(
+                stage_latencies.get(stage_estimate.stage, 0.0) / max(1, max_llm_concurrency),
+                stage_estimate.n_requests / rate_limiter.rpm * 60,
+                stage_estimate.total_tokens / rate_limiter.tpm * 60,
+            )
+            for field_name in ['n_requests', 'n_predicted_hits', 'prompt_tokens', 'completion_tokens', 'cost', 'seconds']:
+                setattr(totals, field_name, getattr(totals, field_name) + getattr(stage_estimate, field_name))
+        return cls(requests=requests, stages=list(stage_estimates.values()), totals=totals)
+
+    def check(self, budget: LLMBudget):
+        """Raise LLMBudgetExceeded if the run would spend more than `budget`."""
+        budget.check(self.totals.total_tokens, self.totals.cost, 'The run')
+
+    def format(self) -> str:
+        lines = [f"{'stage':<8} {'requests':>9} {'hits':>6} {'prompt':>10} {'output':>9} {'cost($)':>9} {'time(s)':>9}"]
+        for stage_estimate in [*self.stages, self.totals]:
+            lines.append(
+                f"{stage_estimate.stage:<8} {stage_estimate.n_requests:>9} {stage_estimate.n_predicted_hits:>6} {stage_estimate.prompt_tokens:>10} "
+                f"{stage_estimate.completion_tokens:>9} {stage_estimate.cost:>9.4f} {stage_estimate.seconds:>9.1f}"
+            )
+        return '\n'.join(lines)
+
+
+class LLMBudgetGuard:
+    """Process-wide enforcement of an LLMBudget on every LLM request.
+
+    Each request reserves its estimated tokens and cost before being sent, and is refused with LLMBudgetExceeded if the spend so far plus the requests in flight would go over the budget. Its real usage replaces the reservation once it completes.
+    """
+    def __init__(self, budget: LLMBudget | None = None):
+        self._lock = threading.Lock()
+        self.budget = budget or LLMBudget()
+        self._spent_tokens = 0
+        self._spent_cost = 0.0
+        self._reserved_tokens = 0
+        self._reserved_cost = 0.0
+
+    def configure(self, budget: LLMBudget):
+        """Set the budget of a run which starts now, the spend is reset."""
+        with self._lock:
+            self.budget = budget
+            self._spent_tokens = 0
+            self._spent_cost = 0.0
+
+    def reserve(self, model: str, prompt_tokens: int, completion_tokens: int) -> tuple[int, float]:
+        reservation = (prompt_tokens + completion_tokens, get_llm_cost(model, prompt_tokens, 0, completion_tokens))
+        with self._lock:
+            if not self.budget.is_limited:
+                return 0, 0.0
+            self.budget.check(self._spent_tokens + self._reserved_tokens + reservation[0], self._spent_cost + self._reserved_cost + reservation[1], f'An LLM request to {model}')
+            self._reserved_tokens += reservation[0]
+            self._reserved_cost += reservation[1]
+        return reservation
+
+    def settle(self, reservation: tuple[int, float], model: str, usage: Any | None):
+        """Replace the reservation by the real usage of the request, None if it failed."""
+        prompt_tokens_details = getattr(usage, 'prompt_tokens_details', None)
+        cached_tokens = getattr(prompt_tokens_details, 'cached_tokens', None) or 0
+        with self._lock:
+            self._reserved_tokens -= reservation[0]
+            self._reserved_cost -= reservation[1]
+            if usage is not None:
+                self._spent_tokens += usage.total_tokens
+                self._spent_cost += get_llm_cost(model, usage.prompt_tokens, cached_tokens, usage.completion_tokens)
+
+    def get_spent(self) -> tuple[int, float]:
+        """Tokens and cost spent since the budget was configured."""
+        with self._lock:
+            return self._spent_tokens, self._spent_cost
+
+
+_default_llm_budget_guard = ProcessSingleton(LLMBudgetGuard)
+
+
+def get_llm_budget_guard() -> LLMBudgetGuard:
+    """Get the process-wide LLMBudgetGuard, its budget defaults to `$AZATHOTH_LLM_BUDGET_USD` and `$AZATHOTH_LLM_BUDGET_TOKENS`."""
+    return _default_llm_budget_guard.get()
+
+
+__all__ = [
+    'LLMBudgetExceeded',
+    'LLMBudget',
+    'LLMRequestEstimate',
+    'LLMStageEstimate',
+    'LLMRunEstimate',
+    'LLMBudgetGuard',
+    'get_llm_budget_guard',
+]
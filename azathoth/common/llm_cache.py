@@ -0,0 +1,162 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+from pydantic import BaseModel
+from autom.logger import autom_logger
+
+from .singleton import ProcessSingleton
+
+
+default_llm_cache_dir = Path(os.environ.get('AZATHOTH_CACHE_DIR', Path.home() / '.cache' / 'azathoth')) / 'llm'
+default_llm_cache_max_bytes = int(os.environ.get('AZATHOTH_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+
+class LLMResultCacheStats(BaseModel):
+    """Counters of a LLMResultCache, accumulated since the cache was created."""
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+    n_entries: int = 0
+    total_bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        n_lookups = self.hits + self.misses
+        return self.hits / n_lookups if n_lookups else 0.0
+
+
+def make_llm_cache_key(*parts: str) -> str:
+    """Make a content-addressed cache key from the given parts.
+
+    Each part is length-prefixed before hashing, so that `("ab", "c")` and `("a", "bc")` never collide.
+    """
+    hasher = hashlib.sha256()
+    for part in parts:
+        encoded = part.encode('utf-8')
+        hasher.update(len(encoded).to_bytes(8, 'big'))
+        hasher.update(encoded)
+    return hasher.hexdigest()
+
+
+class LLMResultCache:
+    """Persistent, content-addressed cache of structured LLM results.
+
+    Every entry is a JSON file named `<key>.json` under `cache_dir`. The cache is bounded by `max_bytes`,
+    least recently used entries are evicted first. Recency survives across processes through file mtimes.
+    """
+    def __init__(self, cache_dir: os.PathLike = default_llm_cache_dir, max_bytes: int = default_llm_cache_max_bytes):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: OrderedDict[str, int] | None = None  # key -> entry size, ordered from least to most recently used
+        self._total_bytes = 0
+        self._stats = LLMResultCacheStats()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f'{key}.json'
+
+    def _load_index(self) -> OrderedDict[str, int]:
+        if self._index is not None:
+            return self._index
+
+        entries: list[tuple[int, str, int]] = []
+        if self.cache_dir.is_dir():
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.endswith('.json'):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime_ns, entry.name[:-len('.json')], stat.st_size))
+        entries.sort()
+
+        self._index = OrderedDict((key, size) for _, key, size in entries)
+        self._total_bytes = sum(self._index.values())
+        return self._index
+
+    def get(self, key: str) -> dict | None:
+        """Get the cached result of `key`, or None on a miss."""
+        with self._lock:
+            index = self._load_index()
+            if key not in index:
+                self._stats.misses += 1
+                return None
+
+            entry_path = self._entry_path(key)
+            try:
+                with open(entry_path, 'r', encoding='utf-8') as f:
+                    value = json.load(f)
+                os.utime(entry_path)
+            except (OSError, ValueError) as e:
+                autom_logger.warning(f"[LLMResultCache] Dropping unreadable cache entry {entry_path}: {e}")
+                self._remove(key)
+                self._stats.misses += 1
+                return None
+
+            index.move_to_end(key)
+            self._stats.hits += 1
+            return value
+
+    def contains(self, key: str) -> bool:
+        """Whether `key` is cached, without touching its recency or the stats."""
+        with self._lock:
+            return key in self._load_index()
+
+    def set(self, key: str, value: dict):
+        """Store `value` under `key`, evicting least recently used entries if the cache is over `max_bytes`."""
+        data = json.dumps(value, ensure_ascii=False).encode('utf-8')
+        with self._lock:
+            index = self._load_index()
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            try:
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, self._entry_path(key))
+            except OSError as e:
+                autom_logger.warning(f"[LLMResultCache] Failed to write cache entry {key}: {e}")
+                return
+
+            self._total_bytes += len(data) - index.get(key, 0)
+            index[key] = len(data)
+            index.move_to_end(key)
+            self._stats.writes += 1
+            self._evict()
+
+    def _remove(self, key: str):
+        self._total_bytes -= self._index.pop(key, 0)
+        try:
+            self._entry_path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            key = next(iter(self._index))
+            self._remove(key)
+            self._stats.evictions += 1
+
+    def stats(self) -> LLMResultCacheStats:
+        with self._lock:
+            index = self._load_index()
+            return self._stats.model_copy(update={'n_entries': len(index), 'total_bytes': self._total_bytes})
+
+
+_default_llm_cache = ProcessSingleton(LLMResultCache)
+
+
+def get_llm_result_cache() -> LLMResultCache:
+    """Get the process-wide LLMResultCache, which lives under `$AZATHOTH_CACHE_DIR` (default `~/.cache/azathoth`)."""
+    return _default_llm_cache.get()
+
+
+__all__ = [
+    'LLMResultCacheStats',
+    'LLMResultCache',
+    'make_llm_cache_key',
+    'get_llm_result_cache',
+]
@@ -0,0 +1,295 @@
+import os
+import time
+import random
+import threading
+from typing import Any, Callable, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+
+from pydantic import BaseModel
+from autom.logger import autom_logger
+
+from .tokens import estimate_tokens, estimate_messages_tokens
+from .rate_limiter import get_openai_rate_limiter
+from .llm_executor import get_llm_call_executor
+from .llm_usage import LLMUsageLabel, get_llm_usage_ledger
+from .llm_budget import get_llm_budget_guard
+from .tracing import trace_span
+
+
+max_rate_limit_retries = 6
+default_llm_timeout = float(os.environ.get('AZATHOTH_LLM_TIMEOUT', 120))
+default_llm_max_retries = int(os.environ.get('AZATHOTH_LLM_MAX_RETRIES', 3))
+default_llm_hedge_percentile = float(os.environ.get('AZATHOTH_LLM_HEDGE_PERCENTILE', 0.95))
+
+
+class LLMCallPolicy(BaseModel):
+    """How `parse_chat_completion` guards a call against slow and failing requests."""
+    timeout: float = default_llm_timeout
+    max_retries: int = default_llm_max_retries
+    backoff_base: float = 1.0
+    backoff_max: float = 30.0
+    hedge_percentile: float = default_llm_hedge_percentile
+    hedge_min_samples: int = 20
+
+
+class LLMCallStats(BaseModel):
+    n_calls: int = 0
+    n_retries: int = 0
+    n_hedged: int = 0
+    n_hedge_wins: int = 0
+
+
+class LLMLatencyTracker:
+    """Recent latencies of the successful calls of each model, to decide when a call is slow enough to be hedged."""
+    def __init__(self, max_samples: int = 256):
+        self._lock = threading.Lock()
+        self._max_samples = max_samples
+        self._latencies: dict[str, deque[float]] = {}
+        self._stats = LLMCallStats()
+
+    def record(self, model: str, latency: float):
+        with self._lock:
+            self._latencies.setdefault(model, deque(maxlen=self._max_samples)).append(latency)
+
+    def percentile(self, model: str, q: float, min_samples: int = 1) -> float | None:
+        """The `q` quantile of the recent latencies of `model`, None if fewer than `min_samples` were recorded."""
+        with self._lock:
+            latencies = sorted(self._latencies.get(model, ()))
+        if not latencies or len(latencies) < min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def count(self, **deltas: int):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self._stats, name, getattr(self._stats, name) + delta)
+
+    def get_stats(self) -> LLMCallStats:
+        with self._lock:
+            return self._stats.model_copy()
+
+
+_llm_call_policy = LLMCallPolicy()
+_openai_client_override: Any | None = None
+_llm_latency_tracker = LLMLatencyTracker()
+_hedge_pool: ThreadPoolExecutor | None = None
+_hedge_pool_size = 0
+_hedge_pool_lock = threading.Lock()
+
+
+def get_llm_call_policy() -> LLMCallPolicy:
+    """Get the process-wide LLMCallPolicy, its defaults come from `$AZATHOTH_LLM_TIMEOUT`, `$AZATHOTH_LLM_MAX_RETRIES` and `$AZATHOTH_LLM_HEDGE_PERCENTILE`."""
+    return _llm_call_policy
+
+
+def configure_llm_call_policy(**updates: Any) -> LLMCallPolicy:
+    """Update the fields of the process-wide LLMCallPolicy, e.g. `configure_llm_call_policy(timeout=30)`."""
+    global _llm_call_policy
+    _llm_call_policy = _llm_call_policy.model_copy(update=updates)
+    return _llm_call_policy
+
+
+def set_openai_client_override(openai_client: Any | None):
+    """Send every `parse_chat_completion` call to `openai_client` instead of the worker's client, e.g. a local stand-in for benchmarks. None restores the workers' clients."""
+    global _openai_client_override
+    _openai_client_override = openai_client
+
+
+def get_openai_client(worker: Any) -> Any:
+    """The client the LLM calls of `worker` go to: the override if one is set, else the worker's own `openai_client`, which is then never accessed."""
+    if _openai_client_override is not None:
+        return _openai_client_override
+    return worker.openai_client
+
+
+def get_llm_call_stats() -> LLMCallStats:
+    """Retries and hedges of every `parse_chat_completion` call of the process so far."""
+    return _llm_latency_tracker.get_stats()
+
+
+def parse_chat_completion(openai_client: Any, *, model: str, messages: list[dict], response_format: type[BaseModel], usage_label: Optional[LLMUsageLabel] = None) -> Any:
+    """Call `openai_client.beta.chat.completions.parse` through the process-wide OpenAIRateLimiter, guarded by the LLMCallPolicy.
+
+    The call waits for its estimated tokens in the RPM/TPM buckets, and 429 responses are retried(up to `max_rate_limit_retries` times) after the server's retry-after.
+    Each request times out after `policy.timeout` seconds. Timeouts, connection errors, 5xx responses and unparsable completions are retried up to `policy.max_retries` times with jittered exponential backoff.
+    Once enough latencies of the model are known, a request still running after their `policy.hedge_percentile` quantile is hedged: a duplicate is sent and the first completion wins. The loser is not cancelled, it only costs tokens.
+    Every azathoth worker calling OpenAI goes through here, and is redirected to the client set by `set_openai_client_override` if any. A completion still unparsable after the retries is returned as is, for the caller to handle.
+    The usage, latency and requests of the call are recorded in the LLMUsageLedger under `usage_label`, the usage of the unparsable completions retried included.
+    """
+    policy = get_llm_call_policy()
+    if _openai_client_override is not None:
+        openai_client = _openai_client_override
+    _llm_latency_tracker.count(n_calls=1)
+    ledger = get_llm_usage_ledger()
+    started_at = time.perf_counter()
+    discarded_usages: list[Any] = []
+    attempt = 0
+    while True:
+        try:
+            chat_completion = call_hedged(lambda: call_rate_limited(openai_client, model, messages, response_format, policy.timeout), model, policy)
+        except Exception as e:
+            if not is_transient_error(e) or attempt >= policy.max_retries:
+                ledger.record_call(usage_label, model, messages, None, time.perf_counter() - started_at, attempt + 1, discarded_usages)
+                raise
+            attempt += 1
+            delay = get_backoff_seconds(attempt, policy)
+            autom_logger.warning(f"[parse_chat_completion] {model} request failed({type(e).__name__}: {e}), retry {attempt}/{policy.max_retries} in {delay:.1f}s.")
+            _llm_latency_tracker.count(n_retries=1)
+            time.sleep(delay)
+            continue
+
+        if chat_completion.choices[0].message.parsed is None and attempt < policy.max_retries:
+            attempt += 1
+            if getattr(chat_completion, 'usage', None) is not None:
+                discarded_usages.append(chat_completion.usage)
+            delay = get_backoff_seconds(attempt, policy)
+            autom_logger.warning(f"[parse_chat_completion] Unparsable {model} completion, retry {attempt}/{policy.max_retries} in {delay:.1f}s.")
+            _llm_latency_tracker.count(n_retries=1)
+            time.sleep(delay)
+            continue
+        ledger.record_call(usage_label, model, messages, chat_completion, time.perf_counter() - started_at, attempt + 1, discarded_usages)
+        return chat_completion
+
+
+def call_rate_limited(openai_client: Any, model: str, messages: list[dict], response_format: type[BaseModel], timeout: float) -> Any:
+    """One request through the OpenAIRateLimiter, retrying its 429 responses. The latency of the successful request is recorded.
+
+    Each request first reserves its estimated usage from the LLMBudgetGuard, which raises LLMBudgetExceeded instead of sending it over the budget.
+    """
+    rate_limiter = get_openai_rate_limiter()
+    budget_guard = get_llm_budget_guard()
+    # the completion is assumed as long as the last(user) message, which holds for code conversion
+    estimated_prompt_tokens = estimate_messages_tokens(messages)
+    estimated_completion_tokens = estimate_tokens(messages[-1].get('content') or '')
+    estimated_tokens = estimated_prompt_tokens + estimated_completion_tokens
+
+    attempt = 0
+    while True:
+        reservation = budget_guard.reserve(model, estimated_prompt_tokens, estimated_completion_tokens)
+        with trace_span('rate_limit_wait', 'llm', estimated_tokens=estimated_tokens):
+            rate_limiter.acquire(estimated_tokens)
+        sent_at = time.perf_counter()
+        try:
+            with trace_span(f'llm:{model}', 'llm', response_format=response_format.__name__, estimated_tokens=estimated_tokens) as span:
+                chat_completion = openai_client.beta.chat.completions.parse(
+                    model=model,
+                    messages=messages,
+                    response_format=response_format,
+                    timeout=timeout,
+                )
+                if span is not None and getattr(chat_completion, 'usage', None) is not None:
+                    span.set(total_tokens=chat_completion.usage.total_tokens)
+        except Exception as e:
+            rate_limiter.reconcile(estimated_tokens, 0)
+            budget_guard.settle(reservation, model, None)
+            if not is_rate_limit_error(e) or attempt >= max_rate_limit_retries:
+                raise
+            attempt += 1
+            # the next acquire waits out the pause, and counts it as queue wait time
+            rate_limiter.back_off(attempt, get_retry_after_seconds(e))
+            continue
+
+        _llm_latency_tracker.record(model, time.perf_counter() - sent_at)
+        usage = getattr(chat_completion, 'usage', None)
+        rate_limiter.reconcile(estimated_tokens, usage.total_tokens if usage is not None else estimated_tokens)
+        budget_guard.settle(reservation, model, usage)
+        return chat_completion
+
+
+def call_hedged(fn: Callable[[], Any], model: str, policy: LLMCallPolicy) -> Any:
+    """Run `fn`, and run it a second time if the first run is slower than the hedge threshold of `model`. The first success wins."""
+    threshold = None
+    if 0 < policy.hedge_percentile < 1:
+        threshold = _llm_latency_tracker.percentile(model, policy.hedge_percentile, policy.hedge_min_samples)
+
+    if threshold is None:
+        return fn()
+
+    pool = _get_hedge_pool()
+    primary = pool.submit(fn)
+    done, _ = wait([primary], timeout=threshold)
+    if done:
+        return primary.result()
+
+    _llm_latency_tracker.count(n_hedged=1)
+    hedge = pool.submit(fn)
+    pending: set[Future] = {primary, hedge}
+    error: Optional[Exception] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                result = future.result()
+            except Exception as e:
+                error = error or e
+                continue
+            if future is hedge:
+                _llm_latency_tracker.count(n_hedge_wins=1)
+            return result
+    raise error
+
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    # every call in flight may hold 2 threads, the pool grows with the LLMCallExecutor limit
+    global _hedge_pool, _hedge_pool_size
+    with _hedge_pool_lock:
+        size = 2 * get_llm_call_executor().max_concurrency + 2
+        if _hedge_pool is None or _hedge_pool_size < size:
+            if _hedge_pool is not None:
+                _hedge_pool.shutdown(wait=False)
+            _hedge_pool_size = size
+            _hedge_pool = ThreadPoolExecutor(max_workers=size, thread_name_prefix='azathoth-hedge')
+        return _hedge_pool
+
+
+def get_backoff_seconds(attempt: int, policy: LLMCallPolicy) -> float:
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(policy.backoff_max, policy.backoff_base * 2 ** (attempt - 1)))
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    return getattr(e, 'status_code', None) == 429
+
+
+transient_error_names = {'APITimeoutError', 'APIConnectionError', 'LengthFinishReasonError', 'ContentFilterFinishReasonError'}
+
+
+def is_transient_error(e: Exception) -> bool:
+    """Whether a failed request may succeed when sent again: timeouts, connection errors, 5xx responses and the OpenAI errors of `transient_error_names`.
+
+    Other errors, e.g. a ValueError of the caller's code or a 4xx response, fail the same way every time.
+    """
+    if isinstance(e, (TimeoutError, ConnectionError)):
+        return True
+    if type(e).__name__ in transient_error_names:
+        return True
+    status_code = getattr(e, 'status_code', None)
+    return status_code is not None and (status_code == 408 or status_code >= 500)
+
+
+def get_retry_after_seconds(e: Exception) -> float | None:
+    """Read the retry-after(-ms) header of an OpenAI API error, if any."""
+    response = getattr(e, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        if headers.get('retry-after-ms') is not None:
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after') is not None:
+            return float(headers['retry-after'])
+    except ValueError:
+        pass
+    return None
+
+
+__all__ = [
+    'LLMCallPolicy',
+    'LLMCallStats',
+    'LLMLatencyTracker',
+    'get_llm_call_policy',
+    'configure_llm_call_policy',
+    'set_openai_client_override',
+    'get_openai_client',
+    'get_llm_call_stats',
+    'parse_chat_completion',
+]
@@ -0,0 +1,98 @@
+import os
+import threading
+from typing import Callable, TypeVar
+from concurrent.futures import ThreadPoolExecutor, Future
+
+from autom.logger import autom_logger
+
+from .singleton import ProcessSingleton
+
+
+T = TypeVar('T')
+
+default_llm_concurrency = int(os.environ.get('AZATHOTH_LLM_CONCURRENCY', 1))
+
+
+class LLMCallExecutor:
+    """Process-wide executor of LLM leaf calls with one global in-flight limit.
+
+    Dispatch bridges `submit` calls ahead of time, leaf workers take them with `result`, which runs the call inline if it was never submitted.
+    """
+    def __init__(self, max_concurrency: int = default_llm_concurrency):
+        self._lock = threading.Lock()
+        self._slot_available = threading.Condition(self._lock)
+        self._max_concurrency = max(1, max_concurrency)
+        self._n_in_flight = 0
+        self._pool: ThreadPoolExecutor | None = None
+        self._pool_size = 0
+        self._futures: dict[str, Future] = {}
+
+    @property
+    def max_concurrency(self) -> int:
+        return self._max_concurrency
+
+    def configure(self, max_concurrency: int):
+        """Change the global in-flight limit. Calls already in flight are not interrupted."""
+        with self._lock:
+            self._max_concurrency = max(1, max_concurrency)
+            self._slot_available.notify_all()
+
+    def _run_limited(self, fn: Callable[[], T]) -> T:
+        with self._lock:
+            while self._n_in_flight >= self._max_concurrency:
+                self._slot_available.wait()
+            self._n_in_flight += 1
+        try:
+            return fn()
+        finally:
+            with self._lock:
+                self._n_in_flight -= 1
+                self._slot_available.notify()
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        # the pool only grows, an old smaller pool is left to drain its queue
+        if self._pool is None or self._pool_size < self._max_concurrency:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+            self._pool_size = self._max_concurrency
+            self._pool = ThreadPoolExecutor(max_workers=self._pool_size, thread_name_prefix='azathoth-llm')
+        return self._pool
+
+    def submit(self, key: str, fn: Callable[[], T]) -> Future:
+        """Schedule `fn` in the background, unless a call with the same `key` is already pending."""
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None:
+                return future
+            future = self._get_pool().submit(self._run_limited, fn)
+            self._futures[key] = future
+            return future
+
+    def result(self, key: str, fn: Callable[[], T]) -> T:
+        """Take the result of the call submitted under `key`, or run `fn` inline(still within the limit) if there is none.
+
+        A submitted call that failed raises its error here, like a plain call: the retries already happened inside the call(see `parse_chat_completion`).
+        """
+        with self._lock:
+            future = self._futures.pop(key, None)
+        if future is not None:
+            try:
+                return future.result()
+            except Exception as e:
+                autom_logger.warning(f"[LLMCallExecutor] Prefetched call {key} failed: {e}")
+                raise
+        return self._run_limited(fn)
+
+
+_default_llm_call_executor = ProcessSingleton(LLMCallExecutor)
+
+
+def get_llm_call_executor() -> LLMCallExecutor:
+    """Get the process-wide LLMCallExecutor, its default limit is `$AZATHOTH_LLM_CONCURRENCY` (default 1)."""
+    return _default_llm_call_executor.get()
+
+
+__all__ = [
+    'LLMCallExecutor',
+    'get_llm_call_executor',
+]
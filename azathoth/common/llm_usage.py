@@ -0,0 +1,227 @@
+import os
+import json
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+from .singleton import ProcessSingleton
+from .tokens import estimate_tokens
+from .state import sha256_text, write_text_atomic
+
+
+# USD per 1M (input, cached input, output) tokens, from the OpenAI price list. Models missing here cost 0
+model_prices: dict[str, tuple[float, float, float]] = {
+    'gpt-4o-mini': (0.15, 0.075, 0.60),
+    'gpt-4o': (2.50, 1.25, 10.00),
+}
+
+
+def get_llm_cost(model: str, prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> float:
+    """Cost in USD of a request, by the longest entry of `model_prices` prefixing the model name(e.g. `gpt-4o-mini-2024-07-18`)."""
+    matches = [name for name in model_prices if model.startswith(name)]
+    if not matches:
+        return 0.0
+    input_price, cached_input_price, output_price = model_prices[max(matches, key=len)]
+    return ((prompt_tokens - cached_tokens) * input_price + cached_tokens * cached_input_price + completion_tokens * output_price) / 1_000_000
+
+
+class LLMUsageLabel(BaseModel):
+    """What an LLM call works on, to attribute its usage in the LLMUsageLedger."""
+    stage: str
+    filepath: str
+    router: Optional[str] = None
+    functions: list[str] = []
+
+
+class LLMUsageRecord(BaseModel):
+    """The usage of one `parse_chat_completion` call, over its retries."""
+    label: LLMUsageLabel
+    model: str
+    n_requests: int
+    failed: bool
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    system_prompt_hash: str
+    system_prompt_tokens: int
+    latency: float
+
+
+class LLMUsageTotals(BaseModel):
+    n_calls: float = 0
+    n_requests: float = 0
+    n_failures: float = 0
+    prompt_tokens: float = 0
+    completion_tokens: float = 0
+    cached_tokens: float = 0
+    latency: float = 0.0
+    cost: float = 0.0
+
+    @property
+    def total_tokens(self) -> float:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, record: LLMUsageRecord, share: float = 1.0):
+        """Add `share` of the record, a batched call is shared by its functions."""
+        self.n_calls += share
+        self.n_requests += record.n_requests * share
+        self.n_failures += record.failed * share
+        self.prompt_tokens += record.prompt_tokens * share
+        self.completion_tokens += record.completion_tokens * share
+        self.cached_tokens += record.cached_tokens * share
+        self.latency += record.latency * share
+        self.cost += get_llm_cost(record.model, record.prompt_tokens, record.cached_tokens, record.completion_tokens) * share
+
+
+class LLMUsageReport(BaseModel):
+    """LLM usage of a run, attributed to its stages, models, source files, routers and api functions.
+
+    `repeated_system_prompt_tokens` are the system prompt tokens sent again after the first request carrying the same system prompt, what prompt caching or batching could save.
+    """
+    totals: LLMUsageTotals
+    by_stage: dict[str, LLMUsageTotals]
+    by_model: dict[str, LLMUsageTotals]
+    by_file: dict[str, LLMUsageTotals]
+    by_router: dict[str, LLMUsageTotals]
+    by_function: dict[str, LLMUsageTotals]
+    worst_files: list[str]
+    worst_functions: list[str]
+    system_prompt_tokens: int
+    repeated_system_prompt_tokens: int
+    repeated_system_prompt_share: float
+
+    def format(self) -> str:
+        def table(title: str, rows: list[tuple[str, LLMUsageTotals]]) -> list[str]:
+            lines = [f"{title:<48} {'calls':>7} {'reqs':>7} {'fails':>6} {'prompt':>10} {'cached':>10} {'output':>9} {'llm(s)':>9} {'cost($)':>9}"]
+            for key, totals in rows:
+                lines.append(
+                    f"{key[-48:]:<48} {totals.n_calls:>7.1f} {totals.n_requests:>7.1f} {totals.n_failures:>6.1f} {totals.prompt_tokens:>10.0f} "
+                    f"{totals.cached_tokens:>10.0f} {totals.completion_tokens:>9.0f} {totals.latency:>9.2f} {totals.cost:>9.4f}"
+                )
+            return lines + ['']
+
+        lines = table('stage', [*self.by_stage.items(), ('total', self.totals)])
+        lines += table('model', list(self.by_model.items()))
+        lines += table('worst files', [(key, self.by_file[key]) for key in self.worst_files])
+        lines += table('worst functions', [(key, self.by_function[key]) for key in self.worst_functions])
+        lines.append(
+            f"System prompts: {self.system_prompt_tokens} tokens sent, {self.repeated_system_prompt_tokens} repeated "
+            f"({self.repeated_system_prompt_share:.1%} of the prompt tokens)."
+        )
+        return '\n'.join(lines)
+
+    def dump(self, path: os.PathLike) -> tuple[Path, Path]:
+        """Write the report as JSON to `path`, and as a table next to it(`.txt`)."""
+        path = Path(path)
+        text_path = path.with_suffix('.txt')
+        write_text_atomic(path, json.dumps(self.model_dump(), indent=2))
+        write_text_atomic(text_path, self.format() + '\n')
+        return path, text_path
+
+
+unlabeled_llm_usage = LLMUsageLabel(stage='unlabeled', filepath='')
+
+
+class LLMUsageLedger:
+    """Process-wide record of every `parse_chat_completion` call, rolled up by `build_report`."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records: list[LLMUsageRecord] = []
+        # where the run which reset the ledger wants its report written, see AzathothParams.llm_usage_report_path
+        self.output_path: Optional[Path] = None
+
+    def reset(self):
+        with self._lock:
+            self._records.clear()
+
+    def record_call(self, label: LLMUsageLabel | None, model: str, messages: list[dict], chat_completion: Any | None, latency: float, n_requests: int, discarded_usages: list[Any] | None = None):
+        """Record a call which returned `chat_completion`, or failed if it is None. `discarded_usages` are the usages of the completions the call retried, they count too."""
+        usages = [usage for usage in [getattr(chat_completion, 'usage', None), *(discarded_usages or [])] if usage is not None]
+        system_prompt = '\n'.join(message.get('content') or '' for message in messages if message.get('role') == 'system')
+        record = LLMUsageRecord(
+            label=label or unlabeled_llm_usage,
+            model=model,
+            n_requests=n_requests,
+            failed=chat_completion is None,
+            prompt_tokens=sum(usage.prompt_tokens for usage in usages),
+            completion_tokens=sum(usage.completion_tokens for usage in usages),
+            cached_tokens=sum(getattr(getattr(usage, 'prompt_tokens_details', None), 'cached_tokens', None) or 0 for usage in usages),
+            system_prompt_hash=sha256_text(system_prompt),
+            system_prompt_tokens=estimate_tokens(system_prompt),
+            latency=latency,
+        )
+        with self._lock:
+            self._records.append(record)
+
+    def get_records(self) -> list[LLMUsageRecord]:
+        with self._lock:
+            return list(self._records)
+
+    def build_report(self, top_n: int = 10) -> LLMUsageReport:
+        """Roll the records up. The usage of a call batching several api functions is split evenly among them, the worst offenders are the `top_n` most costly files and functions."""
+        totals = LLMUsageTotals()
+        by_stage: dict[str, LLMUsageTotals] = {}
+        by_model: dict[str, LLMUsageTotals] = {}
+        by_file: dict[str, LLMUsageTotals] = {}
+        by_router: dict[str, LLMUsageTotals] = {}
+        by_function: dict[str, LLMUsageTotals] = {}
+        n_system_prompt_requests: dict[str, int] = {}
+        system_prompt_tokens = 0
+        repeated_system_prompt_tokens = 0
+
+        for record in self.get_records():
+            label = record.label
+            totals.add(record)
+            by_stage.setdefault(label.stage, LLMUsageTotals()).add(record)
+            by_model.setdefault(record.model, LLMUsageTotals()).add(record)
+            by_file.setdefault(label.filepath, LLMUsageTotals()).add(record)
+            if label.router is not None:
+                by_router.setdefault(label.router, LLMUsageTotals()).add(record)
+            for function in label.functions:
+                by_function.setdefault(f'{label.router}.{function}', LLMUsageTotals()).add(record, 1 / len(label.functions))
+
+            if not record.failed:
+                n_sent = n_system_prompt_requests.get(record.system_prompt_hash, 0)
+                n_system_prompt_requests[record.system_prompt_hash] = n_sent + 1
+                system_prompt_tokens += record.system_prompt_tokens
+                if n_sent:
+                    repeated_system_prompt_tokens += record.system_prompt_tokens
+
+        def get_worst(totals_dict: dict[str, LLMUsageTotals]) -> list[str]:
+            return sorted(totals_dict, key=lambda key: (totals_dict[key].cost, totals_dict[key].total_tokens), reverse=True)[:top_n]
+
+        return LLMUsageReport(
+            totals=totals,
+            by_stage=by_stage,
+            by_model=by_model,
+            by_file=by_file,
+            by_router=by_router,
+            by_function=by_function,
+            worst_files=get_worst(by_file),
+            worst_functions=get_worst(by_function),
+            system_prompt_tokens=system_prompt_tokens,
+            repeated_system_prompt_tokens=repeated_system_prompt_tokens,
+            repeated_system_prompt_share=repeated_system_prompt_tokens / totals.prompt_tokens if totals.prompt_tokens else 0.0,
+        )
+
+
+_default_llm_usage_ledger = ProcessSingleton(LLMUsageLedger)
+
+
+def get_llm_usage_ledger() -> LLMUsageLedger:
+    """Get the process-wide LLMUsageLedger."""
+    return _default_llm_usage_ledger.get()
+
+
+__all__ = [
+    'model_prices',
+    'get_llm_cost',
+    'LLMUsageLabel',
+    'LLMUsageRecord',
+    'LLMUsageTotals',
+    'LLMUsageReport',
+    'LLMUsageLedger',
+    'get_llm_usage_ledger',
+]
@@ -0,0 +1,150 @@
+import os
+import time
+import random
+import threading
+
+from pydantic import BaseModel
+from autom.logger import autom_logger
+
+from .singleton import ProcessSingleton
+
+
+default_openai_rpm = int(os.environ.get('AZATHOTH_OPENAI_RPM', 500))
+default_openai_tpm = int(os.environ.get('AZATHOTH_OPENAI_TPM', 200_000))
+
+
+class TokenBucket:
+    """A thread-safe token bucket refilled continuously at `capacity` per minute."""
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.capacity / 60)
+        self._updated_at = now
+
+    def try_acquire(self, amount: float) -> float:
+        """Take `amount` tokens if available and return 0, else return the seconds to wait before retrying.
+
+        An amount above the capacity is granted once the bucket is full, so it can never block forever.
+        """
+        with self._lock:
+            self._refill()
+            amount = min(amount, self.capacity)
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) * 60 / self.capacity
+
+    def adjust(self, delta: float):
+        """Give back(positive) or take more(negative) tokens, the bucket may go into debt."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + delta)
+
+
+class RateLimiterStats(BaseModel):
+    n_requests: int = 0
+    n_throttled: int = 0
+    n_rate_limited: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    estimated_tokens: int = 0
+    actual_tokens: int = 0
+
+    @property
+    def mean_wait_seconds(self) -> float:
+        return self.total_wait_seconds / self.n_requests if self.n_requests else 0.0
+
+
+class OpenAIRateLimiter:
+    """Process-wide requests-per-minute and tokens-per-minute limiter of OpenAI calls.
+
+    Callers `acquire` with an estimated token count before a call and `reconcile` with the real usage after it. On a 429, `back_off` pauses every caller until the server's retry-after has elapsed.
+    """
+    def __init__(self, rpm: int = default_openai_rpm, tpm: int = default_openai_tpm):
+        self._rpm_bucket = TokenBucket(rpm)
+        self._tpm_bucket = TokenBucket(tpm)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._stats = RateLimiterStats()
+
+    @property
+    def rpm(self) -> int:
+        return self._rpm_bucket.capacity
+
+    @property
+    def tpm(self) -> int:
+        return self._tpm_bucket.capacity
+
+    def configure(self, rpm: int | None = None, tpm: int | None = None):
+        if rpm is not None:
+            self._rpm_bucket = TokenBucket(rpm)
+        if tpm is not None:
+            self._tpm_bucket = TokenBucket(tpm)
+
+    def acquire(self, estimated_tokens: int):
+        """Block until one request and `estimated_tokens` tokens fit in the limits."""
+        started_at = time.monotonic()
+        while True:
+            wait_seconds = self._paused_until - time.monotonic()
+            if wait_seconds <= 0:
+                wait_seconds = self._rpm_bucket.try_acquire(1)
+            if wait_seconds <= 0:
+                wait_seconds = self._tpm_bucket.try_acquire(estimated_tokens)
+                if wait_seconds > 0:
+                    self._rpm_bucket.adjust(1)
+            if wait_seconds <= 0:
+                break
+            time.sleep(wait_seconds)
+
+        waited = time.monotonic() - started_at
+        with self._lock:
+            self._stats.n_requests += 1
+            self._stats.estimated_tokens += estimated_tokens
+            self._stats.total_wait_seconds += waited
+            self._stats.max_wait_seconds = max(self._stats.max_wait_seconds, waited)
+            if waited > 0.001:
+                self._stats.n_throttled += 1
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int):
+        """Correct the TPM bucket with the real token usage of a finished call."""
+        self._tpm_bucket.adjust(estimated_tokens - actual_tokens)
+        with self._lock:
+            self._stats.actual_tokens += actual_tokens
+
+    def back_off(self, attempt: int, retry_after: float | None = None) -> float:
+        """Pause all callers after a 429, for `retry_after` seconds if the server told so, else an exponential backoff with jitter.
+
+        Returns:
+            float: The seconds to pause.
+        """
+        pause_seconds = retry_after if retry_after is not None else min(60.0, 2 ** attempt) * (0.5 + random.random() / 2)
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + pause_seconds)
+            self._stats.n_rate_limited += 1
+        autom_logger.warning(f"[OpenAIRateLimiter] Rate limited by OpenAI, pause for {pause_seconds:.1f}s (attempt {attempt}).")
+        return pause_seconds
+
+    def stats(self) -> RateLimiterStats:
+        with self._lock:
+            return self._stats.model_copy()
+
+
+_default_openai_rate_limiter = ProcessSingleton(OpenAIRateLimiter)
+
+
+def get_openai_rate_limiter() -> OpenAIRateLimiter:
+    """Get the process-wide OpenAIRateLimiter, limits default to `$AZATHOTH_OPENAI_RPM` and `$AZATHOTH_OPENAI_TPM`."""
+    return _default_openai_rate_limiter.get()
+
+
+__all__ = [
+    'TokenBucket',
+    'RateLimiterStats',
+    'OpenAIRateLimiter',
+    'get_openai_rate_limiter',
+]
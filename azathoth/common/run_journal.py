@@ -0,0 +1,101 @@
+import os
+import json
+import threading
+from typing import Any
+from pathlib import Path
+
+from autom.logger import autom_logger
+
+from .state import get_state_dir
+from .llm_cache import make_llm_cache_key
+
+
+run_journals_dirname = 'journals'
+
+
+class RunJournal:
+    """Append-only journal of the results completed by a project run, one JSON line per result, replayed by a run started with `resume=True`."""
+    def __init__(self, path: os.PathLike):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries: dict[str, Any] | None = None
+
+    def _load(self) -> dict[str, Any]:
+        if self._entries is None:
+            self._entries = {}
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                            self._entries[record['key']] = record['result']
+                        except (ValueError, KeyError, TypeError):
+                            continue
+            except FileNotFoundError:
+                pass
+        return self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load())
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            return self._load().get(key)
+
+    def record(self, key: str, result: Any):
+        """Record a completed result, `result` must be JSON serializable."""
+        line = json.dumps({'key': key, 'result': result}, ensure_ascii=False)
+        with self._lock:
+            entries = self._load()
+            entries[key] = result
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+            except OSError as e:
+                autom_logger.warning(f"[RunJournal] Failed to record to {self.path}: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def make_journal_key(kind: str, *parts: str) -> str:
+    """Make the journal key of a result, e.g. `make_journal_key('segment', src_relpath, sha256_text(segment))`."""
+    return make_llm_cache_key(kind, *parts)
+
+
+_run_journals: dict[Path, RunJournal] = {}
+_run_journals_lock = threading.Lock()
+
+
+def get_run_journal(project_root_path: os.PathLike, name: str) -> RunJournal:
+    """Get the journal `name`(e.g. `schema`, `api`, `action`) of a project, kept in its state dir. Journals are shared within the process."""
+    path = get_state_dir(project_root_path) / run_journals_dirname / f'{name}.jsonl'
+    with _run_journals_lock:
+        if path not in _run_journals:
+            _run_journals[path] = RunJournal(path)
+        return _run_journals[path]
+
+
+def open_run_journal(project_root_path: os.PathLike, name: str, resume: bool) -> RunJournal:
+    """Get the journal of a project run which starts now: cleared unless `resume`."""
+    journal = get_run_journal(project_root_path, name)
+    if resume:
+        autom_logger.info(f"[RunJournal] Resuming the {name} run, {len(journal)} results recorded.")
+    else:
+        journal.clear()
+    return journal
+
+
+__all__ = [
+    'RunJournal',
+    'make_journal_key',
+    'get_run_journal',
+    'open_run_journal',
+]
@@ -1,8 +1,17 @@
+import os
+from typing import Optional
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 from autom.engine import AutomSchema, AutomField
 from pydantic import field_validator, PositiveInt
 
+from .enum import SegmentStrategy
+from .state import write_text_atomic
+
+
+default_dump_max_workers = int(os.environ.get('AZATHOTH_DUMP_MAX_WORKERS', 8))
+
 
 # TODO: support binary files in the future
 class Filepath(AutomSchema):
@@ -10,6 +19,17 @@ class Filepath(AutomSchema):
     filepath: Path
 
 
+class ConvertFailure(AutomSchema):
+    """An item(segment, function, file...) which could not be converted, even after the retries."""
+    item: str = AutomField(..., description="What failed, e.g. `segment 3 of app/schemas/user.py`")
+    filepath: Optional[Path] = AutomField(None, description="The full filepath of the output file which was not produced, if any")
+    error: str = AutomField(..., description="The last error, `ExceptionType: message`")
+
+    @classmethod
+    def from_exception(cls, item: str, e: Exception, filepath: Optional[Path] = None) -> 'ConvertFailure':
+        return cls(item=item, filepath=filepath, error=f'{type(e).__name__}: {e}')
+
+
 class FileContent(AutomSchema):
     """Schema used to describe a file's content, contains: `filepath` Path and `content` str"""
     filepath: Path = AutomField(
@@ -20,6 +40,27 @@ class FileContent(AutomSchema):
         ...,
         description="The text content of the file"
     )
+    failure: Optional[ConvertFailure] = AutomField(
+        None,
+        description="Set if the file could not be converted, its `content` is then meaningless and it is reported in `FilesContent.failures` instead of its map"
+    )
+
+
+class FilesDumpReport(AutomSchema):
+    """What `FilesContent.dump_to_disk` did."""
+    n_written: int = AutomField(0, description="Number of files created or changed")
+    n_skipped: int = AutomField(0, description="Number of files left untouched since their content on disk is already up to date")
+    n_removed: int = AutomField(0, description="Number of files removed")
+    written_filepaths: list[Path] = AutomField(default_factory=list, description="The files created or changed, sorted")
+
+
+class SourceStamp(AutomSchema):
+    """The source an output file was converted from, as it was when the conversion was planned. Manifests record it, so a source edited during the run is converted again by the next one."""
+    src_filepath: Path = AutomField(..., description="The full filepath of the source file")
+    part: Optional[str] = AutomField(None, description="The part of the source file converted, e.g. an api function name. None for the whole file")
+    content_hash: str = AutomField(..., description="sha256 of the source file content, or of its converted `part`")
+    size: Optional[int] = AutomField(None, description="Source file size in bytes, if the whole file was converted")
+    mtime_ns: Optional[int] = AutomField(None, description="Source file mtime in nanoseconds, if the whole file was converted")
 
 
 class FilesContent(AutomSchema):
@@ -28,16 +69,82 @@ class FilesContent(AutomSchema):
         default_factory=dict,
         description="The internal map to describe files' content, key is the full filepath, value is the file text content"
     )
+    removed_filepaths: list[Path] = AutomField(
+        default_factory=list,
+        description="Full filepaths of files to remove from disk, e.g. outputs which are not generated anymore"
+    )
+    dump_report: Optional[FilesDumpReport] = AutomField(
+        None,
+        description="Set by FilesDumper once the files are dumped"
+    )
+    failures: list[ConvertFailure] = AutomField(
+        default_factory=list,
+        description="The items which could not be converted, their files are not in `map`"
+    )
+    source_stamps: dict[Path, SourceStamp] = AutomField(
+        default_factory=dict,
+        description="The source each file of `map` was converted from, keyed by the full filepath. Set by the stages which keep a manifest"
+    )
+
+    def dump_to_disk(self, max_workers: int = default_dump_max_workers, already_dumped: dict[Path, bool] | None = None) -> FilesDumpReport:
+        """Write the files whose content on disk differs, atomically and through a thread pool, and remove `removed_filepaths`.
 
-    def dump_to_disk(self):
-        for path, content in self.map.items():
-            if not path.parent.exists():
-                path.parent.mkdir(parents=True, exist_ok=True)
-            with open(path, 'w') as f:
-                f.write(content)
+        Unchanged files are not touched at all, so their mtime stays and file watchers(dev servers, incremental builds) see nothing.
+        The files in `already_dumped`(e.g. streamed by the FilesStreamWriter) are not checked again, their value tells whether they were written.
+        """
+        already_dumped = already_dumped or {}
+        items = sorted((path, content) for path, content in self.map.items() if path not in already_dumped)
+        if len(items) > 1 and max_workers > 1:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+                written = list(executor.map(lambda item: dump_file_if_changed(*item), items))
+        else:
+            written = [dump_file_if_changed(path, content) for path, content in items]
+        items.extend((path, self.map[path]) for path in already_dumped if path in self.map)
+        written.extend(is_written for path, is_written in already_dumped.items() if path in self.map)
+
+        n_removed = 0
+        for path in self.removed_filepaths:
+            if path not in self.map and path.exists():
+                path.unlink()
+                n_removed += 1
+
+        return FilesDumpReport(
+            n_written=sum(written),
+            n_skipped=len(written) - sum(written),
+            n_removed=n_removed,
+            written_filepaths=sorted(path for (path, _), is_written in zip(items, written) if is_written),
+        )
+
+
+def dump_file_if_changed(path: Path, content: str) -> bool:
+    """Write the file atomically unless its content on disk is already `content`. Returns whether it was written."""
+    try:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            if f.read() == content:
+                return False
+    except (FileNotFoundError, UnicodeDecodeError):
+        pass
+    write_text_atomic(path, content)
+    return True
+
+
+class LLMCacheParams(AutomSchema):
+    use_llm_cache: bool = AutomField(True, description="Whether to reuse cached LLM results of identical requests from previous runs")
+
+
+class ResumeParams(AutomSchema):
+    resume: bool = AutomField(False, description="Replay the results recorded in the run journal by the last run(e.g. one which crashed), only the remaining work is executed")
+
+
+class StreamDumpParams(AutomSchema):
+    stream_dump: bool = AutomField(False, description="Dump each converted file as soon as it is produced instead of after the whole conversion, so a failure partway keeps the finished files")
 
 
 class BaseRecursiveSegmentParams(AutomSchema):
+    strategy: SegmentStrategy = AutomField(
+        SegmentStrategy.python_ast,
+        description="How to find segment boundaries. `python_ast` packs top-level statements and falls back to `separator` if the text is not valid Python"
+    )
     separators: list[str] = AutomField(
         default=['\n\n'],
         description="The list of separators to recursively segment the file content. Now please kindly leave it to default value \n\n, other separators will be supportted in the future."
@@ -46,6 +153,10 @@ class BaseRecursiveSegmentParams(AutomSchema):
         512, 
         description="Max lines per segment"
     )
+    max_tokens_per_segment: Optional[PositiveInt] = AutomField(
+        None,
+        description="Max estimated LLM tokens per segment, no token limit if None"
+    )
 
 
 class FileRecursiveSegmentParams(Filepath, BaseRecursiveSegmentParams):
@@ -70,6 +181,10 @@ class TextSegments(AutomSchema):
         ...,
         description="The list of segmented content in order"
     )
+    n_tokens: list[int] = AutomField(
+        default_factory=list,
+        description="The estimated LLM tokens of every segment, in order"
+    )
 
 
 class TSExportHelperInput(AutomSchema):
@@ -82,6 +197,22 @@ class TSExportHelperInput(AutomSchema):
         default_factory=list,
         description="The list of modules to export. They should directories, not be overlapping with each other, and are consumed to be within the project root"
     )
+    incremental: bool = AutomField(
+        True,
+        description="Only generate the index.ts of directories whose listing changed since the last run, or whose index.ts is missing"
+    )
+
+
+class TSExportFilesContent(FilesContent):
+    """Output of TSExportHelper: the index.ts files to dump, and the listing signatures to save once they are dumped."""
+    signatures_path: Optional[Path] = AutomField(
+        None,
+        description="The state file where TSExportSignaturesSaver saves `listing_signatures`"
+    )
+    listing_signatures: Optional[dict[str, str]] = AutomField(
+        None,
+        description="The listing signature of every exported directory, keyed by directory path. None if not incremental"
+    )
 
 
 class PyFilePath(AutomSchema):
@@ -0,0 +1,24 @@
+import threading
+from typing import Callable, Generic, TypeVar
+
+
+T = TypeVar('T')
+
+
+class ProcessSingleton(Generic[T]):
+    """A process-wide instance built by `factory` on first `get`, shared by every thread."""
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._instance: T | None = None
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        with self._lock:
+            if self._instance is None:
+                self._instance = self._factory()
+            return self._instance
+
+
+__all__ = [
+    'ProcessSingleton',
+]
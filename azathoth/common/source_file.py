@@ -0,0 +1,142 @@
+import os
+import ast
+import bisect
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+from pydantic import BaseModel
+
+from .singleton import ProcessSingleton
+
+
+default_source_file_cache_max_files = int(os.environ.get('AZATHOTH_SOURCE_CACHE_MAX_FILES', 4096))
+
+
+class SourceFileCacheStats(BaseModel):
+    """Counters of a SourceFileCache, accumulated since the cache was created."""
+    reads: int = 0
+    read_hits: int = 0
+    parses: int = 0
+    parses_avoided: int = 0
+    evictions: int = 0
+
+    @property
+    def n_lookups(self) -> int:
+        return self.reads + self.read_hits
+
+
+class SourceFile:
+    """The text of a source file as it was at (size, mtime_ns), with its line-offset table and AST built on first use.
+
+    The AST is shared by every reader of the file, never mutate it.
+    """
+    def __init__(self, path: Path, size: int, mtime_ns: int, text: str, stats: SourceFileCacheStats | None = None):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.text = text
+        self._line_offsets: list[int] | None = None
+        self._tree: ast.Module | None = None
+        self._lock = threading.Lock()
+        self._stats = stats
+
+    @property
+    def line_offsets(self) -> list[int]:
+        """The offset in `text` where every line starts."""
+        if self._line_offsets is None:
+            offsets = [0]
+            index = self.text.find('\n')
+            while index != -1:
+                offsets.append(index + 1)
+                index = self.text.find('\n', index + 1)
+            self._line_offsets = offsets
+        return self._line_offsets
+
+    def get_line_number(self, offset: int) -> int:
+        """The 1-based line number of the character at `offset`."""
+        return bisect.bisect_right(self.line_offsets, offset)
+
+    def get_lines(self, start_lineno: int, end_lineno: int) -> str:
+        """The text of lines `start_lineno` to `end_lineno`, both 1-based and inclusive, as AST nodes number them."""
+        offsets = self.line_offsets
+        start = offsets[start_lineno - 1]
+        end = offsets[end_lineno] if end_lineno < len(offsets) else len(self.text)
+        return self.text[start:end]
+
+    @property
+    def tree(self) -> ast.Module:
+        """The parsed AST, raises SyntaxError if the file is not valid Python."""
+        with self._lock:
+            if self._tree is None:
+                self._tree = ast.parse(self.text, filename=str(self.path))
+                if self._stats is not None:
+                    self._stats.parses += 1
+            elif self._stats is not None:
+                self._stats.parses_avoided += 1
+            return self._tree
+
+
+class SourceFileCache:
+    """Process-wide LRU cache of SourceFile, keyed by path and invalidated when the file size or mtime changes.
+
+    Every azathoth step reading or parsing a backend file goes through here, so each file is read and parsed once per run.
+    """
+    def __init__(self, max_files: int = default_source_file_cache_max_files):
+        self.max_files = max_files
+        self._files: OrderedDict[Path, SourceFile] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = SourceFileCacheStats()
+
+    def get(self, path: os.PathLike) -> SourceFile:
+        path = Path(path).resolve()
+        stat = path.stat()
+        with self._lock:
+            source_file = self._files.get(path)
+            if source_file is not None and (source_file.size, source_file.mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+                self._files.move_to_end(path)
+                self._stats.read_hits += 1
+                return source_file
+
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        source_file = SourceFile(path, stat.st_size, stat.st_mtime_ns, text, stats=self._stats)
+
+        with self._lock:
+            self._stats.reads += 1
+            self._files[path] = source_file
+            self._files.move_to_end(path)
+            while len(self._files) > self.max_files:
+                self._files.popitem(last=False)
+                self._stats.evictions += 1
+        return source_file
+
+    def clear(self):
+        with self._lock:
+            self._files.clear()
+
+    def stats(self) -> SourceFileCacheStats:
+        with self._lock:
+            return self._stats.model_copy()
+
+
+_default_source_file_cache = ProcessSingleton(SourceFileCache)
+
+
+def get_source_file_cache() -> SourceFileCache:
+    """Get the process-wide SourceFileCache, its size defaults to `$AZATHOTH_SOURCE_CACHE_MAX_FILES` files."""
+    return _default_source_file_cache.get()
+
+
+def read_source_file(path: os.PathLike) -> SourceFile:
+    """Read `path` through the process-wide SourceFileCache."""
+    return get_source_file_cache().get(path)
+
+
+__all__ = [
+    'SourceFileCacheStats',
+    'SourceFile',
+    'SourceFileCache',
+    'get_source_file_cache',
+    'read_source_file',
+]
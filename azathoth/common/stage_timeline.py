@@ -0,0 +1,89 @@
+import time
+import threading
+from typing import Optional
+
+from pydantic import BaseModel
+
+from .singleton import ProcessSingleton
+
+
+class StageSpan(BaseModel):
+    """Wall time of a stage, in seconds since the timeline was reset."""
+    stage: str
+    start: float
+    end: Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else self.start) - self.start
+
+
+class StageTimeline:
+    """Process-wide record of when each stage of a conversion started and ended.
+
+    A stage may be marked by several workers, its span goes from the first `start` to the last `end`.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._spans: dict[str, StageSpan] = {}
+
+    def reset(self):
+        with self._lock:
+            self._origin = time.perf_counter()
+            self._spans.clear()
+
+    def start(self, stage: str):
+        now = time.perf_counter() - self._origin
+        with self._lock:
+            if stage not in self._spans:
+                self._spans[stage] = StageSpan(stage=stage, start=now)
+
+    def end(self, stage: str):
+        now = time.perf_counter() - self._origin
+        with self._lock:
+            span = self._spans.setdefault(stage, StageSpan(stage=stage, start=now))
+            span.end = max(span.end or now, now)
+
+    def get_spans(self) -> list[StageSpan]:
+        """Copies of the spans, ordered by start."""
+        with self._lock:
+            return sorted((span.model_copy() for span in self._spans.values()), key=lambda span: span.start)
+
+
+def get_critical_path(spans: list[StageSpan], dependencies: dict[str, list[str]]) -> list[StageSpan]:
+    """The chain of stages which ends last, following for each stage the dependency which ended last.
+
+    Args:
+        spans (list[StageSpan]): The stage spans.
+        dependencies (dict[str, list[str]]): The stages each stage waits for.
+
+    Returns:
+        list[StageSpan]: The critical path, from the first stage to the last.
+    """
+    span_dict = {span.stage: span for span in spans if span.end is not None}
+    if not span_dict:
+        return []
+    path = [max(span_dict.values(), key=lambda span: span.end)]
+    while True:
+        upstream = [span_dict[stage] for stage in dependencies.get(path[-1].stage, []) if stage in span_dict]
+        if not upstream:
+            break
+        path.append(max(upstream, key=lambda span: span.end))
+    return path[::-1]
+
+
+_default_stage_timeline = ProcessSingleton(StageTimeline)
+
+
+def get_stage_timeline() -> StageTimeline:
+    """Get the process-wide StageTimeline."""
+    return _default_stage_timeline.get()
+
+
+__all__ = [
+    'StageSpan',
+    'StageTimeline',
+    'get_critical_path',
+    'get_stage_timeline',
+]
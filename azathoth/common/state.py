@@ -0,0 +1,87 @@
+import os
+import json
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Any
+
+
+state_dir_name = '.azathoth'
+
+
+def get_state_dir(project_root_path: os.PathLike) -> Path:
+    """Get the directory where azathoth persists its per-project state (manifests, journals, ...)."""
+    return Path(project_root_path) / state_dir_name
+
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def sha256_file(filepath: os.PathLike) -> str:
+    hasher = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def load_state_json(filepath: os.PathLike, default: Any = None) -> Any:
+    """Load a JSON state file, return `default` if it does not exist or is corrupted."""
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def dump_state_json(filepath: os.PathLike, data: Any):
+    """Atomically dump `data` to a JSON state file."""
+    write_text_atomic(filepath, json.dumps(data, ensure_ascii=False, indent=2, sort_keys=True))
+
+
+def _read_umask() -> int:
+    # os.umask can only be read by setting it, which affects every thread: do it once at import, before any dump thread runs
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+_umask = _read_umask()
+
+
+def get_umask() -> int:
+    return _umask
+
+
+def write_text_atomic(filepath: os.PathLike, text: str):
+    """Write `text` to `filepath` through a temp file renamed over it, readers never see a partially written file.
+
+    The file keeps its permissions if it exists, else gets the default ones of the umask.
+    """
+    filepath = Path(filepath)
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=filepath.parent, prefix=f'.{filepath.name}.', suffix='.tmp')
+    try:
+        # no newline translation, so the file compares equal to `text` when read back with newline=''
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        try:
+            os.chmod(tmp_path, filepath.stat().st_mode & 0o7777)
+        except FileNotFoundError:
+            os.chmod(tmp_path, 0o666 & ~get_umask())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+__all__ = [
+    'get_state_dir',
+    'sha256_text',
+    'sha256_file',
+    'load_state_json',
+    'dump_state_json',
+    'write_text_atomic',
+]
@@ -0,0 +1,27 @@
+import re
+
+
+# CJK characters are roughly one token each, latin words roughly one token per 4 characters, other symbols one token each
+_token_piece_pattern = re.compile(r'[\u3000-\u9fff\uff00-\uffef]|[A-Za-z0-9_]+|[^\sA-Za-z0-9_\u3000-\u9fff\uff00-\uffef]')
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of LLM tokens of `text` locally, without any tokenizer or network call.
+
+    It is a rough approximation of BPE tokenizers, good enough for budgeting and rate limiting, not for billing.
+    """
+    n_tokens = 0
+    for piece in _token_piece_pattern.findall(text):
+        n_tokens += (len(piece) + 3) // 4 if piece[0].isascii() and (piece[0].isalnum() or piece[0] == '_') else 1
+    return n_tokens
+
+
+def estimate_messages_tokens(messages: list[dict]) -> int:
+    """Estimate the prompt tokens of chat completion messages, including the per-message overhead."""
+    return sum(estimate_tokens(message.get('content') or '') + 4 for message in messages) + 3
+
+
+__all__ = [
+    'estimate_tokens',
+    'estimate_messages_tokens',
+]
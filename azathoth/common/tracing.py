@@ -0,0 +1,290 @@
+import os
+import sys
+import json
+import time
+import weakref
+import inspect
+import functools
+import threading
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+from contextlib import contextmanager
+
+from pydantic import BaseModel
+from autom.engine import (
+    AgentWorker, GraphAgentWorker, BridgeWorker, DispatchBridgeWorker, PluggerWorker, CollectPluggerWorker, AggregatorWorker,
+)
+from autom.logger import autom_logger
+
+
+# the fields of a request body which name the item it works on, the first found labels the span
+item_field_names = ['api_function_name', 'src_filepath', 'src_file_fullpath', 'api_src_fullpath', 'filepath']
+
+
+class TraceSpan:
+    """A span being recorded, see `Tracer.span`."""
+    def __init__(self, tracer: 'Tracer', name: str, cat: str, path: str, args: dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.path = path
+        self.args = args
+
+    def set(self, **args: Any):
+        self.args.update(args)
+
+
+class Tracer:
+    """Collects the spans of a run and exports them as a Chrome trace, viewable in Perfetto(ui.perfetto.dev) or chrome://tracing.
+
+    The node path of a span run in another thread is found from the payload bodies registered by its parent span.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._origin_ns = time.perf_counter_ns()
+        self._events: list[dict] = []
+        self._thread_ids: dict[int, int] = {}
+        # id of a registered body --> (weak reference to it, parent path, fan-out index), dropped once the body is collected
+        self._body_paths: dict[int, tuple[weakref.ref, str, Optional[int]]] = {}
+        # where the run which enabled tracing wants its trace written, see AzathothParams.trace_path
+        self.output_path: Optional[Path] = None
+
+    def reset(self):
+        with self._lock:
+            self._origin_ns = time.perf_counter_ns()
+            self._events.clear()
+            self._body_paths.clear()
+
+    def _stack(self) -> list[str]:
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def register_body(self, body: Any, parent_path: str, fanout_index: Optional[int] = None):
+        """Tell that a span receiving `body` lives under `parent_path`."""
+        if not isinstance(body, BaseModel):
+            return
+        key = id(body)
+        body_ref = weakref.ref(body, lambda body_ref: self._forget_body(key, body_ref))
+        with self._lock:
+            self._body_paths[key] = (body_ref, parent_path, fanout_index)
+
+    def _forget_body(self, key: int, body_ref: weakref.ref):
+        # called by the garbage collector, maybe in a thread holding the lock, so no locking: a single dict operation is atomic
+        entry = self._body_paths.get(key)
+        if entry is not None and entry[0] is body_ref:
+            self._body_paths.pop(key, None)
+
+    def lookup_body(self, body: Any) -> tuple[str, Optional[int]] | None:
+        if not isinstance(body, BaseModel):
+            return None
+        with self._lock:
+            entry = self._body_paths.get(id(body))
+        # the id of a collected body may be reused before its entry is dropped
+        if entry is None or entry[0]() is not body:
+            return None
+        return entry[1], entry[2]
+
+    @contextmanager
+    def span(self, name: str, cat: str, body: Any = None, **args: Any) -> Iterator[TraceSpan]:
+        """Record a span around the block. The span opens a level of the node path for the spans nested in it in the same thread."""
+        stack = self._stack()
+        registered = self.lookup_body(body) if body is not None else None
+        if registered is not None:
+            parent_path, fanout_index = registered
+            if fanout_index is not None:
+                args['fanout_index'] = fanout_index
+        else:
+            parent_path = stack[-1] if stack else ''
+        if body is not None:
+            args['payload_bytes'] = get_payload_bytes(body)
+            item = get_body_item(body)
+            if item is not None:
+                args['item'] = item
+        path = f'{parent_path}/{name}' if parent_path else name
+        span = TraceSpan(self, name, cat, path, args)
+
+        stack.append(path)
+        started_ns = time.perf_counter_ns()
+        try:
+            yield span
+        except BaseException as e:
+            span.args['error'] = f'{type(e).__name__}: {e}'
+            raise
+        finally:
+            ended_ns = time.perf_counter_ns()
+            stack.pop()
+            self._add_event(span, started_ns, ended_ns)
+
+    def _add_event(self, span: TraceSpan, started_ns: int, ended_ns: int):
+        thread_ident = threading.get_ident()
+        with self._lock:
+            if thread_ident not in self._thread_ids:
+                self._thread_ids[thread_ident] = len(self._thread_ids) + 1
+                self._events.append({
+                    'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': self._thread_ids[thread_ident],
+                    'args': {'name': threading.current_thread().name},
+                })
+            self._events.append({
+                'name': span.name,
+                'cat': span.cat,
+                'ph': 'X',
+                'ts': (started_ns - self._origin_ns) / 1000,
+                'dur': (ended_ns - started_ns) / 1000,
+                'pid': os.getpid(),
+                'tid': self._thread_ids[thread_ident],
+                'args': {'path': span.path, **{key: to_trace_arg(value) for key, value in span.args.items()}},
+            })
+
+    def get_events(self) -> list[dict]:
+        with self._lock:
+            return list(self._events)
+
+    def dump_chrome_trace(self, path: os.PathLike) -> Path:
+        """Write the spans so far as a Chrome trace JSON file."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': self.get_events(), 'displayTimeUnit': 'ms'}, f)
+        autom_logger.info(f"[Tracer] Chrome trace of {len(self._events)} events written to {path}, open it in https://ui.perfetto.dev.")
+        return path
+
+
+def get_payload_bytes(data: Any) -> int:
+    """Approximate serialized size of a payload."""
+    if isinstance(data, BaseModel):
+        return len(data.model_dump_json())
+    if isinstance(data, str):
+        return len(data.encode('utf-8'))
+    if isinstance(data, dict):
+        return sum(get_payload_bytes(key) + get_payload_bytes(value) for key, value in data.items())
+    if isinstance(data, (list, tuple, set)):
+        return sum(get_payload_bytes(item) for item in data)
+    return len(str(data))
+
+
+def get_body_item(body: Any) -> str | None:
+    for field_name in item_field_names:
+        value = getattr(body, field_name, None)
+        if value is not None:
+            return str(value)
+    return None
+
+
+def to_trace_arg(value: Any) -> Any:
+    return value if isinstance(value, (str, int, float, bool)) or value is None else str(value)
+
+
+_tracer: Tracer | None = None
+# (class, attribute, the attribute in the class __dict__ before patching or None if it was inherited)
+_patched_methods: list[tuple[type, str, Any]] = []
+_tracing_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer | None:
+    """The process-wide Tracer if tracing is enabled."""
+    return _tracer
+
+
+@contextmanager
+def trace_span(name: str, cat: str, body: Any = None, **args: Any) -> Iterator[TraceSpan | None]:
+    """Record a span if tracing is enabled, else do nothing."""
+    tracer = _tracer
+    if tracer is None:
+        yield None
+        return
+    with tracer.span(name, cat, body, **args) as span:
+        yield span
+
+
+def trace_worker_method(cls: type, attr: str, fn: Callable) -> Callable:
+    """Wrap `invoke`/`dispatch` of a worker class, or one of its socket handlers, with a span."""
+    name = f'{cls.__name__}.{attr}'
+    is_graph = attr == 'invoke' and issubclass(cls, GraphAgentWorker)
+    is_dispatch = attr == 'dispatch'
+    is_socket = attr not in ('invoke', 'dispatch')
+    cat = 'graph' if is_graph else 'dispatch' if is_dispatch else 'socket' if is_socket else 'worker'
+
+    @functools.wraps(fn)
+    def wrapper(self, data, *args, **kwargs):
+        tracer = _tracer
+        if tracer is None:
+            return fn(self, data, *args, **kwargs)
+
+        body = data if is_socket else getattr(data, 'body', None)
+        with tracer.span(name, cat, body) as span:
+            result = fn(self, data, *args, **kwargs)
+            parent_path = span.path.rsplit('/', 1)[0] if '/' in span.path else ''
+            if is_graph:
+                tracer.register_body(body, span.path)
+            if is_dispatch and isinstance(result, dict):
+                span.set(fanout=len(result))
+                for index, resp in result.items():
+                    tracer.register_body(getattr(resp, 'body', None), parent_path, index)
+            elif not is_socket:
+                tracer.register_body(getattr(result, 'body', None), parent_path)
+            return result
+
+    wrapper.__azathoth_traced__ = True
+    return wrapper
+
+
+worker_base_classes = (AgentWorker, GraphAgentWorker, BridgeWorker, DispatchBridgeWorker, PluggerWorker, CollectPluggerWorker, AggregatorWorker)
+
+
+def iter_azathoth_worker_classes() -> Iterator[type]:
+    for module_name, module in list(sys.modules.items()):
+        if module is None or not (module_name == 'azathoth' or module_name.startswith('azathoth.')):
+            continue
+        for obj in list(vars(module).values()):
+            if inspect.isclass(obj) and obj.__module__ == module_name and issubclass(obj, worker_base_classes):
+                yield obj
+
+
+def enable_tracing() -> Tracer:
+    """Wrap every azathoth worker's `invoke`/`dispatch`, every graph's `invoke` and every aggregator socket handler with spans, and start recording.
+
+    Only the classes of the azathoth modules imported so far are wrapped.
+    """
+    global _tracer
+    with _tracing_lock:
+        if _tracer is not None:
+            return _tracer
+        for cls in set(iter_azathoth_worker_classes()):
+            attrs = [attr for attr in ('invoke', 'dispatch') if attr in vars(cls) or (attr == 'invoke' and issubclass(cls, GraphAgentWorker))]
+            if issubclass(cls, AggregatorWorker) and 'define_socket_list' in vars(cls):
+                handlers = {getattr(socket, 'socket_handler', None) for socket in cls.define_socket_list()}
+                attrs += [attr for attr, value in vars(cls).items() if inspect.isfunction(value) and value in handlers]
+            for attr in attrs:
+                fn = getattr(cls, attr, None)
+                if fn is None or getattr(fn, '__azathoth_traced__', False):
+                    continue
+                _patched_methods.append((cls, attr, vars(cls).get(attr)))
+                setattr(cls, attr, trace_worker_method(cls, attr, fn))
+        _tracer = Tracer()
+        autom_logger.info(f"[Tracer] Tracing enabled, {len(_patched_methods)} methods wrapped.")
+        return _tracer
+
+
+def disable_tracing():
+    """Stop recording and restore the wrapped methods."""
+    global _tracer
+    with _tracing_lock:
+        for cls, attr, original in reversed(_patched_methods):
+            if original is None:
+                delattr(cls, attr)
+            else:
+                setattr(cls, attr, original)
+        _patched_methods.clear()
+        _tracer = None
+
+
+__all__ = [
+    'TraceSpan',
+    'Tracer',
+    'get_tracer',
+    'trace_span',
+    'enable_tracing',
+    'disable_tracing',
+]
@@ -1,4 +1,7 @@
 from .schema import *
 from .file_schema_converter import *
 from .segment_schema_converter import *
+from .static_schema_converter import *
+from .schema_introspector import *
 from .project_schema_converter import *
+from .estimator import *
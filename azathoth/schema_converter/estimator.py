@@ -0,0 +1,51 @@
+from azathoth.common import LLMRequestEstimate, estimate_tokens, get_llm_result_cache, get_run_journal
+from .schema import AutomProjectSchemaConvertParams
+from .file_schema_converter import plan_segment_schema_convert_params
+from .segment_schema_converter import SegmentSchemaConverter, segment_schema_converter_model, schema_run_journal_name
+from .static_schema_converter import convert_schema_segment_statically
+from .project_schema_converter import plan_schema_convert, make_file_schema_convert_params
+
+
+def estimate_schema_convert_requests(req_body: AutomProjectSchemaConvertParams) -> list[LLMRequestEstimate]:
+    """The LLM requests BackendSchemaConverter would send, one per segment the static converter leaves over.
+
+    Only the planner and the segmenter run, the completion is assumed as long as the code sent.
+    """
+    schema_convert_plan = plan_schema_convert(req_body)
+    journal = get_run_journal(schema_convert_plan.dst_root_path, schema_run_journal_name)
+    llm_cache = get_llm_result_cache() if schema_convert_plan.use_llm_cache else None
+
+    request_estimates: list[LLMRequestEstimate] = []
+    seen_keys: set[str] = set()
+    for src_filepath, dst_filepath in schema_convert_plan.src_dst_filepath_pairs:
+        file_params = make_file_schema_convert_params(schema_convert_plan, src_filepath, dst_filepath)
+        src_relpath = src_filepath.relative_to(schema_convert_plan.src_root_path).as_posix()
+        for segment_params in plan_segment_schema_convert_params(file_params):
+            code_segment = segment_params.segment
+            if segment_params.use_static_converter:
+                code_segment = convert_schema_segment_statically(segment_params.segment).unsupported_segment
+            if not code_segment:
+                continue
+
+            cache_key = SegmentSchemaConverter.get_request_key(segment_params, code_segment)
+            predicted_hit = None
+            if segment_params.resume and journal.get(SegmentSchemaConverter.get_journal_key(segment_params)) is not None:
+                predicted_hit = 'journal'
+            elif cache_key in seen_keys:
+                predicted_hit = 'duplicate'
+            elif llm_cache is not None and llm_cache.contains(cache_key):
+                predicted_hit = 'llm_cache'
+            seen_keys.add(cache_key)
+
+            request_estimates.append(LLMRequestEstimate.from_messages(
+                'schema', src_relpath, segment_schema_converter_model,
+                SegmentSchemaConverter.get_messages(segment_params, code_segment),
+                estimate_tokens(code_segment),
+                predicted_hit,
+            ))
+    return request_estimates
+
+
+__all__ = [
+    'estimate_schema_convert_requests',
+]
@@ -1,8 +1,11 @@
 from .schema import FileSchemaConvertParams
-from .file_schema_converter import FileSchemaConverter
+from .file_schema_converter import FileSchemaConverter, plan_segment_schema_convert_params
+from .schema_import_converter import convert_schema_imports
 
 
 __all__ = [
     'FileSchemaConvertParams',
     'FileSchemaConverter',
+    'plan_segment_schema_convert_params',
+    'convert_schema_imports',
 ]
@@ -1,3 +1,5 @@
+import re
+
 from autom.logger import autom_logger
 from autom.official import HolderAgentWorker, IdentityBridgeWorker
 from autom.engine import (
@@ -7,10 +9,13 @@ from autom.engine import (
 )
 
 from azathoth.common import (
-    PyFilePath, SplittedPyFileContent, TextSegments,
-    PyImportsRemainsSplitter, TextRecursiveSegmentParamsAggregator, TextRecursiveSegmenter, FileContentAggregator,
+    PyFilePath, SplittedPyFileContent, TextSegments, TextRecursiveSegmentParams, get_llm_call_executor,
+    split_py_imports_remains, segment_text, read_source_file, PyImportsRemainsSplitter, TextRecursiveSegmentParamsAggregator,
+    TextRecursiveSegmenter, FileContentAggregator, FileContentStreamer,
+)
+from ..segment_schema_converter import (
+    SegmentSchemaConverter, SegmentSchemaConvertParams, ConvertedSchemaSegment, prefetch_segment_schema_conversions,
 )
-from ..segment_schema_converter import SegmentSchemaConverter, SegmentSchemaConvertParams, ConvertedSchemaSegment
 from .schema import ConvertedImportsContent, FileSchemaConvertParams
 from .schema_import_converter import SchemaImportConvertParamsAggregator, SchemaImportConverter
 
@@ -49,6 +54,8 @@ class FileSchemaConverter(GraphAgentWorker):
         segment_converter = Node.from_worker(SegmentSchemaConverter())
         segment_converter_exit_collect_plugger = Link.from_worker(SegmentConverterFileContentCollectPlugger())
         exit_aggregator = Node.from_worker(FileContentAggregator())
+        exit_aggregator_streamer_bridge = Link.from_worker(IdentityBridgeWorker())
+        streamer = Node.from_worker(FileContentStreamer())
 
         graph.add_node(entry_node)
         graph.add_node(py_splitter)
@@ -59,6 +66,7 @@ class FileSchemaConverter(GraphAgentWorker):
         graph.add_node(descartes_aggregator)
         graph.add_node(segment_converter)
         graph.add_node(exit_aggregator)
+        graph.add_node(streamer)
 
         graph.plug(entry_node, descartes_aggregator, entry_descarte_aggregator_plugger)
         graph.plug(entry_node, text_segmenter_aggregator, entry_text_segmenter_aggregator_plugger)
@@ -78,8 +86,11 @@ class FileSchemaConverter(GraphAgentWorker):
         graph.bridge(descartes_aggregator, segment_converter, descartes_aggregator_segment_converter_dispatch_bridge)
         graph.plug(segment_converter, exit_aggregator, segment_converter_exit_collect_plugger)
 
+        # (3) the file is dumped right away in streaming mode
+        graph.bridge(exit_aggregator, streamer, exit_aggregator_streamer_bridge)
+
         graph.set_entry_node(entry_node)
-        graph.set_exit_node(exit_aggregator)
+        graph.set_exit_node(streamer)
 
         return graph
 
@@ -225,7 +236,11 @@ class FileSchemaConvertParamsTextSegmenterPlugger(PluggerWorker):
                     SocketCall(
                         socket_name='set_max_lines_per_segment',
                         data=req_body.max_lines_per_segment,
-                    )
+                    ),
+                    SocketCall(
+                        socket_name='set_max_tokens_per_segment',
+                        data=req_body.max_tokens_per_segment,
+                    ),
                 ]
             )
         )
@@ -316,18 +331,14 @@ class DescarteSegmentConverterDispatchBridge(DispatchBridgeWorker):
 
         for i, segment in enumerate(req_body.text_segments.segments):
             batch_responses[i] = Response[SegmentSchemaConvertParams].from_worker(self).success(
-                body=SegmentSchemaConvertParams(
-                    src_repo_enum=req_body.file_schema_convert_params.src_repo_enum,
-                    src_filepath=req_body.file_schema_convert_params.src_filepath,
-                    src_root_path=req_body.file_schema_convert_params.src_root_path,
-                    dst_repo_enum=req_body.file_schema_convert_params.dst_repo_enum,
-                    dst_filepath=req_body.file_schema_convert_params.dst_filepath,
-                    dst_root_path=req_body.file_schema_convert_params.dst_root_path,
-                    segment=segment,
-                )
+                body=make_segment_schema_convert_params(req_body.file_schema_convert_params, segment)
             )
             autom_logger.info(f"[DescarteSegmentConverterDispatchBridge] dipatch response {i}: {batch_responses[i]}")
 
+        if req_body.file_schema_convert_params.max_llm_concurrency > 1:
+            get_llm_call_executor().configure(req_body.file_schema_convert_params.max_llm_concurrency)
+            prefetch_segment_schema_conversions([response.body for response in batch_responses.values()])
+
         return batch_responses
 
 
@@ -340,13 +351,26 @@ class SegmentConverterFileContentCollectPlugger(CollectPluggerWorker):
         req_body: BatchRequestSchema[ConvertedSchemaSegment] = req.body
         calls = []
 
-        for i, req_item in req_body.batch_requests.items():
+        index_converted_schema_dict: dict[int, str] = {}
+        for i, req_item in sorted(req_body.batch_requests.items()):
             req_item_body: ConvertedSchemaSegment = req_item.body
+            if req_item_body.failure is not None:
+                calls.append(
+                    SocketCall(
+                        socket_name='add_failure',
+                        data=req_item_body.failure,
+                    )
+                )
+                continue
+            index_converted_schema_dict[i] = req_item_body.converted_schema
+
+        merged_converted_schemas = merge_split_type_declarations(list(index_converted_schema_dict.values()))
+        for i, converted_schema in zip(index_converted_schema_dict, merged_converted_schemas):
             calls.append(
                 SocketCall(
                     socket_name='add_indexed_segment',
                     data={
-                        i + 1: req_item_body.converted_schema
+                        i + 1: converted_schema
                     }
                 )
             )
@@ -356,3 +380,104 @@ class SegmentConverterFileContentCollectPlugger(CollectPluggerWorker):
                 calls=calls
             )
         )
+
+
+ts_declaration_pattern = re.compile(r'^export\s+(?:type|interface)\s+(\w+)', re.MULTILINE)
+ts_comment_line_pattern = re.compile(r'^\s*(//|/\*|\*)')
+
+
+def merge_split_type_declarations(converted_schemas: list[str]) -> list[str]:
+    """Merge the TypeScript declarations repeated across the converted segments of a file into the first one.
+
+    An oversize class is split by the segmenter into chunks which all repeat the class header, each converted chunk declares the same type. The members of the later declarations(and their leading comments) are moved into the object body of the first. Declarations which do not end with an object body(e.g. `= A | B`) are left as they are.
+    """
+    first_declarations: dict[str, tuple[int, int]] = {}
+    edits: list[list[tuple[int, int, str]]] = [[] for _ in converted_schemas]
+    for i, converted_schema in enumerate(converted_schemas):
+        for match in ts_declaration_pattern.finditer(converted_schema):
+            object_body = find_declaration_object_body(converted_schema, match.end())
+            if object_body is None:
+                continue
+            name = match.group(1)
+            if name not in first_declarations:
+                first_declarations[name] = (i, object_body[1])
+                continue
+
+            members = converted_schema[object_body[0] + 1:object_body[1]].strip('\n')
+            first_i, first_close = first_declarations[name]
+            prefix = '' if converted_schemas[first_i][:first_close].endswith('\n') else '\n'
+            edits[first_i].append((first_close, first_close, prefix + members + '\n' if members.strip() else ''))
+            edits[i].append((get_leading_comments_start(converted_schema, match.start()), object_body[2], ''))
+            autom_logger.info(f"[SegmentConverterFileContentCollectPlugger] Merged a split declaration of `{name}`.")
+
+    merged_converted_schemas = []
+    for converted_schema, segment_edits in zip(converted_schemas, edits):
+        # applied from the end, members inserted at the same place keep the order of their declarations
+        for _, (start, end, text) in sorted(enumerate(segment_edits), key=lambda item: (item[1][0], item[0]), reverse=True):
+            converted_schema = converted_schema[:start] + text + converted_schema[end:]
+        merged_converted_schemas.append(converted_schema.strip('\n'))
+    return merged_converted_schemas
+
+
+def find_declaration_object_body(text: str, pos: int) -> tuple[int, int, int] | None:
+    """The `{` and `}` of the object body which ends the declaration from `pos`, and the end of the declaration. None if it does not end with one."""
+    open_brace = text.find('{', pos)
+    if open_brace == -1 or ';' in text[pos:open_brace]:
+        return None
+    depth = 0
+    quote = None
+    for i in range(open_brace, len(text)):
+        char = text[i]
+        if quote is not None:
+            if char == quote and text[i - 1] != '\\':
+                quote = None
+        elif char in '\'"`':
+            quote = char
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                line_end = text.find('\n', i)
+                line_end = len(text) if line_end == -1 else line_end
+                if text[i + 1:line_end].strip() not in ('', ';'):
+                    return None
+                return open_brace, i, min(line_end + 1, len(text))
+    return None
+
+
+def get_leading_comments_start(text: str, pos: int) -> int:
+    """Start of the comment lines right above the line starting at `pos`."""
+    while pos > 0:
+        line_start = text.rfind('\n', 0, pos - 1) + 1
+        if not ts_comment_line_pattern.match(text[line_start:pos - 1]):
+            break
+        pos = line_start
+    return pos
+
+
+def make_segment_schema_convert_params(file_schema_convert_params: FileSchemaConvertParams, segment: str) -> SegmentSchemaConvertParams:
+    return SegmentSchemaConvertParams(
+        src_repo_enum=file_schema_convert_params.src_repo_enum,
+        src_filepath=file_schema_convert_params.src_filepath,
+        src_root_path=file_schema_convert_params.src_root_path,
+        dst_repo_enum=file_schema_convert_params.dst_repo_enum,
+        dst_filepath=file_schema_convert_params.dst_filepath,
+        dst_root_path=file_schema_convert_params.dst_root_path,
+        segment=segment,
+        use_llm_cache=file_schema_convert_params.use_llm_cache,
+        use_static_converter=file_schema_convert_params.use_static_converter,
+        resume=file_schema_convert_params.resume,
+    )
+
+
+def plan_segment_schema_convert_params(file_schema_convert_params: FileSchemaConvertParams) -> list[SegmentSchemaConvertParams]:
+    """Compute, without running the graph, the same SegmentSchemaConvertParams that FileSchemaConverter dispatches for a file."""
+    _, remains_content = split_py_imports_remains(read_source_file(file_schema_convert_params.src_filepath).text)
+
+    text_segments = segment_text(remains_content, TextRecursiveSegmentParams(
+        original_text=remains_content,
+        max_lines_per_segment=file_schema_convert_params.max_lines_per_segment,
+        max_tokens_per_segment=file_schema_convert_params.max_tokens_per_segment,
+    ))
+    return [make_segment_schema_convert_params(file_schema_convert_params, segment) for segment in text_segments.segments]
@@ -1,13 +1,16 @@
+from typing import Optional
 from pathlib import Path
 
 from pydantic import PositiveInt
 from autom.engine import AutomSchema, AutomField
 
-from ..schema import SrcDstFilePairInfo
+from ..schema import SrcDstFilePairInfo, SchemaConvertOptions
 
 
-class FileSchemaConvertParams(SrcDstFilePairInfo):
+class FileSchemaConvertParams(SrcDstFilePairInfo, SchemaConvertOptions):
     max_lines_per_segment: PositiveInt = AutomField(512, description="Max lines per segment, higher value can reduce the overhead prompt cost, lower value can speed up the conversion process")
+    max_tokens_per_segment: Optional[PositiveInt] = AutomField(None, description="Max estimated LLM tokens per segment, tighter than `max_lines_per_segment` for files of long lines. No token limit if None")
+    max_llm_concurrency: PositiveInt = AutomField(1, description="Max number of LLM calls in flight at once, shared by all files and segments. With more than 1, segment conversions are prefetched concurrently")
 
 
 class SchemaImportConvertParams(AutomSchema):
@@ -84,40 +84,7 @@ class SchemaImportConverter(AgentWorker):
     def invoke(self, req: Request) -> Response:
         req_body: SchemaImportConvertParams = req.body
 
-        import_froms: dict[str, list[str]] = extract_imports_info(req_body.imports_content).import_froms
-        filtered_import_froms: dict[str, list[str]] = {}
-
-        for module_name, qualifiers in import_froms.items():
-            # 1. Handle `app.common` imports
-            if module_name == 'app.common':
-                remained_qualifiers = [q for q in qualifiers if q[0].isupper() and q not in excluded_qualifiers]
-                if len(remained_qualifiers) > 0:
-                    typescript_module_name = '@/types/common'
-                    if typescript_module_name not in filtered_import_froms:
-                        filtered_import_froms[typescript_module_name] = []
-                    filtered_import_froms[typescript_module_name].extend(remained_qualifiers)
-            # 2. Handle `autom` imports
-            elif module_name.startswith('autom'):
-                remained_qualifiers = [q for q in qualifiers if q[0].isupper() and q not in excluded_qualifiers]
-                if len(remained_qualifiers) > 0:
-                    typescript_module_name = '@/types/autom_schemas'
-                    if ts_autom_schemas_module not in filtered_import_froms:
-                        filtered_import_froms[typescript_module_name] = []
-                    filtered_import_froms[typescript_module_name].extend(remained_qualifiers)
-            # 3. Handle `app.schemas.entities` imports:
-            elif module_name == 'app.schemas.entities':
-                remained_qualifiers = [qualifier for qualifier in qualifiers if qualifier[0].isupper() and qualifier not in excluded_qualifiers]
-                if len(remained_qualifiers) > 0:
-                    typescript_module_name = '@/types/entities'
-                    if typescript_module_name not in filtered_import_froms:
-                        filtered_import_froms[typescript_module_name] = []
-                    filtered_import_froms[typescript_module_name].extend(remained_qualifiers)
-        converted_import_lines = [
-            f'import {{ {", ".join(qualifiers)} }} from "{module}";'
-            for module, qualifiers in filtered_import_froms.items()
-        ]
-        converted_import_lines.sort(key=lambda x: len(x))
-        converted_imports_content = '\n'.join(converted_import_lines)
+        converted_imports_content = convert_schema_imports(req_body.imports_content)
         return Response[ConvertedImportsContent].from_worker(self).success(
             body=ConvertedImportsContent(
                 converted_imports_content=converted_imports_content
@@ -125,7 +92,47 @@ class SchemaImportConverter(AgentWorker):
         )
 
 
+def convert_schema_imports(imports_content: str) -> str:
+    """Convert the imports of a backend schema file to the imports of its frontend types file."""
+    import_froms: dict[str, list[str]] = extract_imports_info(imports_content).import_froms
+    filtered_import_froms: dict[str, list[str]] = {}
+
+    for module_name, qualifiers in import_froms.items():
+        # 1. Handle `app.common` imports
+        if module_name == 'app.common':
+            remained_qualifiers = [q for q in qualifiers if q[0].isupper() and q not in excluded_qualifiers]
+            if len(remained_qualifiers) > 0:
+                typescript_module_name = '@/types/common'
+                if typescript_module_name not in filtered_import_froms:
+                    filtered_import_froms[typescript_module_name] = []
+                filtered_import_froms[typescript_module_name].extend(remained_qualifiers)
+        # 2. Handle `autom` imports
+        elif module_name.startswith('autom'):
+            remained_qualifiers = [q for q in qualifiers if q[0].isupper() and q not in excluded_qualifiers]
+            if len(remained_qualifiers) > 0:
+                typescript_module_name = '@/types/autom_schemas'
+                if ts_autom_schemas_module not in filtered_import_froms:
+                    filtered_import_froms[typescript_module_name] = []
+                filtered_import_froms[typescript_module_name].extend(remained_qualifiers)
+        # 3. Handle `app.schemas.entities` imports:
+        elif module_name == 'app.schemas.entities':
+            remained_qualifiers = [qualifier for qualifier in qualifiers if qualifier[0].isupper() and qualifier not in excluded_qualifiers]
+            if len(remained_qualifiers) > 0:
+                typescript_module_name = '@/types/entities'
+                if typescript_module_name not in filtered_import_froms:
+                    filtered_import_froms[typescript_module_name] = []
+                filtered_import_froms[typescript_module_name].extend(remained_qualifiers)
+    converted_import_lines = [
+        f'import {{ {", ".join(qualifiers)} }} from "{module}";'
+        for module, qualifiers in filtered_import_froms.items()
+    ]
+    converted_import_lines.sort(key=lambda x: len(x))
+    converted_imports_content = '\n'.join(converted_import_lines)
+    return converted_imports_content
+
+
 __all__ = [
     'SchemaImportConvertParamsAggregator',
     'SchemaImportConverter',
+    'convert_schema_imports',
 ]
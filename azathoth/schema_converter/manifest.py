@@ -0,0 +1,78 @@
+import os
+from pathlib import Path
+
+from pydantic import BaseModel, Field
+
+from azathoth.common import SourceStamp, get_state_dir, sha256_file, load_state_json, dump_state_json
+
+
+schema_manifest_filename = 'schema-manifest.json'
+
+
+class SchemaManifestEntry(BaseModel):
+    """What azathoth knew about a schema source file and its converted output after the last successful dump."""
+    src_relpath: str = Field(..., description="Source path relative to the backend root, in posix form")
+    dst_relpath: str = Field(..., description="Output path relative to the frontend root, in posix form")
+    size: int = Field(..., description="Source file size in bytes")
+    mtime_ns: int = Field(..., description="Source file mtime in nanoseconds")
+    content_hash: str = Field(..., description="sha256 of the source file content")
+    output_hash: str = Field(..., description="sha256 of the output file content as it was dumped")
+
+
+class SchemaManifest(BaseModel):
+    entries: dict[str, SchemaManifestEntry] = Field(default_factory=dict, description="Manifest entries keyed by `src_relpath`")
+
+
+def get_schema_manifest_path(autom_frontend_root_path: os.PathLike) -> Path:
+    return get_state_dir(autom_frontend_root_path) / schema_manifest_filename
+
+
+def load_schema_manifest(autom_frontend_root_path: os.PathLike) -> SchemaManifest:
+    data = load_state_json(get_schema_manifest_path(autom_frontend_root_path), default={})
+    try:
+        return SchemaManifest.model_validate(data)
+    except ValueError:
+        return SchemaManifest()
+
+
+def save_schema_manifest(autom_frontend_root_path: os.PathLike, manifest: SchemaManifest):
+    dump_state_json(get_schema_manifest_path(autom_frontend_root_path), manifest.model_dump(mode='json'))
+
+
+def get_src_content_hash(src_filepath: Path, entry: SchemaManifestEntry | None) -> str:
+    """Hash the source file, reusing the manifest hash when size and mtime are unchanged."""
+    stat = src_filepath.stat()
+    if entry is not None and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+        return entry.content_hash
+    return sha256_file(src_filepath)
+
+
+def stamp_schema_source(src_filepath: Path, entry: SchemaManifestEntry | None) -> SourceStamp:
+    """Stamp the source file as it is now, the stat is taken before the hash so an edit in between is seen by the next run."""
+    stat = src_filepath.stat()
+    if entry is not None and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+        content_hash = entry.content_hash
+    else:
+        content_hash = sha256_file(src_filepath)
+    return SourceStamp(src_filepath=src_filepath, content_hash=content_hash, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+
+def needs_conversion(src_filepath: Path, dst_filepath: Path, entry: SchemaManifestEntry | None) -> bool:
+    """Whether the source changed, the output is missing, or the output was edited by hand since the last dump."""
+    if entry is None or not dst_filepath.exists():
+        return True
+    if get_src_content_hash(src_filepath, entry) != entry.content_hash:
+        return True
+    return sha256_file(dst_filepath) != entry.output_hash
+
+
+__all__ = [
+    'SchemaManifestEntry',
+    'SchemaManifest',
+    'get_schema_manifest_path',
+    'load_schema_manifest',
+    'save_schema_manifest',
+    'get_src_content_hash',
+    'stamp_schema_source',
+    'needs_conversion',
+]
@@ -5,14 +5,20 @@ from autom.engine import (
     DispatchBridgeWorker, AutomSchema, AutomGraph, Node, Link, GraphAgentWorker,
     Request, Response, AgentWorker, PluggerWorker, SocketRequestBody, SocketCall,
 )
+from autom.logger import autom_logger
 from autom.official import HolderAgentWorker, IdentityBridgeWorker, NullPlugger
 
 from azathoth.common import (
     RepoEnum, TSExportHelperInputAggregator, FilesDumper,
-    TSExportHerlper, FilesContentAggregator, FilesContentFilesContentPlugger, FileContentFilesContentCollectPlugger,
+    TSExportHerlper, TSExportSignaturesSaver, FilesContentAggregator, FilesContentFilesContentPlugger, FileContentFilesContentCollectPlugger,
+    FilesContent, SchemaConvertEngine, get_llm_call_executor, get_files_stream_writer, open_run_journal, split_py_imports_remains, read_source_file, sha256_file,
 )
 from .schema import AutomProjectSchemaConvertParams, SchemaConvertPlan
-from .file_schema_converter import FileSchemaConverter, FileSchemaConvertParams
+from .manifest import load_schema_manifest, needs_conversion, stamp_schema_source
+from .file_schema_converter import FileSchemaConverter, FileSchemaConvertParams, plan_segment_schema_convert_params, convert_schema_imports
+from .segment_schema_converter import prefetch_segment_schema_conversions, schema_run_journal_name
+from .schema_introspector import introspect_backend_schemas, render_introspected_module
+from .schema_manifest_updater import SchemaManifestUpdateParamsAggregator, SchemaManifestUpdater
 
 
 class InnerSchemaConverter(GraphAgentWorker):
@@ -26,6 +32,7 @@ class InnerSchemaConverter(GraphAgentWorker):
         planner_file_converter_dispatch_bridge = Link.from_worker(PlannerFileConverterDispatchBridge())
         file_converter = Node.from_worker(FileSchemaConverter())
         converter_exit_collect_plugger = Link.from_worker(FileContentFilesContentCollectPlugger())
+        planner_exit_plugger = Link.from_worker(SchemaConvertPlanFilesContentPlugger())
         exit_aggregator = Node.from_worker(FilesContentAggregator())
 
         graph.add_node(entry_node)
@@ -36,6 +43,7 @@ class InnerSchemaConverter(GraphAgentWorker):
         graph.bridge(entry_node, planner, entry_planner_bridge)
         graph.bridge(planner, file_converter, planner_file_converter_dispatch_bridge)
         graph.plug(file_converter, exit_aggregator, converter_exit_collect_plugger)
+        graph.plug(planner, exit_aggregator, planner_exit_plugger)
 
         graph.set_entry_node(entry_node)
         graph.set_exit_node(exit_aggregator)
@@ -55,7 +63,13 @@ class BackendSchemaConverter(GraphAgentWorker):
         inner_schema_converter_schema_files_dumper_bridge = Link.from_worker(IdentityBridgeWorker())
         schema_files_dumper = Node.from_worker(FilesDumper())
         schema_files_dumper_ts_export_aggregator_plugger = Link.from_worker(NullPlugger())
-        schema_files_dumper_exit_plugger = Link.from_worker(FilesContentFilesContentPlugger())
+        schema_files_dumper_manifest_aggregator_plugger = Link.from_worker(FilesContentManifestUpdaterPlugger())
+
+        entry_manifest_aggregator_plugger = Link.from_worker(SchemaConverterParamsManifestUpdaterPlugger())
+        manifest_aggregator = Node.from_worker(SchemaManifestUpdateParamsAggregator())
+        manifest_aggregator_manifest_updater_bridge = Link.from_worker(IdentityBridgeWorker())
+        manifest_updater = Node.from_worker(SchemaManifestUpdater())
+        manifest_updater_exit_plugger = Link.from_worker(FilesContentFilesContentPlugger())
 
         entry_ts_export_aggregator_plugger = Link.from_worker(SchemaConverterParamsTSExportHelperPlugger())
         ts_export_aggregator = Node.from_worker(TSExportHelperInputAggregator())
@@ -63,25 +77,34 @@ class BackendSchemaConverter(GraphAgentWorker):
         ts_export_helper = Node.from_worker(TSExportHerlper())
         ts_export_helper_index_files_dumper_bridge = Link.from_worker(IdentityBridgeWorker())
         index_files_dumper = Node.from_worker(FilesDumper())
-        index_files_dumper_exit_plugger = Link.from_worker(FilesContentFilesContentPlugger())
+        index_files_dumper_signatures_saver_bridge = Link.from_worker(IdentityBridgeWorker())
+        signatures_saver = Node.from_worker(TSExportSignaturesSaver())
+        signatures_saver_exit_plugger = Link.from_worker(FilesContentFilesContentPlugger())
         exit_aggregator = Node.from_worker(FilesContentAggregator())
 
         graph.add_node(entry_node)
         graph.add_node(inner_schema_converter)
         graph.add_node(schema_files_dumper)
+        graph.add_node(manifest_aggregator)
+        graph.add_node(manifest_updater)
         graph.add_node(ts_export_aggregator)
         graph.add_node(ts_export_helper)
         graph.add_node(index_files_dumper)
+        graph.add_node(signatures_saver)
         graph.add_node(exit_aggregator)
 
         graph.bridge(entry_node, inner_schema_converter, entry_inner_schema_converter_bridge)
         graph.bridge(inner_schema_converter, schema_files_dumper, inner_schema_converter_schema_files_dumper_bridge)
-        graph.plug(schema_files_dumper, exit_aggregator, schema_files_dumper_exit_plugger)
+        graph.plug(schema_files_dumper, manifest_aggregator, schema_files_dumper_manifest_aggregator_plugger)
+        graph.plug(entry_node, manifest_aggregator, entry_manifest_aggregator_plugger)
+        graph.bridge(manifest_aggregator, manifest_updater, manifest_aggregator_manifest_updater_bridge)
+        graph.plug(manifest_updater, exit_aggregator, manifest_updater_exit_plugger)
         graph.plug(schema_files_dumper, ts_export_aggregator, schema_files_dumper_ts_export_aggregator_plugger)
         graph.plug(entry_node, ts_export_aggregator, entry_ts_export_aggregator_plugger)
         graph.bridge(ts_export_aggregator, ts_export_helper, ts_export_aggregator_ts_export_helper_bridge)
         graph.bridge(ts_export_helper, index_files_dumper, ts_export_helper_index_files_dumper_bridge)
-        graph.plug(index_files_dumper, exit_aggregator, index_files_dumper_exit_plugger)
+        graph.bridge(index_files_dumper, signatures_saver, index_files_dumper_signatures_saver_bridge)
+        graph.plug(signatures_saver, exit_aggregator, signatures_saver_exit_plugger)
 
         graph.set_entry_node(entry_node)
         graph.set_exit_node(exit_aggregator)
@@ -104,23 +127,49 @@ class PlannerFileConverterDispatchBridge(DispatchBridgeWorker):
 
         # Iterate through the src_dst_filepath_pairs and create FileSchemaConverterInput for each
         for idx, (src_filepath, dst_filepath) in enumerate(req_body.src_dst_filepath_pairs):
-            # Create a FileSchemaConverterInput for each pair
-            converter_input = FileSchemaConvertParams(
-                src_repo_enum=req_body.src_repo_enum,
-                src_root_path=req_body.src_root_path,
-                src_filepath=src_filepath,
-                dst_repo_enum=req_body.dst_repo_enum,
-                dst_root_path=req_body.dst_root_path,
-                dst_filepath=dst_filepath,
-                max_lines_per_segment=req_body.max_lines_per_segment,
-            )
+            converter_input = make_file_schema_convert_params(req_body, src_filepath, dst_filepath)
 
             # Wrap in a Response and store it in the responses dict
             responses[idx] = Response[FileSchemaConvertParams].from_worker(self).success(body=converter_input)
 
+        if req_body.max_llm_concurrency > 1:
+            # Segment every file locally and start converting all segments of the project at once,
+            # so the wall time approaches the slowest file instead of the sum of all segments
+            get_llm_call_executor().configure(req_body.max_llm_concurrency)
+            for response in responses.values():
+                prefetch_segment_schema_conversions(plan_segment_schema_convert_params(response.body))
+
         return responses
 
 
+class SchemaConvertPlanFilesContentPlugger(PluggerWorker):
+    """Merge the introspected files, the stale files to remove and the source stamps of the plan into the converted files."""
+    @classmethod
+    def define_input_schema(cls) -> AutomSchema | None:
+        return SchemaConvertPlan
+
+    def invoke(self, req: Request) -> Response:
+        req_body: SchemaConvertPlan = req.body
+        return Response[SocketRequestBody].from_worker(self).success(
+            body=SocketRequestBody(
+                calls=[
+                    SocketCall(
+                        socket_name="update_file_map",
+                        data=req_body.introspected_file_map,
+                    ),
+                    SocketCall(
+                        socket_name="add_removed_filepaths",
+                        data=req_body.removed_filepaths,
+                    ),
+                    SocketCall(
+                        socket_name="update_source_stamps",
+                        data=req_body.source_stamps,
+                    ),
+                ]
+            )
+        )
+
+
 class SchemaConverterParamsTSExportHelperPlugger(PluggerWorker):
     @classmethod
     def define_input_schema(cls) -> AutomSchema | None:
@@ -146,6 +195,52 @@ class SchemaConverterParamsTSExportHelperPlugger(PluggerWorker):
         )
 
 
+class SchemaConverterParamsManifestUpdaterPlugger(PluggerWorker):
+    @classmethod
+    def define_input_schema(cls) -> AutomSchema | None:
+        return AutomProjectSchemaConvertParams
+
+    def invoke(self, req: Request) -> Response:
+        req_body: AutomProjectSchemaConvertParams = req.body
+        return Response[SocketRequestBody].from_worker(self).success(
+            body=SocketRequestBody(
+                calls=[
+                    SocketCall(
+                        socket_name="set_autom_backend_root_path",
+                        data=req_body.autom_backend_root_path,
+                    ),
+                    SocketCall(
+                        socket_name="set_autom_frontend_root_path",
+                        data=req_body.autom_frontend_root_path,
+                    ),
+                    SocketCall(
+                        socket_name="set_remove_stale_outputs",
+                        data=req_body.remove_stale_outputs,
+                    ),
+                ]
+            )
+        )
+
+
+class FilesContentManifestUpdaterPlugger(PluggerWorker):
+    @classmethod
+    def define_input_schema(cls) -> AutomSchema | None:
+        return FilesContent
+
+    def invoke(self, req: Request) -> Response:
+        req_body: FilesContent = req.body
+        return Response[SocketRequestBody].from_worker(self).success(
+            body=SocketRequestBody(
+                calls=[
+                    SocketCall(
+                        socket_name="set_files_content",
+                        data=req_body,
+                    ),
+                ]
+            )
+        )
+
+
 class BackendSchemaConvertPlanner(AgentWorker):
     @classmethod
     def define_input_schema(cls):
@@ -158,32 +253,138 @@ class BackendSchemaConvertPlanner(AgentWorker):
     def invoke(self, req: Request) -> Response:
         req_body: AutomProjectSchemaConvertParams = req.body
 
-        # backend /app/schemas directory --> frontend /types directory
-        backend_repo_root = req_body.autom_backend_root_path
-        frontend_repo_root = req_body.autom_frontend_root_path
-        backend_schemas_dir = backend_repo_root / 'app/schemas'
-        frontend_types_dir = frontend_repo_root / 'types'
-        excluded_files = ['__init__.py']
-
-        src_dst_filepath_pairs: list[tuple[Path, Path]] = []
-        # iterate through the backend schemas directory
-        for src_filepath in backend_schemas_dir.rglob('*.py'):  # Find all Python files recursively
-            # Skip excluded files
-            if src_filepath.name in excluded_files:
-                continue
-
-            # Construct the corresponding destination path in the frontend types dir
-            dst_filepath = frontend_types_dir / src_filepath.relative_to(backend_schemas_dir).with_suffix('.ts')  # Change .py to .ts
-
-            # Add the source and destination file paths as a tuple, use relative paths
-            src_dst_filepath_pairs.append((src_filepath, dst_filepath))
-
-        # Create the response
-        return Response[SchemaConvertPlan].from_worker(self).success(body=SchemaConvertPlan(
-            src_repo_enum=RepoEnum.BACKEND,
-            src_root_path=backend_repo_root,
-            dst_repo_enum=RepoEnum.FRONTEND,
-            dst_root_path=frontend_repo_root,
-            max_lines_per_segment=req_body.max_lines_per_segment,
-            src_dst_filepath_pairs=src_dst_filepath_pairs
-        ))
+        get_files_stream_writer().configure(req_body.stream_dump, req_body.autom_frontend_root_path / 'types')
+        open_run_journal(req_body.autom_frontend_root_path, schema_run_journal_name, req_body.resume)
+        schema_convert_plan = plan_schema_convert(req_body)
+        for dst_filepath, content in schema_convert_plan.introspected_file_map.items():
+            get_files_stream_writer().put(dst_filepath, content)
+
+        return Response[SchemaConvertPlan].from_worker(self).success(body=schema_convert_plan)
+
+
+def plan_schema_convert(req_body: AutomProjectSchemaConvertParams) -> SchemaConvertPlan:
+    """Plan the schema files to convert, what BackendSchemaConvertPlanner outputs without opening the run journal or streaming files."""
+    backend_repo_root = req_body.autom_backend_root_path
+    frontend_repo_root = req_body.autom_frontend_root_path
+    src_dst_filepath_pairs = list_schema_src_dst_filepath_pairs(backend_repo_root, frontend_repo_root)
+    manifest = load_schema_manifest(frontend_repo_root)
+    src_relpaths = {src_filepath.relative_to(backend_repo_root).as_posix() for src_filepath, _ in src_dst_filepath_pairs}
+
+    # the stale outputs of deleted sources are removed by the FilesDumper, before the TS export lists the directory
+    n_deleted = 0
+    removed_filepaths: list[Path] = []
+    for src_relpath, entry in manifest.entries.items():
+        dst_filepath = frontend_repo_root / entry.dst_relpath
+        if src_relpath in src_relpaths or not dst_filepath.exists():
+            continue
+        n_deleted += 1
+        if not req_body.remove_stale_outputs:
+            autom_logger.warning(f"[BackendSchemaConvertPlanner] Schema source {src_relpath} was deleted, {entry.dst_relpath} is stale.")
+        elif sha256_file(dst_filepath) == entry.output_hash:
+            removed_filepaths.append(dst_filepath)
+        else:
+            autom_logger.warning(f"[BackendSchemaConvertPlanner] Keep stale output {entry.dst_relpath}, since it was edited by hand.")
+
+    if req_body.incremental:
+        changed_src_dst_filepath_pairs: list[tuple[Path, Path]] = []
+        for src_filepath, dst_filepath in src_dst_filepath_pairs:
+            src_relpath = src_filepath.relative_to(backend_repo_root).as_posix()
+            if needs_conversion(src_filepath, dst_filepath, manifest.entries.get(src_relpath)):
+                changed_src_dst_filepath_pairs.append((src_filepath, dst_filepath))
+
+        autom_logger.info(f"[BackendSchemaConvertPlanner] Incremental plan: {len(changed_src_dst_filepath_pairs)}/{len(src_dst_filepath_pairs)} schema files to convert, {n_deleted} deleted.")
+        src_dst_filepath_pairs = changed_src_dst_filepath_pairs
+
+    source_stamps = {
+        dst_filepath: stamp_schema_source(src_filepath, manifest.entries.get(src_filepath.relative_to(backend_repo_root).as_posix()))
+        for src_filepath, dst_filepath in src_dst_filepath_pairs
+    }
+
+    introspected_file_map: dict[Path, str] = {}
+    if req_body.engine == SchemaConvertEngine.introspection and src_dst_filepath_pairs:
+        introspected_file_map = introspect_schema_files(backend_repo_root, src_dst_filepath_pairs, req_body.backend_python_executable)
+        src_dst_filepath_pairs = [(src_filepath, dst_filepath) for src_filepath, dst_filepath in src_dst_filepath_pairs if dst_filepath not in introspected_file_map]
+
+    return SchemaConvertPlan(
+        src_repo_enum=RepoEnum.BACKEND,
+        src_root_path=backend_repo_root,
+        dst_repo_enum=RepoEnum.FRONTEND,
+        dst_root_path=frontend_repo_root,
+        max_lines_per_segment=req_body.max_lines_per_segment,
+        max_tokens_per_segment=req_body.max_tokens_per_segment,
+        use_llm_cache=req_body.use_llm_cache,
+        use_static_converter=req_body.use_static_converter,
+        resume=req_body.resume,
+        max_llm_concurrency=req_body.max_llm_concurrency,
+        src_dst_filepath_pairs=src_dst_filepath_pairs,
+        removed_filepaths=removed_filepaths,
+        source_stamps=source_stamps,
+        introspected_file_map=introspected_file_map,
+    )
+
+
+def introspect_schema_files(backend_repo_root: Path, src_dst_filepath_pairs: list[tuple[Path, Path]], python_executable: Path | None = None) -> dict[Path, str]:
+    """Render the dst files of the pairs by introspecting the backend schemas in one pass, keyed by dst_filepath.
+
+    The files which fail to import are missing from the result, so they are converted by the LLM. If the introspection fails as a whole, the result is empty.
+    """
+    try:
+        introspection = introspect_backend_schemas(backend_repo_root, python_executable)
+    except (RuntimeError, OSError) as e:
+        autom_logger.warning(f"[BackendSchemaConvertPlanner] Schema introspection failed({e}), all schema files will be converted by LLM.")
+        return {}
+
+    introspected_file_map: dict[Path, str] = {}
+    for src_filepath, dst_filepath in src_dst_filepath_pairs:
+        src_relpath = src_filepath.relative_to(backend_repo_root).as_posix()
+        module = introspection.modules.get(src_relpath)
+        if module is None or module.error is not None:
+            autom_logger.warning(f"[BackendSchemaConvertPlanner] Failed to introspect {src_relpath}({module.error if module else 'not imported'}), it will be converted by LLM.")
+            continue
+        imports_content, _ = split_py_imports_remains(read_source_file(src_filepath).text)
+        parts = [convert_schema_imports(imports_content), render_introspected_module(module)]
+        introspected_file_map[dst_filepath] = '\n\n'.join(part for part in parts if part.strip())
+
+    dependencies = introspection.get_dependencies()
+    n_dependencies = sum(len(relpaths) for relpaths in dependencies.values())
+    autom_logger.info(f"[BackendSchemaConvertPlanner] Introspected {len(introspected_file_map)}/{len(src_dst_filepath_pairs)} schema files, {n_dependencies} dependencies between schema modules.")
+    return introspected_file_map
+
+
+def make_file_schema_convert_params(schema_convert_plan: SchemaConvertPlan, src_filepath: Path, dst_filepath: Path) -> FileSchemaConvertParams:
+    return FileSchemaConvertParams(
+        src_repo_enum=schema_convert_plan.src_repo_enum,
+        src_root_path=schema_convert_plan.src_root_path,
+        src_filepath=src_filepath,
+        dst_repo_enum=schema_convert_plan.dst_repo_enum,
+        dst_root_path=schema_convert_plan.dst_root_path,
+        dst_filepath=dst_filepath,
+        max_lines_per_segment=schema_convert_plan.max_lines_per_segment,
+        max_tokens_per_segment=schema_convert_plan.max_tokens_per_segment,
+        use_llm_cache=schema_convert_plan.use_llm_cache,
+        use_static_converter=schema_convert_plan.use_static_converter,
+        resume=schema_convert_plan.resume,
+        max_llm_concurrency=schema_convert_plan.max_llm_concurrency,
+    )
+
+
+def list_schema_src_dst_filepath_pairs(autom_backend_root_path: Path, autom_frontend_root_path: Path) -> list[tuple[Path, Path]]:
+    """List all (src_filepath, dst_filepath) pairs to convert, backend /app/schemas directory --> frontend /types directory."""
+    backend_schemas_dir = autom_backend_root_path / 'app/schemas'
+    frontend_types_dir = autom_frontend_root_path / 'types'
+    excluded_files = ['__init__.py']
+
+    src_dst_filepath_pairs: list[tuple[Path, Path]] = []
+    # iterate through the backend schemas directory
+    for src_filepath in sorted(backend_schemas_dir.rglob('*.py')):  # Find all Python files recursively
+        # Skip excluded files
+        if src_filepath.name in excluded_files:
+            continue
+
+        # Construct the corresponding destination path in the frontend types dir
+        dst_filepath = frontend_types_dir / src_filepath.relative_to(backend_schemas_dir).with_suffix('.ts')  # Change .py to .ts
+
+        # Add the source and destination file paths as a tuple
+        src_dst_filepath_pairs.append((src_filepath, dst_filepath))
+
+    return src_dst_filepath_pairs
@@ -1,9 +1,10 @@
+from typing import Optional
 from pathlib import Path
 
 from autom.engine import AutomSchema, AutomField
 from pydantic import model_validator, PositiveInt
 
-from azathoth.common import RepoEnum
+from azathoth.common import RepoEnum, SchemaConvertEngine, FilesContent, ConvertFailure, SourceStamp, LLMCacheParams, ResumeParams, StreamDumpParams
 
 
 class SrcDstFilePairInfo(AutomSchema):
@@ -21,7 +22,11 @@ class SrcDstFilePairInfo(AutomSchema):
         return self
 
 
-class SegmentSchemaConvertParams(SrcDstFilePairInfo):
+class SchemaConvertOptions(LLMCacheParams, ResumeParams):
+    use_static_converter: bool = AutomField(True, description="Convert the models, enums and Literal aliases which need no judgement deterministically, only the rest goes to the LLM")
+
+
+class SegmentSchemaConvertParams(SrcDstFilePairInfo, SchemaConvertOptions):
     """Input Params for SegmentSchemaConverter
 
     Contains:
@@ -40,31 +45,62 @@ class SegmentSchemaConvertParams(SrcDstFilePairInfo):
 class ConvertedSchemaSegment(AutomSchema):
     """Output of SegmentSchemaConverter"""
     converted_schema: str = AutomField(..., description="String contains the typescript type definitions, which are converted from backend python pydantic models")
+    failure: Optional[ConvertFailure] = AutomField(None, description="Set if the segment could not be converted, which fails its whole file")
 
 
-class SchemaConvertPlan(AutomSchema):
+class SchemaConvertPlan(SchemaConvertOptions):
     src_repo_enum: RepoEnum
     src_root_path: Path
     dst_repo_enum: RepoEnum
     dst_root_path: Path
     max_lines_per_segment: PositiveInt = AutomField(512, description="Max lines per segment, higher value can reduce the overhead prompt cost, lower value can speed up the conversion process")
+    max_tokens_per_segment: Optional[PositiveInt] = AutomField(None, description="Max estimated LLM tokens per segment, tighter than `max_lines_per_segment` for files of long lines. No token limit if None")
+    max_llm_concurrency: PositiveInt = AutomField(1, description="Max number of LLM calls in flight at once, shared by all files and segments. With more than 1, segment conversions are prefetched concurrently")
     src_dst_filepath_pairs: list[tuple[Path, Path]] = AutomField(
         default_factory=list, 
         description="List of (src_filepath, dst_filepath) pairs, all are full file paths"
     )
+    removed_filepaths: list[Path] = AutomField(
+        default_factory=list,
+        description="Stale dst files to remove before the TS export: their src file was deleted, `remove_stale_outputs` is on and they were not edited by hand"
+    )
+    source_stamps: dict[Path, SourceStamp] = AutomField(
+        default_factory=dict,
+        description="The src file of every planned dst file as it was when planning, keyed by dst_filepath. The schema manifest records them"
+    )
+    introspected_file_map: dict[Path, str] = AutomField(
+        default_factory=dict,
+        description="Contents of the dst files rendered by introspection, keyed by dst_filepath. Their pairs are not in `src_dst_filepath_pairs`"
+    )
 
 
-class AutomProjectSchemaConvertParams(AutomSchema):
+class AutomProjectSchemaConvertParams(SchemaConvertOptions, StreamDumpParams):
     autom_engine_root_path: Path
     autom_backend_root_path: Path
     autom_frontend_root_path: Path
     max_lines_per_segment: PositiveInt = AutomField(512, description="Max lines per segment, higher value can reduce the overhead prompt cost, lower value can speed up the conversion process")
+    max_tokens_per_segment: Optional[PositiveInt] = AutomField(None, description="Max estimated LLM tokens per segment, tighter than `max_lines_per_segment` for files of long lines. No token limit if None")
+    max_llm_concurrency: PositiveInt = AutomField(1, description="Max number of LLM calls in flight at once, shared by all files and segments. With more than 1, segment conversions are prefetched concurrently")
+    engine: SchemaConvertEngine = AutomField(SchemaConvertEngine.llm, description="How to convert the schema files. `introspection` imports the backend schemas in a subprocess and renders their JSON Schema, the files which fail to import still go to the LLM")
+    backend_python_executable: Optional[Path] = AutomField(None, description="Python interpreter of the backend project, used by the `introspection` engine. Defaults to the virtualenv in the backend root if any, else the current interpreter")
+    incremental: bool = AutomField(False, description="Only convert the schema files which changed since the last run, or whose output is missing or edited by hand")
+    remove_stale_outputs: bool = AutomField(False, description="Remove the output files whose schema source file was deleted, unless they were edited by hand")
+
+
+class SchemaManifestUpdateParams(AutomSchema):
+    """Input Params for SchemaManifestUpdater"""
+    autom_backend_root_path: Path
+    autom_frontend_root_path: Path
+    remove_stale_outputs: bool = False
+    files_content: FilesContent = AutomField(..., description="The converted schema files which have been dumped to disk")
 
 
 __all__ = [
     'SrcDstFilePairInfo',
+    'SchemaConvertOptions',
     'SegmentSchemaConvertParams',
     'ConvertedSchemaSegment',
     'SchemaConvertPlan',
     'AutomProjectSchemaConvertParams',
+    'SchemaManifestUpdateParams',
 ]
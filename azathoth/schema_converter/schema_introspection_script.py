@@ -0,0 +1,117 @@
+"""Standalone script run in a subprocess by `introspect_backend_schemas`, with the interpreter of the backend project.
+
+It imports every `app.schemas` module of the backend, and prints a JSON description of the pydantic models, enums and Literal aliases each module defines. It must not import azathoth, nor anything the backend does not have.
+
+Usage: python -I schema_introspection_script.py <backend_root>
+"""
+import ast
+import sys
+import enum
+import json
+import typing
+import inspect
+import importlib
+from pathlib import Path
+
+
+def describe_default(value) -> str:
+    if value is None:
+        return 'undefined'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, enum.Enum):
+        return f"{type(value).__name__}.{value.name}"
+    return str(value)
+
+
+def get_top_level_names(file_path: Path) -> list[str]:
+    """Names defined at the top level of a module file, in source order."""
+    names = []
+    for node in ast.parse(file_path.read_text(encoding='utf-8')).body:
+        if isinstance(node, ast.ClassDef):
+            names.append(node.name)
+        elif isinstance(node, ast.Assign):
+            names.extend(target.id for target in node.targets if isinstance(target, ast.Name))
+        elif isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+            names.append(node.target.id)
+    return names
+
+
+def describe_model(cls, base_model_cls) -> dict:
+    generic_metadata = getattr(cls, '__pydantic_generic_metadata__', None) or {}
+    if generic_metadata.get('parameters'):
+        raise TypeError(f"generic model {cls.__name__} is not supported")
+
+    model_bases = [base for base in cls.__bases__ if isinstance(base, type) and issubclass(base, base_model_cls)]
+    inherited_field_names = set()
+    for base in model_bases:
+        inherited_field_names.update(base.model_fields)
+
+    schema = cls.model_json_schema(ref_template='#/$defs/{model}')
+    properties = schema.get('properties', {})
+    required = set(schema.get('required', []))
+    fields = []
+    for field_name, field_info in cls.model_fields.items():
+        if field_name in inherited_field_names:
+            continue
+        json_name = field_info.alias or field_name
+        fields.append({
+            'name': json_name,
+            'schema': properties.get(json_name, {}),
+            'required': json_name in required,
+            'default': None if field_info.is_required() else (
+                describe_default(field_info.default) if field_info.default_factory is None else describe_default(field_info.default_factory())
+            ),
+        })
+
+    return {
+        'kind': 'model',
+        'name': cls.__name__,
+        # the root models(BaseModel, MyBaseModel...) have no fields and are no parents in TypeScript
+        'parents': [base.__name__ for base in model_bases if base.model_fields],
+        'fields': fields,
+        'defs': list(schema.get('$defs', {})),
+    }
+
+
+def describe_module(module_name: str, file_path: Path, base_model_cls) -> dict:
+    module = importlib.import_module(module_name)
+    symbols = []
+    for name in get_top_level_names(file_path):
+        obj = getattr(module, name, None)
+        if inspect.isclass(obj) and obj.__module__ == module_name:
+            if issubclass(obj, enum.Enum):
+                symbols.append({'kind': 'enum', 'name': name, 'members': [[member.name, member.value] for member in obj]})
+            elif base_model_cls is not None and issubclass(obj, base_model_cls):
+                symbols.append(describe_model(obj, base_model_cls))
+        elif typing.get_origin(obj) is typing.Literal:
+            symbols.append({'kind': 'literal', 'name': name, 'values': list(typing.get_args(obj))})
+    return {'symbols': symbols}
+
+
+def main():
+    backend_root = Path(sys.argv[1]).resolve()
+    sys.path.insert(0, str(backend_root))
+    try:
+        from pydantic import BaseModel
+    except ImportError:
+        BaseModel = None
+
+    # backend modules may print while imported, keep stdout for the result
+    stdout, sys.stdout = sys.stdout, sys.stderr
+    modules = {}
+    for file_path in sorted((backend_root / 'app/schemas').rglob('*.py')):
+        relpath = file_path.relative_to(backend_root)
+        module_name = '.'.join(relpath.with_suffix('').parts)
+        if module_name.endswith('.__init__'):
+            module_name = module_name[:-len('.__init__')]
+        try:
+            modules[relpath.as_posix()] = describe_module(module_name, file_path, BaseModel)
+        except BaseException as e:
+            modules[relpath.as_posix()] = {'error': f"{type(e).__name__}: {e}"}
+
+    json.dump({'modules': modules}, stdout, default=str)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+import os
+import sys
+import json
+import subprocess
+from typing import Any, Literal, Optional
+from pathlib import Path
+
+from pydantic import BaseModel, Field
+
+from .static_schema_converter import join_union, wrap_array_item
+
+
+introspection_script_path = Path(__file__).with_name('schema_introspection_script.py')
+default_introspection_timeout = float(os.environ.get('AZATHOTH_INTROSPECTION_TIMEOUT', 120))
+backend_venv_dirnames = ['.venv', 'venv']
+
+
+class IntrospectedField(BaseModel):
+    name: str
+    json_schema: dict[str, Any] = Field(default_factory=dict, alias='schema')
+    required: bool = True
+    default: Optional[str] = Field(None, description="How the default value is shown in the `// default to` comment, None if the field has no default")
+
+
+class IntrospectedSymbol(BaseModel):
+    kind: Literal['model', 'enum', 'literal']
+    name: str
+    parents: list[str] = Field(default_factory=list)
+    fields: list[IntrospectedField] = Field(default_factory=list)
+    defs: list[str] = Field(default_factory=list, description="Names of the models and enums referenced by a model, directly or not")
+    members: list[tuple[str, Any]] = Field(default_factory=list)
+    values: list[Any] = Field(default_factory=list)
+
+
+class IntrospectedSchemaModule(BaseModel):
+    symbols: list[IntrospectedSymbol] = Field(default_factory=list)
+    error: Optional[str] = Field(None, description="Why the module could not be introspected, it is then left to the LLM")
+
+
+class SchemaIntrospection(BaseModel):
+    modules: dict[str, IntrospectedSchemaModule] = Field(default_factory=dict, description="Introspected `app/schemas` modules, keyed by their path relative to the backend root")
+
+    def get_dependencies(self) -> dict[str, list[str]]:
+        """The modules whose symbols each module references, keyed by relative path."""
+        symbol_relpaths: dict[str, str] = {}
+        for relpath, module in self.modules.items():
+            for symbol in module.symbols:
+                symbol_relpaths.setdefault(symbol.name, relpath)
+
+        dependencies: dict[str, list[str]] = {}
+        for relpath, module in self.modules.items():
+            referenced_names = {name for symbol in module.symbols for name in symbol.defs + symbol.parents}
+            dependencies[relpath] = sorted({
+                symbol_relpaths[name] for name in referenced_names
+                if name in symbol_relpaths and symbol_relpaths[name] != relpath
+            })
+        return dependencies
+
+
+def introspect_backend_schemas(
+    backend_root: Path,
+    python_executable: Optional[Path] = None,
+    timeout: float = default_introspection_timeout,
+) -> SchemaIntrospection:
+    """Import every `app/schemas` module of the backend in an isolated subprocess, and describe their models, enums and Literal aliases.
+
+    The subprocess runs `schema_introspection_script.py` in isolated mode(`-I`), so neither the environment nor the current directory leak into the backend imports, and it is killed after `timeout` seconds.
+
+    Raises:
+        RuntimeError: If the subprocess fails or prints no valid result. A module which fails to import does not fail the whole introspection, it only gets its `error` set.
+    """
+    python_executable = python_executable or find_backend_python_executable(backend_root)
+    try:
+        completed = subprocess.run(
+            [str(python_executable), '-I', str(introspection_script_path), str(backend_root)],
+            cwd=backend_root,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+    except subprocess.TimeoutExpired as e:
+        raise RuntimeError(f"Schema introspection timed out after {timeout}s") from e
+    if completed.returncode != 0:
+        raise RuntimeError(f"Schema introspection exited with code {completed.returncode}: {completed.stderr.strip()[-2000:]}")
+    try:
+        return SchemaIntrospection.model_validate_json(completed.stdout)
+    except ValueError as e:
+        raise RuntimeError(f"Schema introspection printed an invalid result: {e}") from e
+
+
+def find_backend_python_executable(backend_root: Path) -> Path:
+    """The interpreter of the virtualenv in the backend root if any, else the current interpreter."""
+    for venv_dirname in backend_venv_dirnames:
+        for relpath in ('bin/python', 'Scripts/python.exe'):
+            candidate = backend_root / venv_dirname / relpath
+            if candidate.is_file():
+                return candidate
+    return Path(sys.executable)
+
+
+def render_introspected_module(module: IntrospectedSchemaModule) -> str:
+    """Render the TypeScript types of an introspected module, following the rules of `backend_segment_schema_convert_system_prompt`."""
+    literal_alias_names = {
+        tuple(json.dumps(value) for value in symbol.values): symbol.name
+        for symbol in module.symbols if symbol.kind == 'literal'
+    }
+    parts = []
+    for symbol in module.symbols:
+        if symbol.kind == 'enum':
+            members = [f"  {name} = {json.dumps(value, ensure_ascii=False)}," for name, value in symbol.members]
+            parts.append(f"export enum {symbol.name} {{\n" + '\n'.join(members) + "\n}")
+        elif symbol.kind == 'literal':
+            parts.append(f"export type {symbol.name} = {' | '.join(render_literal_value(value) for value in symbol.values)};")
+        else:
+            parts.append(render_introspected_model(symbol, literal_alias_names))
+    return '\n\n'.join(parts)
+
+
+def render_introspected_model(symbol: IntrospectedSymbol, literal_alias_names: dict[tuple[str, ...], str]) -> str:
+    is_req_body = symbol.name.endswith('ReqBody')
+    fields = []
+    for field in symbol.fields:
+        ts_types = split_union(json_schema_to_ts(field.json_schema, literal_alias_names))
+        is_nullable = 'null' in ts_types and len(ts_types) > 1
+        if is_nullable:
+            ts_types = [ts_type for ts_type in ts_types if ts_type != 'null']
+        has_default = field.default is not None
+        line = f"{field.name}{'?' if is_nullable or (is_req_body and has_default) else ''}: {join_union(ts_types)};"
+        if is_req_body and has_default:
+            line += f" // default to {field.default}"
+        fields.append(line)
+
+    if not fields and symbol.parents:
+        return f"export type {symbol.name} = {' & '.join(symbol.parents)};"
+    body = "{\n" + ''.join(f"  {field}\n" for field in fields) + "}"
+    return f"export type {symbol.name} = {' & '.join(symbol.parents + [body])};"
+
+
+def json_schema_to_ts(schema: dict[str, Any], literal_alias_names: dict[tuple[str, ...], str] | None = None) -> str:
+    """Convert a pydantic JSON Schema node to a TypeScript type expression, referenced models and enums are used by name."""
+    literal_alias_names = literal_alias_names or {}
+    if '$ref' in schema:
+        return schema['$ref'].rsplit('/', 1)[-1]
+    if 'allOf' in schema and len(schema['allOf']) == 1:
+        return json_schema_to_ts(schema['allOf'][0], literal_alias_names)
+    for key in ('anyOf', 'oneOf'):
+        if key in schema:
+            return join_union([ts_type for item in schema[key] for ts_type in split_union(json_schema_to_ts(item, literal_alias_names))])
+    if 'const' in schema:
+        return render_literal_value(schema['const'])
+    if 'enum' in schema:
+        alias_name = literal_alias_names.get(tuple(json.dumps(value) for value in schema['enum']))
+        return alias_name or ' | '.join(render_literal_value(value) for value in schema['enum'])
+
+    schema_type = schema.get('type')
+    if isinstance(schema_type, list):
+        return join_union([json_schema_to_ts({**schema, 'type': item}, literal_alias_names) for item in schema_type])
+    if schema_type == 'string':
+        return 'string'
+    if schema_type in ('integer', 'number'):
+        return 'number'
+    if schema_type == 'boolean':
+        return 'boolean'
+    if schema_type == 'null':
+        return 'null'
+    if schema_type == 'array':
+        if 'prefixItems' in schema:
+            return '[' + ', '.join(json_schema_to_ts(item, literal_alias_names) for item in schema['prefixItems']) + ']'
+        if isinstance(schema.get('items'), dict) and schema['items']:
+            return wrap_array_item(json_schema_to_ts(schema['items'], literal_alias_names)) + '[]'
+        return 'any[]'
+    if schema_type == 'object':
+        additional_properties = schema.get('additionalProperties')
+        if isinstance(additional_properties, dict) and additional_properties:
+            return f"Record<string, {json_schema_to_ts(additional_properties, literal_alias_names)}>"
+        return 'Record<string, any>'
+    return 'any'
+
+
+def render_literal_value(value: Any) -> str:
+    return 'null' if value is None else json.dumps(value, ensure_ascii=False)
+
+
+def split_union(ts_type: str) -> list[str]:
+    """Split a top-level union, the parenthesized array items and string literals are kept whole."""
+    parts, depth, in_string, current = [], 0, False, ''
+    for char in ts_type:
+        if char == '"' and not current.endswith('\\'):
+            in_string = not in_string
+        elif not in_string:
+            depth += char in '([{<'
+            depth -= char in ')]}>'
+        current += char
+        if depth == 0 and not in_string and current.endswith(' | '):
+            parts.append(current[:-3])
+            current = ''
+    parts.append(current)
+    return parts
+
+
+__all__ = [
+    'SchemaIntrospection',
+    'IntrospectedSchemaModule',
+    'introspect_backend_schemas',
+    'render_introspected_module',
+]
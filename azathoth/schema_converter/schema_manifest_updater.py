@@ -0,0 +1,110 @@
+from pathlib import Path
+
+from autom.logger import autom_logger
+from autom.engine import Request, Response, AgentWorker, AggregatorWorker, AutomSchema, Socket
+
+from azathoth.common import FilesContent, sha256_text
+from .schema import SchemaManifestUpdateParams
+from .manifest import SchemaManifestEntry, load_schema_manifest, save_schema_manifest
+
+
+class SchemaManifestUpdateParamsAggregator(AggregatorWorker):
+    @classmethod
+    def define_output_schema(cls) -> AutomSchema | None:
+        return SchemaManifestUpdateParams
+
+    @classmethod
+    def define_socket_list(cls) -> list[Socket]:
+        return [
+            Socket(
+                name='set_autom_backend_root_path',
+                input_type=Path,
+                socket_handler=cls._set_autom_backend_root_path,
+            ),
+            Socket(
+                name='set_autom_frontend_root_path',
+                input_type=Path,
+                socket_handler=cls._set_autom_frontend_root_path,
+            ),
+            Socket(
+                name='set_remove_stale_outputs',
+                input_type=bool,
+                socket_handler=cls._set_remove_stale_outputs,
+            ),
+            Socket(
+                name='set_files_content',
+                input_type=FilesContent,
+                socket_handler=cls._set_files_content,
+            ),
+        ]
+
+    def _set_autom_backend_root_path(self, data: Path):
+        self._output_as_dict['autom_backend_root_path'] = data
+
+    def _set_autom_frontend_root_path(self, data: Path):
+        self._output_as_dict['autom_frontend_root_path'] = data
+
+    def _set_remove_stale_outputs(self, data: bool):
+        self._output_as_dict['remove_stale_outputs'] = data
+
+    def _set_files_content(self, data: FilesContent):
+        self._output_as_dict['files_content'] = data
+
+
+class SchemaManifestUpdater(AgentWorker):
+    """Record the dumped schema files in the schema manifest, so that the next incremental run can skip them."""
+    @classmethod
+    def define_input_schema(cls) -> AutomSchema | None:
+        return SchemaManifestUpdateParams
+
+    @classmethod
+    def define_output_schema(cls) -> AutomSchema | None:
+        return FilesContent
+
+    def invoke(self, req: Request) -> Response:
+        req_body: SchemaManifestUpdateParams = req.body
+        backend_repo_root = req_body.autom_backend_root_path
+        frontend_repo_root = req_body.autom_frontend_root_path
+
+        manifest = load_schema_manifest(frontend_repo_root)
+
+        # (1) record the dumped files
+        for dst_filepath, content in req_body.files_content.map.items():
+            source_stamp = req_body.files_content.source_stamps.get(dst_filepath)
+            if source_stamp is None:
+                continue
+
+            src_relpath = source_stamp.src_filepath.relative_to(backend_repo_root).as_posix()
+            manifest.entries[src_relpath] = SchemaManifestEntry(
+                src_relpath=src_relpath,
+                dst_relpath=dst_filepath.relative_to(frontend_repo_root).as_posix(),
+                size=source_stamp.size,
+                mtime_ns=source_stamp.mtime_ns,
+                content_hash=source_stamp.content_hash,
+                output_hash=sha256_text(content),
+            )
+
+        # (2) drop the entries of the deleted source files whose stale output is gone, or kept since it was edited by hand
+        removed_filepaths = set(req_body.files_content.removed_filepaths)
+        for src_relpath, entry in list(manifest.entries.items()):
+            if (backend_repo_root / src_relpath).exists():
+                continue
+
+            dst_filepath = frontend_repo_root / entry.dst_relpath
+            if dst_filepath in removed_filepaths:
+                autom_logger.info(f"[SchemaManifestUpdater] Removed stale output {dst_filepath}.")
+            elif dst_filepath.exists() and not req_body.remove_stale_outputs:
+                continue
+            del manifest.entries[src_relpath]
+
+        save_schema_manifest(frontend_repo_root, manifest)
+
+        return Response[FilesContent].from_worker(self).success(
+            body=req_body.files_content
+        )
+
+
+__all__ = [
+    'SchemaManifestUpdateParamsAggregator',
+    'SchemaManifestUpdater',
+]
@@ -1,16 +1,28 @@
+import threading
+
 from pydantic import BaseModel
+from autom.logger import autom_logger
 from autom.utils import SingleLLMUsage
 from autom.official import BaseOpenAIWorker
 from autom.engine import Request, Response, AgentWorker
 
+from azathoth.common import (
+    make_llm_cache_key, get_llm_result_cache, get_llm_call_executor, get_openai_client, parse_chat_completion, sha256_text, make_journal_key, get_run_journal,
+    ConvertFailure, LLMUsageLabel, LLMBudgetExceeded,
+)
 from .schema import RepoEnum, SegmentSchemaConvertParams, ConvertedSchemaSegment
 from .prompt import backend_segment_schema_convert_system_prompt, backend_segment_schema_convert_user_input_prompt
+from .static_schema_converter import convert_schema_segment_statically
+
+
+segment_schema_converter_model = "gpt-4o-mini"
+schema_run_journal_name = 'schema'
 
 
 class SegmentSchemaConverter(BaseOpenAIWorker, AgentWorker):
     """Segment-Level Schema Converter
 
-    Convert a segment of Python code(usually contains pydantic schema, enum, literal, etc.) to TypeScript type definitions.
+    Convert a segment of Python code(usually contains pydantic schema, enum, literal, etc.) to TypeScript type definitions. Only the nodes the static converter does not support go to the LLM.
     """
     @classmethod
     def define_input_schema(cls):
@@ -21,37 +33,139 @@ class SegmentSchemaConverter(BaseOpenAIWorker, AgentWorker):
         return ConvertedSchemaSegment
 
     def invoke(self, req: Request) -> Response:
-        class Output(BaseModel):
-            converted_segment: str
-
         req_body: SegmentSchemaConvertParams = req.body
         resp = Response[ConvertedSchemaSegment].from_worker(self)
         if req_body.src_repo_enum == RepoEnum.BACKEND:
-            chat_completion = self.openai_client.beta.chat.completions.parse(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": backend_segment_schema_convert_system_prompt.format()},
-                    {"role": "user", "content": backend_segment_schema_convert_user_input_prompt.format(
-                        src_file_relpath=req_body.src_filepath.relative_to(req_body.src_root_path).as_posix(),
-                        code_segment=req_body.segment,
-                    )},
-                ],
-                response_format=Output,
-            )
-            resp.add_llm_usage(SingleLLMUsage.from_openai_chat_completion(chat_completion))
-            parsed = chat_completion.choices[0].message.parsed
-            if parsed is None:
-                raise RuntimeError(f"Failed to parse the response from OpenAI: {chat_completion.choices[0].message}. Request: {req}")
-    
-            resp.body = ConvertedSchemaSegment(
-                converted_schema=parsed.converted_segment,
-            )
+            journal = get_run_journal(req_body.dst_root_path, schema_run_journal_name)
+            journal_key = self.get_journal_key(req_body)
+            recorded = journal.get(journal_key) if req_body.resume else None
+            if recorded is not None:
+                resp.body = ConvertedSchemaSegment.model_validate(recorded)
+                return resp
+
+            try:
+                converted_schema_segment, llm_usage = get_llm_call_executor().result(
+                    self.get_request_key(req_body),
+                    lambda: self.convert(req_body),
+                )
+            except LLMBudgetExceeded:
+                raise
+            except Exception as e:
+                src_relpath = req_body.src_filepath.relative_to(req_body.src_root_path).as_posix()
+                autom_logger.error(f"[SegmentSchemaConverter] Failed to convert a segment of {src_relpath}: {e}")
+                resp.body = ConvertedSchemaSegment(
+                    converted_schema='',
+                    failure=ConvertFailure.from_exception(f'segment of {src_relpath}', e, req_body.dst_filepath),
+                )
+                return resp
+            if llm_usage is not None:
+                resp.add_llm_usage(llm_usage)
+            journal.record(journal_key, converted_schema_segment.model_dump())
+            resp.body = converted_schema_segment
         else:
             raise NotImplementedError
 
         return resp
 
+    def prefetch(self, req_body: SegmentSchemaConvertParams):
+        """Start converting the segment in the background, a later `invoke` with the same params collects the result."""
+        if req_body.src_repo_enum == RepoEnum.BACKEND:
+            if req_body.resume and get_run_journal(req_body.dst_root_path, schema_run_journal_name).get(self.get_journal_key(req_body)) is not None:
+                return
+            get_llm_call_executor().submit(self.get_request_key(req_body), lambda: self.convert(req_body))
+
+    @classmethod
+    def get_request_key(cls, req_body: SegmentSchemaConvertParams, code_segment: str | None = None) -> str:
+        return make_llm_cache_key(
+            segment_schema_converter_model,
+            backend_segment_schema_convert_system_prompt,
+            backend_segment_schema_convert_user_input_prompt,
+            req_body.src_filepath.relative_to(req_body.src_root_path).as_posix(),
+            req_body.segment if code_segment is None else code_segment,
+        )
+
+    @classmethod
+    def get_journal_key(cls, req_body: SegmentSchemaConvertParams) -> str:
+        return make_journal_key(
+            'segment',
+            req_body.src_filepath.relative_to(req_body.src_root_path).as_posix(),
+            sha256_text(req_body.segment),
+        )
+
+    @classmethod
+    def get_messages(cls, req_body: SegmentSchemaConvertParams, code_segment: str) -> list[dict]:
+        return [
+            {"role": "system", "content": backend_segment_schema_convert_system_prompt.format()},
+            {"role": "user", "content": backend_segment_schema_convert_user_input_prompt.format(
+                src_file_relpath=req_body.src_filepath.relative_to(req_body.src_root_path).as_posix(),
+                code_segment=code_segment,
+            )},
+        ]
+
+    def convert(self, req_body: SegmentSchemaConvertParams) -> tuple[ConvertedSchemaSegment, SingleLLMUsage | None]:
+        """Convert the segment, statically as far as possible. The usage is None if the LLM was not called."""
+        if not req_body.use_static_converter:
+            return self.convert_by_llm(req_body, req_body.segment)
+
+        static_conversion = convert_schema_segment_statically(req_body.segment)
+        if not static_conversion.unsupported_segment:
+            return ConvertedSchemaSegment(converted_schema=static_conversion.converted_segment), None
+
+        converted_schema_segment, llm_usage = self.convert_by_llm(req_body, static_conversion.unsupported_segment)
+        converted_schema = '\n\n'.join(
+            part for part in [static_conversion.converted_segment, converted_schema_segment.converted_schema] if part.strip()
+        )
+        return ConvertedSchemaSegment(converted_schema=converted_schema), llm_usage
+
+    def convert_by_llm(self, req_body: SegmentSchemaConvertParams, code_segment: str) -> tuple[ConvertedSchemaSegment, SingleLLMUsage | None]:
+        """Convert `code_segment` by the LLM, through the LLM result cache if enabled. The usage is None on a cache hit."""
+        class Output(BaseModel):
+            converted_segment: str
+
+        llm_cache = get_llm_result_cache() if req_body.use_llm_cache else None
+        cache_key = self.get_request_key(req_body, code_segment)
+        cached = llm_cache.get(cache_key) if llm_cache is not None else None
+        if cached is not None:
+            return ConvertedSchemaSegment.model_validate(cached), None
+
+        src_file_relpath = req_body.src_filepath.relative_to(req_body.src_root_path).as_posix()
+        chat_completion = parse_chat_completion(
+            get_openai_client(self),
+            model=segment_schema_converter_model,
+            messages=self.get_messages(req_body, code_segment),
+            response_format=Output,
+            usage_label=LLMUsageLabel(stage='schema', filepath=src_file_relpath),
+        )
+        llm_usage = SingleLLMUsage.from_openai_chat_completion(chat_completion)
+        parsed = chat_completion.choices[0].message.parsed
+        if parsed is None:
+            raise RuntimeError(f"Failed to parse the response from OpenAI: {chat_completion.choices[0].message}. Request: {req_body}")
+
+        converted_schema_segment = ConvertedSchemaSegment(
+            converted_schema=parsed.converted_segment,
+        )
+        if llm_cache is not None:
+            llm_cache.set(cache_key, converted_schema_segment.model_dump())
+        return converted_schema_segment, llm_usage
+
+
+_prefetch_worker: SegmentSchemaConverter | None = None
+_prefetch_worker_lock = threading.Lock()
+
+
+def prefetch_segment_schema_conversions(params_list: list[SegmentSchemaConvertParams]):
+    """Submit the conversion of every segment to the shared LLMCallExecutor."""
+    global _prefetch_worker
+    with _prefetch_worker_lock:
+        if _prefetch_worker is None:
+            _prefetch_worker = SegmentSchemaConverter()
+    for params in params_list:
+        _prefetch_worker.prefetch(params)
+
 
 __all__ = [
+    'segment_schema_converter_model',
+    'schema_run_journal_name',
     'SegmentSchemaConverter',
+    'prefetch_segment_schema_conversions',
 ]
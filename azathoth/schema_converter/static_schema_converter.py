@@ -0,0 +1,347 @@
+import ast
+import json
+
+from pydantic import BaseModel, Field
+
+
+model_base_names = {'MyBaseModel', 'BaseModel'}
+enum_base_names = {'Enum', 'StrEnum', 'IntEnum'}
+primitive_type_map = {
+    # string-like
+    'str': 'string', 'EmailStr': 'string', 'NameEmail': 'string', 'SecretStr': 'string', 'constr': 'string',
+    'AnyUrl': 'string', 'AnyHttpUrl': 'string', 'HttpUrl': 'string', 'UUID': 'string', 'UUID4': 'string',
+    'datetime': 'string', 'date': 'string', 'time': 'string', 'timedelta': 'string', 'Path': 'string', 'FilePath': 'string',
+    # number-like
+    'int': 'number', 'float': 'number', 'Decimal': 'number', 'conint': 'number', 'confloat': 'number',
+    'PositiveInt': 'number', 'NegativeInt': 'number', 'NonNegativeInt': 'number', 'NonPositiveInt': 'number',
+    'PositiveFloat': 'number', 'NegativeFloat': 'number', 'NonNegativeFloat': 'number', 'NonPositiveFloat': 'number',
+    'bool': 'boolean', 'StrictBool': 'boolean', 'StrictStr': 'string', 'StrictInt': 'number', 'StrictFloat': 'number',
+    'Any': 'any', 'None': 'null',
+}
+list_type_names = {'list', 'List', 'set', 'Set', 'frozenset', 'FrozenSet', 'Sequence', 'Iterable'}
+dict_type_names = {'dict', 'Dict', 'Mapping', 'MutableMapping'}
+union_type_names = {'Union'}
+optional_type_names = {'Optional'}
+skipped_field_names = {'model_config'}
+# they rename the field in JSON, which the TypeScript type must follow
+alias_keyword_names = {'alias', 'validation_alias', 'serialization_alias', 'alias_generator'}
+
+
+class UnsupportedSchemaNode(Exception):
+    """Raised when a node can not be converted deterministically, it is then left to the LLM."""
+
+
+class StaticSchemaConversion(BaseModel):
+    converted_segment: str = Field('', description="TypeScript code of the nodes converted statically")
+    unsupported_segment: str = Field('', description="Python source of the top-level nodes which need the LLM, with their leading comments")
+    n_converted: int = 0
+    n_unsupported: int = 0
+
+
+def convert_schema_segment_statically(segment: str) -> StaticSchemaConversion:
+    """Convert the Pydantic models, enums and Literal aliases of a Python segment to TypeScript types without LLM.
+
+    It follows the rules of `backend_segment_schema_convert_system_prompt`. Top-level nodes it does not fully understand are returned untouched in `unsupported_segment`, nodes irrelevant to schemas(imports, functions, constants, TypeVars...) are dropped.
+    A class is a model only if its bases are `model_base_names` or models converted earlier in the segment, classes of other bases go to the LLM.
+    """
+    try:
+        module = ast.parse(segment)
+    except SyntaxError:
+        return StaticSchemaConversion(unsupported_segment=segment, n_unsupported=1)
+
+    lines = segment.splitlines(keepends=True)
+    converted_parts: list[str] = []
+    unsupported_parts: list[str] = []
+    previous_end = 0
+    model_names = set(model_base_names)
+    for node in module.body:
+        start = min([node.lineno] + [decorator.lineno for decorator in getattr(node, 'decorator_list', [])]) - 1
+        comments = [line.strip() for line in lines[previous_end:start] if line.strip().startswith('#')]
+        node_source = ''.join(lines[previous_end:node.end_lineno]).strip('\n')
+        previous_end = node.end_lineno
+
+        try:
+            converted = convert_schema_node(node, model_names)
+        except UnsupportedSchemaNode:
+            unsupported_parts.append(node_source)
+            continue
+        if converted is None:
+            continue
+        comment_lines = [f"// {comment.lstrip('#').strip()}" for comment in comments]
+        converted_parts.append('\n'.join(comment_lines + [converted]))
+
+    return StaticSchemaConversion(
+        converted_segment='\n\n'.join(converted_parts),
+        unsupported_segment='\n\n\n'.join(unsupported_parts),
+        n_converted=len(converted_parts),
+        n_unsupported=len(unsupported_parts),
+    )
+
+
+def convert_schema_node(node: ast.stmt, model_names: set[str]) -> str | None:
+    """Convert a top-level statement, None if it is irrelevant to schemas. The names of the converted models are added to `model_names`."""
+    if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.AsyncFunctionDef, ast.Pass)):
+        return None
+    if isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant):
+        return None
+    if isinstance(node, ast.ClassDef):
+        if any(get_base_name(base) in enum_base_names for base in node.bases):
+            return convert_enum_class(node)
+        return convert_model_class(node, model_names)
+    if isinstance(node, (ast.Assign, ast.AnnAssign)):
+        return convert_type_alias(node)
+    raise UnsupportedSchemaNode(ast.dump(node)[:64])
+
+
+def convert_type_alias(node: ast.Assign | ast.AnnAssign) -> str | None:
+    targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+    if len(targets) != 1 or not isinstance(targets[0], ast.Name) or node.value is None:
+        raise UnsupportedSchemaNode("complex assignment")
+    name = targets[0].id
+    value = node.value
+    if isinstance(value, ast.Call) and get_base_name(value.func) in {'TypeVar', 'ParamSpec'}:
+        return None
+    is_literal = isinstance(value, ast.Subscript) and get_base_name(value.value) == 'Literal'
+    is_type_expr = isinstance(value, (ast.Name, ast.Attribute, ast.Subscript, ast.BinOp))
+    if not is_literal and (not is_type_expr or not name[:1].isupper()):
+        # a constant, not a type
+        return None
+    return f"export type {name} = {convert_type(value)};"
+
+
+def convert_enum_class(node: ast.ClassDef) -> str:
+    members = []
+    for stmt in node.body:
+        if is_docstring(stmt) or isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Pass)):
+            continue
+        if not (isinstance(stmt, ast.Assign) and len(stmt.targets) == 1 and isinstance(stmt.targets[0], ast.Name)):
+            raise UnsupportedSchemaNode(f"enum member of {node.name}")
+        if not isinstance(stmt.value, ast.Constant) or type(stmt.value.value) not in (str, int):
+            raise UnsupportedSchemaNode(f"enum value of {node.name}")
+        members.append(f"  {stmt.targets[0].id} = {json.dumps(stmt.value.value, ensure_ascii=False)},")
+    return f"export enum {node.name} {{\n" + '\n'.join(members) + "\n}"
+
+
+def convert_model_class(node: ast.ClassDef, model_names: set[str]) -> str | None:
+    if node.keywords:
+        raise UnsupportedSchemaNode(f"class keywords of {node.name}")
+
+    base_names = [get_base_name(base) for base in node.bases]
+    if any(base_name is not None and (base_name == 'Exception' or base_name.endswith('Error')) for base_name in base_names):
+        # not a schema
+        return None
+
+    type_params: list[str] = []
+    parents: list[str] = []
+    for base, base_name in zip(node.bases, base_names):
+        if base_name in model_base_names:
+            continue
+        if base_name == 'Generic' and isinstance(base, ast.Subscript):
+            type_params.extend(convert_type(arg) for arg in get_subscript_args(base))
+            continue
+        if base_name not in model_names:
+            # a mixin, ABC or class of another file, it may not be a model at all
+            raise UnsupportedSchemaNode(f"base {base_name} of {node.name}")
+        parents.append(convert_type(base))
+    if not parents and not any(base_name in model_base_names for base_name in base_names):
+        raise UnsupportedSchemaNode(f"{node.name} is not a model")
+
+    is_req_body = node.name.endswith('ReqBody')
+    fields = []
+    for stmt in node.body:
+        if is_docstring(stmt) or isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Pass)):
+            # methods and validators do not change the fields
+            continue
+        if isinstance(stmt, ast.Assign) and all(isinstance(target, ast.Name) and target.id in skipped_field_names for target in stmt.targets):
+            check_no_alias(stmt.value, node.name)
+            continue
+        if not (isinstance(stmt, ast.AnnAssign) and isinstance(stmt.target, ast.Name)):
+            raise UnsupportedSchemaNode(f"body of {node.name}")
+        if stmt.target.id in skipped_field_names and stmt.value is not None:
+            check_no_alias(stmt.value, node.name)
+        if stmt.target.id in skipped_field_names or stmt.target.id.startswith('_') or get_base_name(get_annotation(stmt.annotation)) == 'ClassVar':
+            continue
+        fields.append(convert_field(stmt, is_req_body))
+
+    model_names.add(node.name)
+    name = node.name + (f"<{', '.join(type_params)}>" if type_params else '')
+    if not fields and parents:
+        return f"export type {name} = {' & '.join(parents)};"
+    body = "{\n" + ''.join(f"  {field}\n" for field in fields) + "}"
+    return f"export type {name} = {' & '.join(parents + [body])};"
+
+
+def convert_field(stmt: ast.AnnAssign, is_req_body: bool) -> str:
+    annotation = get_annotation(stmt.annotation)
+    if isinstance(annotation, ast.Subscript) and get_base_name(annotation.value) == 'Annotated':
+        for metadata in get_subscript_args(annotation)[1:]:
+            check_no_alias(metadata, stmt.target.id)
+        annotation = get_annotation(get_subscript_args(annotation)[0])
+    if stmt.value is not None:
+        check_no_alias(stmt.value, stmt.target.id)
+    is_optional, inner_annotation = unwrap_optional(annotation)
+    ts_type = convert_type(inner_annotation)
+
+    has_default, default_repr = get_field_default(stmt.value)
+    line = f"{stmt.target.id}{'?' if is_optional or (is_req_body and has_default) else ''}: {ts_type};"
+    if is_req_body and has_default:
+        line += f" // default to {default_repr}"
+    return line
+
+
+def check_no_alias(node: ast.expr, owner_name: str):
+    """Raise UnsupportedSchemaNode if `node`, a `Field(...)` or a `model_config`, renames fields by an alias."""
+    for sub_node in ast.walk(node):
+        if isinstance(sub_node, ast.keyword) and sub_node.arg in alias_keyword_names:
+            raise UnsupportedSchemaNode(f"{sub_node.arg} of {owner_name}")
+        if isinstance(sub_node, ast.Dict) and any(isinstance(key, ast.Constant) and key.value in alias_keyword_names for key in sub_node.keys):
+            raise UnsupportedSchemaNode(f"alias of {owner_name}")
+
+
+def get_field_default(value: ast.expr | None) -> tuple[bool, str]:
+    """Whether a field has a default value, and how to show it in the `// default to` comment."""
+    if value is None:
+        return False, ''
+    if isinstance(value, ast.Call) and get_base_name(value.func) == 'Field':
+        for keyword in value.keywords:
+            if keyword.arg == 'default':
+                return get_field_default(keyword.value)
+            if keyword.arg == 'default_factory':
+                factory = get_base_name(keyword.value)
+                return True, {'list': '[]', 'dict': '{}', 'set': '[]'}.get(factory, f"{ast.unparse(keyword.value)}()")
+        if not value.args:
+            return False, ''
+        return get_field_default(value.args[0])
+    if isinstance(value, ast.Constant):
+        if value.value is Ellipsis:
+            return False, ''
+        if value.value is None:
+            return True, 'undefined'
+        if isinstance(value.value, bool):
+            return True, 'true' if value.value else 'false'
+        return True, str(value.value)
+    return True, ast.unparse(value)
+
+
+def convert_type(node: ast.expr) -> str:
+    """Convert a Python type expression to a TypeScript type expression."""
+    node = get_annotation(node)
+    if isinstance(node, ast.Constant) and node.value is None:
+        return 'null'
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitOr):
+        return join_union([convert_type(node.left), convert_type(node.right)])
+    if isinstance(node, (ast.Name, ast.Attribute)):
+        name = get_base_name(node)
+        if name in primitive_type_map:
+            return primitive_type_map[name]
+        if name in list_type_names:
+            return 'any[]'
+        if name in dict_type_names:
+            return 'Record<string, any>'
+        if name[:1].isupper():
+            # a schema, enum or type variable of the project, used by name
+            return name
+        raise UnsupportedSchemaNode(f"type {name}")
+    if isinstance(node, ast.Subscript):
+        name = get_base_name(node.value)
+        args = get_subscript_args(node)
+        if name == 'Literal':
+            return ' | '.join(convert_literal_value(arg) for arg in args)
+        if name in optional_type_names:
+            return join_union([convert_type(args[0]), 'null'])
+        if name in union_type_names:
+            return join_union([convert_type(arg) for arg in args])
+        if name == 'Annotated':
+            return convert_type(args[0])
+        if name in list_type_names:
+            return wrap_array_item(convert_type(args[0])) + '[]'
+        if name in ('tuple', 'Tuple'):
+            if len(args) == 2 and isinstance(args[1], ast.Constant) and args[1].value is Ellipsis:
+                return wrap_array_item(convert_type(args[0])) + '[]'
+            return '[' + ', '.join(convert_type(arg) for arg in args) + ']'
+        if name in dict_type_names:
+            if len(args) != 2:
+                raise UnsupportedSchemaNode(f"type {name}")
+            return f"Record<{convert_type(args[0])}, {convert_type(args[1])}>"
+        if name is not None and name[:1].isupper():
+            # a generic schema of the project
+            return f"{name}<{', '.join(convert_type(arg) for arg in args)}>"
+    raise UnsupportedSchemaNode(f"type {ast.unparse(node)}")
+
+
+def convert_literal_value(node: ast.expr) -> str:
+    if isinstance(node, ast.Constant) and isinstance(node.value, (str, int, float, bool)):
+        return json.dumps(node.value, ensure_ascii=False)
+    if isinstance(node, ast.Constant) and node.value is None:
+        return 'null'
+    raise UnsupportedSchemaNode(f"literal {ast.unparse(node)}")
+
+
+def join_union(ts_types: list[str]) -> str:
+    unique_types = []
+    for ts_type in ts_types:
+        if ts_type not in unique_types:
+            unique_types.append(ts_type)
+    return ' | '.join(unique_types)
+
+
+def wrap_array_item(ts_type: str) -> str:
+    return f"({ts_type})" if ' | ' in ts_type or ' & ' in ts_type else ts_type
+
+
+def unwrap_optional(node: ast.expr) -> tuple[bool, ast.expr]:
+    """Split `Optional[X]`, `Union[X, None]` and `X | None` into (True, X), other types into (False, type)."""
+    if isinstance(node, ast.Subscript) and get_base_name(node.value) in optional_type_names:
+        return True, get_subscript_args(node)[0]
+    if isinstance(node, ast.Subscript) and get_base_name(node.value) in union_type_names:
+        args = get_subscript_args(node)
+        not_none_args = [arg for arg in args if not is_none(arg)]
+        if len(not_none_args) < len(args):
+            if len(not_none_args) == 1:
+                return True, not_none_args[0]
+            return True, ast.Subscript(value=node.value, slice=ast.Tuple(elts=not_none_args, ctx=ast.Load()), ctx=ast.Load())
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitOr):
+        if is_none(node.right):
+            return True, node.left
+        if is_none(node.left):
+            return True, node.right
+    return False, node
+
+
+def get_annotation(node: ast.expr) -> ast.expr:
+    """Resolve string(forward reference) annotations."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        try:
+            return ast.parse(node.value, mode='eval').body
+        except SyntaxError:
+            raise UnsupportedSchemaNode(f"annotation {node.value!r}")
+    return node
+
+
+def get_subscript_args(node: ast.Subscript) -> list[ast.expr]:
+    return list(node.slice.elts) if isinstance(node.slice, ast.Tuple) else [node.slice]
+
+
+def get_base_name(node: ast.expr) -> str | None:
+    """The last name of `Name`, `module.Name` and `Name[...]` expressions."""
+    if isinstance(node, ast.Subscript):
+        return get_base_name(node.value)
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    if isinstance(node, ast.Name):
+        return node.id
+    return None
+
+
+def is_none(node: ast.expr) -> bool:
+    return (isinstance(node, ast.Constant) and node.value is None) or (isinstance(node, ast.Name) and node.id == 'None')
+
+
+def is_docstring(stmt: ast.stmt) -> bool:
+    return isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant) and isinstance(stmt.value.value, str)
+
+
+__all__ = [
+    'StaticSchemaConversion',
+    'convert_schema_segment_statically',
+]
@@ -0,0 +1,166 @@
+import os
+import ast
+import threading
+import multiprocessing
+from os import PathLike
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from pydantic import BaseModel, Field
+from autom.logger import autom_logger
+
+from .common import read_source_file
+
+
+# below this number of files to (re)parse, parsing in worker processes costs more than it saves
+min_files_to_parse_in_parallel = 32
+# directories which hold installed or generated code, never project sources
+excluded_dir_names = {'__pycache__', 'node_modules', 'site-packages', 'dist-packages', 'venv', 'build', 'dist'}
+
+
+class ClassSymbol(BaseModel):
+    qualname: str = Field(..., description="Dotted qualified name from the index root, e.g. `app.schemas.user.User`")
+    name: str
+    file_path: Path
+    lineno: int
+    end_lineno: int
+    source: str = Field(..., description="The unparsed class definition")
+
+
+class IndexedFile(BaseModel):
+    size: int
+    mtime_ns: int
+    classes: list[ClassSymbol] = Field(default_factory=list)
+
+
+def parse_file_class_symbols(file_path: Path, module_name: str) -> list[ClassSymbol]:
+    """Parse a Python file and collect its top-level classes. Files that fail to parse have no symbols."""
+    try:
+        tree = read_source_file(file_path).tree
+    except (OSError, SyntaxError, UnicodeDecodeError, ValueError) as e:
+        autom_logger.warning(f"[SymbolIndex] Failed to parse {file_path}: {e}")
+        return []
+
+    return [
+        ClassSymbol(
+            qualname=f"{module_name}.{node.name}",
+            name=node.name,
+            file_path=file_path,
+            lineno=node.lineno,
+            end_lineno=node.end_lineno,
+            source=ast.unparse(node),
+        )
+        for node in ast.iter_child_nodes(tree) if isinstance(node, ast.ClassDef)
+    ]
+
+
+class SymbolIndex:
+    """Index of the top-level classes of every Python file under a root directory, `refresh` only reparses the files which changed."""
+    def __init__(self, root: PathLike):
+        self.root = Path(root).resolve()
+        self._files: dict[Path, IndexedFile] = {}
+        self._by_name: dict[str, list[ClassSymbol]] = {}
+        self._by_qualname: dict[str, ClassSymbol] = {}
+        self._lock = threading.Lock()
+        self.n_parsed_files = 0
+
+    def get_module_name(self, file_path: Path) -> str:
+        return '.'.join(file_path.relative_to(self.root).with_suffix('').parts)
+
+    def refresh(self):
+        """Bring the index up to date with the files on disk."""
+        with self._lock:
+            stats: dict[Path, os.stat_result] = {}
+            for dirpath, dirnames, filenames in os.walk(self.root):
+                # hidden directories(.git, .venv, .azathoth...), virtualenvs and build outputs never hold project sources
+                dirnames[:] = [d for d in dirnames if not is_excluded_dir(Path(dirpath) / d)]
+                for filename in filenames:
+                    if filename.endswith('.py'):
+                        file_path = Path(dirpath) / filename
+                        stats[file_path] = file_path.stat()
+
+            changed = [
+                file_path for file_path, stat in stats.items()
+                if (indexed := self._files.get(file_path)) is None or (indexed.size, indexed.mtime_ns) != (stat.st_size, stat.st_mtime_ns)
+            ]
+            removed = [file_path for file_path in self._files if file_path not in stats]
+            if not changed and not removed:
+                return
+
+            module_names = [self.get_module_name(file_path) for file_path in changed]
+            if len(changed) >= min_files_to_parse_in_parallel:
+                classes_list = list(_get_parse_pool().map(parse_file_class_symbols, changed, module_names, chunksize=8))
+            else:
+                classes_list = list(map(parse_file_class_symbols, changed, module_names))
+
+            for file_path in removed:
+                del self._files[file_path]
+            for file_path, classes in zip(changed, classes_list):
+                stat = stats[file_path]
+                self._files[file_path] = IndexedFile(size=stat.st_size, mtime_ns=stat.st_mtime_ns, classes=classes)
+            self.n_parsed_files += len(changed)
+            self._rebuild_lookups()
+
+        autom_logger.info(f"[SymbolIndex] Indexed {self.root}: {len(changed)} files parsed, {len(removed)} removed, {len(self._files)} in total.")
+
+    def _rebuild_lookups(self):
+        self._by_name = {}
+        self._by_qualname = {}
+        for file_path in sorted(self._files):
+            for symbol in self._files[file_path].classes:
+                self._by_name.setdefault(symbol.name, []).append(symbol)
+                self._by_qualname[symbol.qualname] = symbol
+
+    def get(self, qualname: str) -> ClassSymbol | None:
+        with self._lock:
+            return self._by_qualname.get(qualname)
+
+    def find_classes(self, name: str, within: PathLike) -> list[ClassSymbol]:
+        """Find the classes named `name` defined in `within`, a Python file or a directory(recursively)."""
+        within = Path(within).resolve()
+        with self._lock:
+            symbols = self._by_name.get(name, [])
+            return [symbol for symbol in symbols if symbol.file_path == within or within in symbol.file_path.parents]
+
+
+def is_excluded_dir(dir_path: Path) -> bool:
+    if dir_path.name.startswith('.') or dir_path.name in excluded_dir_names:
+        return True
+    # a virtualenv of any name
+    return (dir_path / 'pyvenv.cfg').exists()
+
+
+_parse_pool: ProcessPoolExecutor | None = None
+_parse_pool_lock = threading.Lock()
+
+
+def _get_parse_pool() -> ProcessPoolExecutor:
+    # created once and spawned rather than forked: forking copies the threads and locks of the running conversion
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context('spawn'))
+        return _parse_pool
+
+
+_symbol_indexes: dict[Path, SymbolIndex] = {}
+_symbol_indexes_lock = threading.Lock()
+
+
+def get_symbol_index(root: PathLike, refresh: bool = True) -> SymbolIndex:
+    """Get the process-wide SymbolIndex of `root`, refreshed against the files on disk unless `refresh` is False."""
+    root = Path(root).resolve()
+    with _symbol_indexes_lock:
+        symbol_index = _symbol_indexes.get(root)
+        if symbol_index is None:
+            symbol_index = _symbol_indexes[root] = SymbolIndex(root)
+    if refresh:
+        symbol_index.refresh()
+    return symbol_index
+
+
+__all__ = [
+    'ClassSymbol',
+    'SymbolIndex',
+    'get_symbol_index',
+]
@@ -0,0 +1,26 @@
+import pytest
+
+from azathoth.common import LLMBudget, get_llm_budget_guard, set_openai_client_override
+from azathoth.benchmark.fake_llm import FakeLLMConfig, FakeOpenAIClient
+
+
+@pytest.fixture
+def fake_llm():
+    """Every LLM call of the test goes to an instant FakeOpenAIClient."""
+    client = FakeOpenAIClient(FakeLLMConfig(latency_median=0))
+    set_openai_client_override(client)
+    yield client
+    set_openai_client_override(None)
+
+
+@pytest.fixture
+def llm_budget():
+    """Configure the budget of the process-wide LLMBudgetGuard, the previous one is restored after the test."""
+    budget_guard = get_llm_budget_guard()
+    previous_budget = budget_guard.budget
+
+    def configure(budget: LLMBudget):
+        budget_guard.configure(budget)
+
+    yield configure
+    budget_guard.configure(previous_budget)
@@ -0,0 +1,94 @@
+import ast
+
+import pytest
+
+from azathoth.ast_utils import extract_function_signature
+from azathoth.api_converter import FunctionConvertKeyResult
+from azathoth.api_converter.function_signature_classifier import classify_function_signature
+
+
+def classify(function_source: str) -> FunctionConvertKeyResult | None:
+    return classify_function_signature(extract_function_signature(ast.parse(function_source).body[0]))
+
+
+def test_endpoint_with_params_body_and_current_user():
+    key_result = classify('''@router.post("/{project_id}/members/{member_id}", response_model=PaginatedResult[MemberSafe])
+async def update_member(
+    project_id: str,
+    member_id: int,
+    body_data: UpdateMemberReqBody,
+    notify: bool = False,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    ...
+''')
+
+    assert key_result == FunctionConvertKeyResult(
+        api_suffix_route='/{project_id}/members/{member_id}',
+        has_response_model=True,
+        response_model='PaginatedResult[MemberSafe]',
+        has_body_data=True,
+        body_data_type='UpdateMemberReqBody',
+        has_current_user=True,
+        other_params={'projectId': 'string', 'memberId': 'number', 'notify': 'boolean'},
+    )
+
+
+def test_endpoint_without_response_model_or_params():
+    key_result = classify('''@router.delete(path="logout", response_model=None)
+def logout(db=Depends(get_db), background_tasks: BackgroundTasks = None):
+    ...
+''')
+
+    assert key_result == FunctionConvertKeyResult(
+        api_suffix_route='/logout',
+        has_response_model=False,
+        response_model=None,
+        has_body_data=False,
+        body_data_type=None,
+        has_current_user=False,
+        other_params=None,
+    )
+
+
+@pytest.mark.parametrize('function_source', [
+    pytest.param('''async def helper(project_id: str):
+    ...
+''', id='no-route-decorator'),
+    pytest.param('''@router.get("/a")
+@router.post("/b")
+async def two_routes():
+    ...
+''', id='several-route-decorators'),
+    pytest.param('''@router.get(ROUTE)
+async def dynamic_route():
+    ...
+''', id='non-literal-route'),
+    pytest.param('''@router.get("/list", response_model=list[UserSafe])
+async def list_users():
+    ...
+''', id='builtin-generic-response'),
+    pytest.param('''@router.post("/create")
+async def create(body_data: dict):
+    ...
+''', id='non-schema-body'),
+    pytest.param('''@router.get("/search")
+async def search(query: SearchQuery):
+    ...
+''', id='unknown-param-type'),
+    pytest.param('''@router.get("/me")
+async def me(settings: str = Depends(get_settings)):
+    ...
+''', id='unknown-dependency'),
+    pytest.param('''@router.get("/{user_id}")
+async def get_user(id: str):
+    ...
+''', id='unfilled-placeholder'),
+    pytest.param('''@router.get("/any")
+async def anything(*args, **kwargs):
+    ...
+''', id='var-params'),
+])
+def test_unclassifiable_endpoints_are_left_to_the_llm(function_source: str):
+    assert classify(function_source) is None
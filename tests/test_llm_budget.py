@@ -0,0 +1,104 @@
+from pathlib import Path
+
+import pytest
+from autom.engine import Request
+
+from azathoth.common import LLMBudget, LLMBudgetExceeded, RepoEnum, set_openai_client_override
+from azathoth.schema_converter import SegmentSchemaConvertParams, SegmentSchemaConverter
+from azathoth.api_converter import FunctionAPIConverterInput, FunctionAPIConverter
+from azathoth.action_converter import FileActionConvertParams, FileActionConverter
+
+
+segment = '''class User(BaseModel):
+    id: str = Field(..., alias="userId")
+'''
+function_source = '''@router.get("/users/{user_id}")
+async def get_user(user_id: str, db = Depends(get_db)):
+    return await db.get(user_id)
+'''
+api_source = '''import { callApi } from "./config";
+
+export const getUser = (userId: string) => callApi(`/users/${userId}`);
+'''
+
+
+def make_segment_request(root: Path) -> Request:
+    return Request(body=SegmentSchemaConvertParams(
+        src_repo_enum=RepoEnum.BACKEND,
+        src_root_path=root / 'backend',
+        src_filepath=root / 'backend' / 'app' / 'schemas' / 'user.py',
+        dst_repo_enum=RepoEnum.FRONTEND,
+        dst_root_path=root / 'frontend',
+        dst_filepath=root / 'frontend' / 'types' / 'user.ts',
+        segment=segment,
+        use_llm_cache=False,
+        use_static_converter=False,
+    ))
+
+
+def make_function_request(root: Path) -> Request:
+    return Request(body=FunctionAPIConverterInput(
+        api_function_name='get_user',
+        api_function_source=function_source,
+        src_file_fullpath=root / 'backend' / 'app' / 'api' / 'v1' / 'endpoints' / 'users.py',
+        dst_file_fullpath=root / 'frontend' / 'lib' / 'backend-api' / 'users' / 'getUser.ts',
+        autom_backend_root_path=root / 'backend',
+        autom_frontend_root_path=root / 'frontend',
+    ))
+
+
+def make_action_request(root: Path) -> Request:
+    api_src_fullpath = root / 'frontend' / 'lib' / 'backend-api' / 'users.ts'
+    api_src_fullpath.parent.mkdir(parents=True)
+    api_src_fullpath.write_text(api_source)
+    return Request(body=FileActionConvertParams(
+        autom_frontend_root_path=root / 'frontend',
+        api_src_fullpath=api_src_fullpath,
+        action_dst_fullpath=root / 'frontend' / 'actions' / 'backend-api' / 'users.ts',
+        use_action_generator=False,
+        use_llm_cache=False,
+    ))
+
+
+leaf_cases = [
+    pytest.param(SegmentSchemaConverter, make_segment_request, id='segment'),
+    pytest.param(FunctionAPIConverter, make_function_request, id='function'),
+    pytest.param(FileActionConverter, make_action_request, id='action'),
+]
+
+
+class BrokenOpenAIClient:
+    """An OpenAI client whose requests all fail with a non transient error."""
+    @property
+    def beta(self):
+        return self
+
+    @property
+    def chat(self):
+        return self
+
+    @property
+    def completions(self):
+        return self
+
+    def parse(self, **kwargs):
+        raise ValueError('broken')
+
+
+@pytest.mark.parametrize('worker_cls, make_request', leaf_cases)
+def test_over_budget_stops_the_run(worker_cls, make_request, fake_llm, llm_budget, tmp_path: Path):
+    llm_budget(LLMBudget(max_tokens=1))
+
+    with pytest.raises(LLMBudgetExceeded):
+        worker_cls().invoke(make_request(tmp_path))
+    assert fake_llm.stats().n_requests == 0
+
+
+@pytest.mark.parametrize('worker_cls, make_request', leaf_cases)
+def test_other_failures_are_isolated(worker_cls, make_request, fake_llm, llm_budget, tmp_path: Path):
+    llm_budget(LLMBudget(max_tokens=None, max_cost=None))
+    set_openai_client_override(BrokenOpenAIClient())
+
+    resp = worker_cls().invoke(make_request(tmp_path))
+    assert resp.body.failure is not None
+    assert resp.body.failure.error == 'ValueError: broken'
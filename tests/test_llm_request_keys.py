@@ -0,0 +1,22 @@
+from azathoth.api_converter import function_api_converter, function_api_batch_converter
+from azathoth.api_converter import FunctionAPIConverter, FunctionAPIBatchConverter
+
+
+function_source = '''@router.get("/{user_id}")
+async def get_user(user_id: str):
+    ...
+'''
+
+
+def test_function_request_key_covers_the_user_prompt(monkeypatch):
+    request_key = FunctionAPIConverter.get_request_key(function_source)
+    monkeypatch.setattr(function_api_converter, 'function_api_converter_user_input_prompt', 'Convert:\n{api_function_source}')
+
+    assert FunctionAPIConverter.get_request_key(function_source) != request_key
+
+
+def test_batch_key_covers_the_user_prompt(monkeypatch):
+    batch_key = FunctionAPIBatchConverter.get_batch_key({'get_user': function_source})
+    monkeypatch.setattr(function_api_batch_converter, 'function_api_batch_converter_user_input_prompt', 'Convert:\n{api_function_sources}')
+
+    assert FunctionAPIBatchConverter.get_batch_key({'get_user': function_source}) != batch_key
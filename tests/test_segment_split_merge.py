@@ -0,0 +1,88 @@
+from azathoth.common.agent.segmenter import SegmentBudget, ast_segment_python_text, pack_first_fit_decreasing
+from azathoth.schema_converter.file_schema_converter.file_schema_converter import merge_split_type_declarations
+
+
+def make_item(n_lines: int) -> str:
+    return '\n'.join(['x'] * n_lines)
+
+
+def test_pack_first_fit_decreasing():
+    # with the 2 joining blank lines the items take 5, 8, 4, 7 and 3 lines of a 10 lines budget
+    items = [make_item(n_lines) for n_lines in (3, 6, 2, 5, 1)]
+
+    assert pack_first_fit_decreasing(items, SegmentBudget(10)) == [[0, 3], [1, 2], [4]]
+
+
+def test_pack_first_fit_decreasing_keeps_oversize_items_alone():
+    items = [make_item(n_lines) for n_lines in (12, 2, 3)]
+
+    assert pack_first_fit_decreasing(items, SegmentBudget(10)) == [[0], [1, 2]]
+
+
+def test_oversize_class_is_split_with_its_header():
+    text = '''class User(BaseModel):
+    """A user."""
+    id: str
+    name: str
+    # the email of the user
+    email: str
+    age: int
+
+
+Role = Literal["admin", "member"]
+'''
+
+    assert ast_segment_python_text(text, 6).segments == [
+        '''class User(BaseModel):
+    """A user."""
+    id: str
+    name: str
+    # the email of the user
+    email: str''',
+        '''class User(BaseModel):
+    """A user."""
+    age: int
+
+
+Role = Literal["admin", "member"]''',
+    ]
+
+
+def test_split_declarations_are_merged_into_the_first():
+    converted_schemas = [
+        '''export type User = {
+  id: string;
+  name: string;
+};''',
+        '''// A user.
+export type User = {
+  // the email of the user
+  email: string;
+};
+
+export type Role = "admin" | "member";''',
+        '''export type User = {
+  age: number;
+};''',
+    ]
+
+    assert merge_split_type_declarations(converted_schemas) == [
+        '''export type User = {
+  id: string;
+  name: string;
+  // the email of the user
+  email: string;
+  age: number;
+};''',
+        'export type Role = "admin" | "member";',
+        '',
+    ]
+
+
+def test_declarations_without_object_body_are_left_as_they_are():
+    converted_schemas = [
+        'export type Id = string | number;',
+        'export type Id = string | number;',
+    ]
+
+    assert merge_split_type_declarations(converted_schemas) == converted_schemas
@@ -0,0 +1,96 @@
+from azathoth.api_converter import FunctionConvertKeyResult
+from azathoth.action_converter import parse_api_function_signature, render_server_action
+
+
+def test_generated_api_file_to_server_action():
+    key_result = FunctionConvertKeyResult(
+        api_suffix_route='/{project_id}/update',
+        has_response_model=True,
+        response_model='ProjectSafe',
+        has_body_data=True,
+        body_data_type='UpdateProjectReqBody',
+        has_current_user=True,
+        other_params={'projectId': 'string'},
+    )
+    api_source = key_result.to_frontend_code('project', 'update_project')
+
+    signature = parse_api_function_signature(api_source)
+    assert signature is not None
+    assert render_server_action(signature, api_module='@/lib/backend-api/project/updateProject') == '''"use server";
+
+import { updateProject } from "@/lib/backend-api/project/updateProject";
+import { getAccessTokenAction } from "@/actions/get-access-token";
+import { UpdateProjectReqBody } from "@/types";
+
+export const updateProjectAction = async ({ projectId, bodyData }: { projectId: string; bodyData: UpdateProjectReqBody }) => {
+  const accessToken = await getAccessTokenAction();
+  if (!accessToken) throw new Error("Not Authenticated");
+  const result = await updateProject({
+    projectId,
+    bodyData,
+    accessToken,
+  });
+  return result;
+};
+'''
+
+
+def test_generated_api_file_without_params():
+    key_result = FunctionConvertKeyResult(
+        api_suffix_route='/list',
+        has_response_model=True,
+        response_model='list[ProjectSafe]',
+        has_body_data=False,
+        body_data_type=None,
+        has_current_user=False,
+        other_params=None,
+    )
+    api_source = key_result.to_frontend_code('project', 'list_projects')
+
+    assert render_server_action(parse_api_function_signature(api_source)) == '''"use server";
+
+import { listProjects } from "@/lib/backend-api";
+
+export const listProjectsAction = async () => {
+  const result = await listProjects({});
+  return result;
+};
+'''
+
+
+def test_defaults_and_optional_params_are_kept():
+    api_source = '''import { cache } from "react";
+
+export const searchProjects = cache(async ({ query, page = 1, tags }: { query: string; page?: number; tags?: Array<ProjectTag> }): Promise<ProjectSafe[]> => {
+  return [];
+});
+'''
+
+    assert render_server_action(parse_api_function_signature(api_source)) == '''"use server";
+
+import { searchProjects } from "@/lib/backend-api";
+import { ProjectTag } from "@/types";
+
+export const searchProjectsAction = async ({ query, page = 1, tags }: { query: string; page?: number; tags?: Array<ProjectTag> }) => {
+  const result = await searchProjects({
+    query,
+    page,
+    tags,
+  });
+  return result;
+};
+'''
+
+
+def test_unknown_shapes_are_left_to_the_llm():
+    several_exports = '''export const getUser = cache(async ({ id }: { id: string }) => id);
+export const other = 1;
+'''
+    rest_params = '''export const getUser = cache(async ({ ...rest }: { id: string }) => rest);
+'''
+    hand_written = '''export const getUser = (userId: string) => callApi(`/users/${userId}`);
+'''
+
+    assert parse_api_function_signature(several_exports) is None
+    assert parse_api_function_signature(rest_params) is None
+    assert parse_api_function_signature(hand_written) is None
@@ -0,0 +1,156 @@
+from azathoth.schema_converter import convert_schema_segment_statically
+
+
+def test_req_body_defaults_are_optional_with_comment():
+    conversion = convert_schema_segment_statically('''class CreateProjectReqBody(MyBaseModel):
+    name: str = Field(..., description="Project name")
+    description: Optional[str] = Field(None, description="Project description")
+    python_version: str = "3.11"
+    publicity: ProjectPublicity = ProjectPublicity.private
+    sync_on_github: bool = False
+    limit: int = Field(20, ge=1)
+    tags: list[str] = Field(default_factory=list)
+''')
+
+    assert conversion.converted_segment == '''export type CreateProjectReqBody = {
+  name: string;
+  description?: string; // default to undefined
+  python_version?: string; // default to 3.11
+  publicity?: ProjectPublicity; // default to ProjectPublicity.private
+  sync_on_github?: boolean; // default to false
+  limit?: number; // default to 20
+  tags?: string[]; // default to []
+};'''
+    assert conversion.unsupported_segment == ''
+
+
+def test_defaults_outside_req_body_stay_required():
+    conversion = convert_schema_segment_statically('''class Project(BaseModel):
+    name: str = "untitled"
+    description: str | None = None
+''')
+
+    assert conversion.converted_segment == '''export type Project = {
+  name: string;
+  description?: string;
+};'''
+
+
+def test_multiple_parents_are_intersected():
+    conversion = convert_schema_segment_statically('''class Timestamped(MyBaseModel):
+    created_at: datetime
+
+
+class Named(MyBaseModel):
+    name: str
+
+
+class User(Timestamped, Named):
+    id: UUID
+    scores: dict[str, float]
+
+
+class UserSafe(User):
+    pass
+''')
+
+    assert conversion.converted_segment == '''export type Timestamped = {
+  created_at: string;
+};
+
+export type Named = {
+  name: string;
+};
+
+export type User = Timestamped & Named & {
+  id: string;
+  scores: Record<string, number>;
+};
+
+export type UserSafe = User;'''
+    assert conversion.n_converted == 4
+
+
+def test_generic_models():
+    conversion = convert_schema_segment_statically('''T = TypeVar('T')
+
+
+class Page(BaseModel, Generic[T]):
+    items: list[T]
+    total: int
+
+
+class UserPage(Page[User]):
+    pass
+''')
+
+    assert conversion.converted_segment == '''export type Page<T> = {
+  items: T[];
+  total: number;
+};
+
+export type UserPage = Page<User>;'''
+    assert conversion.unsupported_segment == ''
+
+
+def test_enums_and_literal_aliases():
+    conversion = convert_schema_segment_statically('''# the publicity of a project
+class ProjectPublicity(str, Enum):
+    """Who can see a project."""
+    public = "public"
+    private = "private"
+
+
+class Priority(IntEnum):
+    LOW = 0
+    HIGH = 1
+
+
+# how the feed is sorted
+FeedMode = Literal["trending", "latest", "recommend"]
+MaybeFlag = Optional[Literal[True, 1]]
+DEFAULT_MODE = "latest"
+''')
+
+    assert conversion.converted_segment == '''// the publicity of a project
+export enum ProjectPublicity {
+  public = "public",
+  private = "private",
+}
+
+export enum Priority {
+  LOW = 0,
+  HIGH = 1,
+}
+
+// how the feed is sorted
+export type FeedMode = "trending" | "latest" | "recommend";
+
+export type MaybeFlag = true | 1 | null;'''
+    assert conversion.unsupported_segment == ''
+
+
+def test_unsupported_nodes_are_left_to_the_llm():
+    segment = '''class User(BaseModel):
+    id: str = Field(..., alias="userId")
+
+
+class Admin(SomeMixin, BaseModel):
+    level: int
+
+
+class Known(BaseModel):
+    name: str
+'''
+    conversion = convert_schema_segment_statically(segment)
+
+    assert conversion.converted_segment == '''export type Known = {
+  name: string;
+};'''
+    assert conversion.unsupported_segment == '''class User(BaseModel):
+    id: str = Field(..., alias="userId")
+
+
+class Admin(SomeMixin, BaseModel):
+    level: int'''
+    assert (conversion.n_converted, conversion.n_unsupported) == (1, 2)